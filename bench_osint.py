@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the OSINT SQLite layer and dashboard API.
+
+Each subcommand builds a throwaway osint.db with synthetic rows, so results
+are comparable across commits:
+
+    python bench_osint.py api --assets 20000 --requests 300
+    python bench_osint.py stream --assets 25000
+    python bench_osint.py export --assets 25000 --grid-hours 720
+    python bench_osint.py ingest --assets 10000 --grid-rows 1000000
+    python bench_osint.py storage --grid-hours 2160
+    python bench_osint.py normalize --days 7
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+ASSET_TYPES = ("power_plant", "data_center", "substation", "pipeline")
+FUELS = ("Natural Gas", "Coal", "Nuclear", "Solar", "Wind", "Hydro", "Oil")
+ISOS = ("ERCO", "PJM", "CISO", "MISO", "NYIS", "ISNE", "SWPP")
+
+
+def _use_temp_db(workdir: Path) -> Path:
+    """Point OSINT_DB_PATH/DB_PATH at temp files before osint modules import."""
+    osint_path = workdir / "osint.db"
+    os.environ["OSINT_DB_PATH"] = str(osint_path)
+    os.environ["DB_PATH"] = str(workdir / "articles.db")
+    return osint_path
+
+
+def synthetic_assets(n: int, seed: int = 7) -> list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": f"bench_{i}",
+            "source": "bench",
+            "source_id": str(i),
+            "type": ASSET_TYPES[i % len(ASSET_TYPES)],
+            "name": f"Asset {i:06d}",
+            "state": rnd.choice(("GA", "TX", "CA", "NY", "PA", "FL")),
+            "lat": rnd.uniform(25.0, 49.0),
+            "lng": rnd.uniform(-124.0, -67.0),
+            "capacity_mw": round(rnd.uniform(1, 2000), 1),
+            "fuel_type": rnd.choice(FUELS),
+            "operator": f"Operator {i % 300}",
+            "metadata": {"period": "2026-08", "sector": "bench", "n": i},
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_grid_rows(hours: int, step_minutes: int = 5) -> Iterator[dict[str, Any]]:
+    """Yield fuel-mix rows for every ISO and fuel; lazy so 1M-row runs fit in memory."""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for step in range(hours * 60 // step_minutes):
+        ts = (start + timedelta(minutes=step * step_minutes)).isoformat()
+        for iso in ISOS:
+            for j, fuel in enumerate(FUELS):
+                yield (
+                    {
+                        "region": iso,
+                        "region_type": "iso",
+                        "source": "gridstatus",
+                        "timestamp": ts,
+                        "metric": "fuel_mix_mw",
+                        "fuel": fuel,
+                        "value": 1000.0 + (step % 288) * (j + 1),
+                        "unit": "MW",
+                        "metadata": {"fetched_at": ts},
+                    }
+                )
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"  {label:<40} p50 {statistics.median(ordered):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def bench_api(args: argparse.Namespace) -> None:
+    import logging
+    import threading
+    import urllib.request
+
+    from werkzeug.serving import make_server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_db(Path(tmp))
+        import osint_db
+
+        _seed_assets(args.assets)
+        with osint_db.get_conn() as conn:
+            osint_db.insert_grid_snapshots(conn, synthetic_grid_rows(args.grid_hours))
+            conn.commit()
+        import db
+
+        db.init_db()  # an empty articles.db, so /api/news answers 200
+
+        import dashboard_api
+
+        # A real threaded server, as app.run() serves: one thread per request,
+        # which the single-threaded Flask test client would hide.
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no access log per request
+        server = make_server("127.0.0.1", 0, dashboard_api.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        print(f"API latency ({args.assets} assets, {args.grid_hours}h grid history, {args.requests} requests)")
+        try:
+            for path in (
+                "/api/health",
+                "/api/assets/types",
+                "/api/assets?type=data_center&limit=100",
+                "/api/grid/current",
+                "/api/incidents?days=30",
+                "/api/news?limit=20",
+            ):
+                _report(path, _timed(lambda: urllib.request.urlopen(base + path).read(), args.requests))
+        finally:
+            server.shutdown()
+
+
+def _seed_assets(n: int) -> None:
+    import osint_db
+
+    osint_db.init_db()
+    with osint_db.get_conn() as conn:
+        osint_db.upsert_assets(conn, synthetic_assets(n))
+        conn.commit()
+
+
+def bench_stream(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_db(Path(tmp))
+        _seed_assets(args.assets)
+        import dashboard_api
+
+        client = dashboard_api.app.test_client()
+        print(f"/api/assets?limit={args.assets} ({args.runs} runs)")
+        for label, extra in (("buffered jsonify", ""), ("stream=1", "&stream=1")):
+            ttfb, total, peaks = [], [], []
+            for run in range(args.runs):
+                # nonce defeats the response cache so every run builds the body
+                url = f"/api/assets?limit={args.assets}&nonce={run}{extra}"
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                response = client.get(url, buffered=False)
+                chunks = iter(response.response)
+                size = len(next(chunks))
+                ttfb.append((time.perf_counter() - t0) * 1000)
+                for chunk in chunks:
+                    size += len(chunk)
+                total.append((time.perf_counter() - t0) * 1000)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+                tracemalloc.stop()
+                response.close()
+            print(
+                f"  {label:<18} TTFB p50 {statistics.median(ttfb):8.1f} ms   "
+                f"total p50 {statistics.median(total):8.1f} ms   "
+                f"peak {max(peaks):7.1f} MB   body {size / 1e6:.1f} MB"
+            )
+
+
+def _drain(client: Any, url: str) -> tuple[bytes, float, float]:
+    """GET url streaming; return (body, total ms, peak traced MB)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    response = client.get(url, buffered=False)
+    body = b"".join(response.response)
+    elapsed = (time.perf_counter() - t0) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    response.close()
+    return body, elapsed, peak
+
+
+def bench_export(args: argparse.Namespace) -> None:
+    import io
+
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_db(Path(tmp))
+        import osint_db
+
+        _seed_assets(args.assets)
+        with osint_db.get_conn() as conn:
+            osint_db.insert_grid_snapshots(conn, synthetic_grid_rows(args.grid_hours))
+            conn.commit()
+        import dashboard_api
+
+        client = dashboard_api.app.test_client()
+        print(f"Export of {args.assets} assets and {args.grid_hours}h grid history -> pandas")
+
+        def load_geojson(body: bytes) -> Any:
+            import json
+
+            features = json.loads(body)["features"]
+            return pd.json_normalize([f["properties"] for f in features])
+
+        def load_arrow(body: bytes) -> Any:
+            return pa.ipc.open_file(pa.BufferReader(body)).read_all().to_pandas()
+
+        def load_parquet(body: bytes) -> Any:
+            return pq.read_table(io.BytesIO(body)).to_pandas()
+
+        for label, url, loader in (
+            ("assets geojson", f"/api/assets?limit={args.assets}&stream=1", load_geojson),
+            ("assets arrow", "/api/export/assets?format=arrow", load_arrow),
+            ("assets parquet", "/api/export/assets?format=parquet", load_parquet),
+            ("grid arrow", "/api/export/grid?format=arrow", load_arrow),
+            ("grid parquet", "/api/export/grid?format=parquet", load_parquet),
+        ):
+            body, server_ms, peak = _drain(client, url)
+            t0 = time.perf_counter()
+            frame = loader(body)
+            load_ms = (time.perf_counter() - t0) * 1000
+            print(
+                f"  {label:<16} {len(frame):>9} rows   body {len(body) / 1e6:7.1f} MB   "
+                f"server {server_ms:8.1f} ms   peak {peak:6.1f} MB   client load {load_ms:8.1f} ms"
+            )
+
+
+def bench_ingest(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_db(Path(tmp))
+        import osint_db
+
+        osint_db.init_db()
+        conn = osint_db.get_conn()
+        assets = synthetic_assets(args.assets)
+        print(f"Ingest into osint.db ({args.assets} assets, {args.grid_rows} grid rows)")
+
+        t0 = time.perf_counter()
+        for asset in assets[: args.assets // 10]:
+            osint_db.upsert_asset(conn, asset)
+            conn.commit()
+        per_row = (time.perf_counter() - t0) / (args.assets // 10) * 1000
+        print(f"  {'upsert_asset + commit per row':<34} {per_row:8.3f} ms/asset")
+
+        for label in ("upsert_assets (insert)", "upsert_assets (update)"):
+            t0 = time.perf_counter()
+            inserted, updated = osint_db.upsert_assets(conn, assets)
+            conn.commit()
+            elapsed = time.perf_counter() - t0
+            print(
+                f"  {label:<34} {elapsed:8.2f} s   {args.assets / elapsed:10.0f} rows/s   "
+                f"inserted {inserted}  updated {updated}"
+            )
+
+        hours = args.grid_rows // (len(ISOS) * len(FUELS) * 12) + 1
+        for label in ("insert_grid_snapshots (new)", "insert_grid_snapshots (dupes)"):
+            t0 = time.perf_counter()
+            inserted = osint_db.insert_grid_snapshots(conn, islice(synthetic_grid_rows(hours), args.grid_rows))
+            conn.commit()
+            elapsed = time.perf_counter() - t0
+            print(f"  {label:<34} {elapsed:8.2f} s   {args.grid_rows / elapsed:10.0f} rows/s   inserted {inserted}")
+        conn.close()
+
+
+def bench_storage(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _use_temp_db(Path(tmp))
+        import osint_db
+
+        osint_db.init_db()
+        with osint_db.get_conn() as conn:
+            rows = osint_db.insert_grid_snapshots(conn, synthetic_grid_rows(args.grid_hours))
+            conn.commit()
+            conn.execute("VACUUM")
+        size = path.stat().st_size
+        print(f"Grid storage ({args.grid_hours}h history, {rows} rows)")
+        print(f"  {'file size':<40} {size / 1e6:8.1f} MB   {size / rows:6.1f} B/row")
+
+        conn = osint_db.checkout_read_conn()
+        end = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=args.grid_hours)
+        queries = (
+            ("full scan of grid_snapshots", "SELECT COUNT(*), SUM(value), MAX(timestamp) FROM grid_snapshots", ()),
+            (
+                "one series, last 7 days",
+                "SELECT timestamp, value FROM grid_snapshots WHERE region = ? AND metric = ? AND fuel = ?"
+                " AND timestamp >= ? ORDER BY timestamp",
+                ("PJM", "fuel_mix_mw", "Wind", (end - timedelta(days=7)).isoformat()),
+            ),
+        )
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'grid_samples'").fetchone():
+            series_id = conn.execute(
+                "SELECT series_id FROM grid_series WHERE region = 'PJM' AND metric = 'fuel_mix_mw' AND fuel = 'Wind'"
+            ).fetchone()[0]
+            queries += (
+                ("full scan of grid_samples (compact)", "SELECT COUNT(*), SUM(value), MAX(ts) FROM grid_samples", ()),
+                (
+                    "one series, last 7 days (compact)",
+                    "SELECT ts, value FROM grid_samples WHERE series_id = ? AND ts >= ? ORDER BY ts",
+                    (series_id, int((end - timedelta(days=7)).timestamp())),
+                ),
+            )
+        for label, sql, params in queries:
+            _report(label, _timed(lambda: conn.execute(sql, params).fetchall(), args.runs))
+        client = __import__("dashboard_api").app.test_client()
+        url = (
+            f"/api/grid/series?region=PJM&metric=fuel_mix_mw&fuel=Wind&resolution=raw"
+            f"&start={(end - timedelta(days=7)).isoformat()}&end={end.isoformat()}"
+        ).replace("+", "%2B")
+        _report("/api/grid/series raw 7 days", _timed(lambda: client.get(url), args.runs))
+
+
+def synthetic_fuel_mix_frame(days: int, seed: int = 11) -> Any:
+    """A gridstatus-shaped wide fuel-mix frame: 5-minute rows, local-time
+    interval columns, one float column per fuel with a few gaps."""
+    import numpy as np
+    import pandas as pd
+
+    rnd = np.random.default_rng(seed)
+    start = pd.Timestamp("2026-01-01", tz="US/Central")
+    times = pd.date_range(start, periods=days * 288, freq="5min")
+    frame = pd.DataFrame({"Time": times, "Interval Start": times, "Interval End": times + pd.Timedelta("5min")})
+    for fuel in FUELS + ("Other", "Power Storage", "Imports"):
+        values = rnd.uniform(0, 20000, len(times))
+        values[rnd.random(len(times)) < 0.01] = np.nan
+        frame[fuel] = values
+    return frame
+
+
+def bench_normalize(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_db(Path(tmp))
+        import fetch_grid
+
+        frame = synthetic_fuel_mix_frame(args.days)
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        rows = fetch_grid._fuel_rows_from_dataframe("ERCOT", frame, fetched_at)
+        print(f"_fuel_rows_from_dataframe ({args.days} days x {frame.shape[1] - 3} fuels, {len(rows)} rows)")
+        _report(
+            "normalize",
+            _timed(lambda: fetch_grid._fuel_rows_from_dataframe("ERCOT", frame, fetched_at), args.runs),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    api = sub.add_parser("api", help="per-request latency of dashboard_api endpoints")
+    api.add_argument("--assets", type=int, default=20000)
+    api.add_argument("--grid-hours", type=int, default=24)
+    api.add_argument("--requests", type=int, default=300)
+    api.set_defaults(func=bench_api)
+
+    stream = sub.add_parser("stream", help="peak memory and time to first byte of /api/assets")
+    stream.add_argument("--assets", type=int, default=25000)
+    stream.add_argument("--runs", type=int, default=5)
+    stream.set_defaults(func=bench_stream)
+
+    export = sub.add_parser("export", help="Arrow/Parquet export size, server time and client load time")
+    export.add_argument("--assets", type=int, default=25000)
+    export.add_argument("--grid-hours", type=int, default=720)
+    export.set_defaults(func=bench_export)
+
+    ingest = sub.add_parser("ingest", help="bulk upsert throughput of osint_db")
+    ingest.add_argument("--assets", type=int, default=10000)
+    ingest.add_argument("--grid-rows", type=int, default=1000000)
+    ingest.set_defaults(func=bench_ingest)
+
+    storage = sub.add_parser("storage", help="on-disk size and scan speed of grid telemetry")
+    storage.add_argument("--grid-hours", type=int, default=2160)
+    storage.add_argument("--runs", type=int, default=5)
+    storage.set_defaults(func=bench_storage)
+
+    normalize = sub.add_parser("normalize", help="fetch_grid wide fuel-mix frame -> rows")
+    normalize.add_argument("--days", type=int, default=7)
+    normalize.add_argument("--runs", type=int, default=7)
+    normalize.set_defaults(func=bench_normalize)
+
+    args = parser.parse_args()
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,22 @@
 """Flask API for the OSINT Energy Security Dashboard."""
 from __future__ import annotations
 
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
 import json
 import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, Iterable
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+from werkzeug.wsgi import ClosingIterator
 
 
 def _qint(key: str, default: int, max_val: int | None = None) -> int:
@@ -17,15 +27,233 @@ def _qint(key: str, default: int, max_val: int | None = None) -> int:
         n = default
     return min(n, max_val) if max_val is not None else n
 
-from osint_db import get_conn, init_db
+
+def _qbbox(key: str = "bbox") -> tuple[float, float, float, float] | None:
+    """Parse ``west,south,east,north`` (Leaflet's toBBoxString order)."""
+    raw = request.args.get(key)
+    if not raw:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in raw.split(","))
+    except ValueError:
+        return None
+    west, east = max(west, -180.0), min(east, 180.0)
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west > east or south > north:
+        return None
+    return west, south, east, north
+
+
+def _qtime(key: str) -> datetime | None:
+    raw = request.args.get(key)
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _encode_cursor(order: str, values: list[Any]) -> str:
+    raw = json.dumps([order, *values], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _qcursor(order: str, size: int, key: str = "cursor") -> list[Any] | None:
+    """Decode an opaque keyset cursor; raises ValueError if it is malformed
+    or was issued for a different sort order."""
+    raw = request.args.get(key)
+    if not raw:
+        return None
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+    except (binascii.Error, ValueError) as exc:
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(decoded, list) or len(decoded) != size + 1 or decoded[0] != order:
+        raise ValueError("cursor does not match this query")
+    return decoded[1:]
+
+
+import digest_archive
+from grid_forecast import forecast_error_ranking
+import osint_export
+try:  # optional fast encoder for the streaming GeoJSON path
+    import orjson
+
+    def _encode(value: Any) -> str:
+        return orjson.dumps(value).decode("utf-8")
+except ImportError:
+    _encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+from osint_db import (
+    GRID_RETENTION_DAYS,
+    TILE_CLUSTER_MAX_ZOOM,
+    get_conn,
+    checkout_read_conn,
+    get_data_versions,
+    init_db,
+    insert_grid_snapshots,
+    record_ingest_batch,
+    release_read_conn,
+    seen_ingest_batch,
+    tile_bounds,
+    tile_coords,
+    upsert_assets,
+)
+
+NEWS_DB_PATH = os.environ.get("DB_PATH", "articles.db")
+
+# Below this zoom a viewport holds more assets than the limit, so the
+# largest-capacity ones are returned first instead of alphabetical order.
+ASSET_DETAIL_ZOOM = 8
+
+# Cluster tiles split each 256px tile into CLUSTER_CELLS x CLUSTER_CELLS bins.
+CLUSTER_CELLS = 8
+TILE_POINT_LIMIT = 5000
+# How long a tile GET waits for the write lock to cache its body; past this
+# the body is served uncached rather than stalling behind an ingest.
+TILE_CACHE_BUSY_MS = 100
+
+# /api/grid/series resolution: raw samples up to this span, hourly rollups up
+# to SERIES_HOURLY_MAX_DAYS, daily rollups beyond.
+SERIES_RAW_MAX_HOURS = 48
+SERIES_HOURLY_MAX_DAYS = 90
+
+# In-process response cache keyed by (path, normalized query, data versions).
+RESPONSE_CACHE_ENTRIES = 256
+RESPONSE_CACHE_MAX_BODY = 32 * 1024 * 1024
+
+# Rows fetched from the cursor per yielded chunk on the streaming path.
+STREAM_CHUNK_ROWS = 500
+
+# Ingest routes accept the push scripts' payloads when X-API-Key matches;
+# they are disabled (503) while INGEST_API_KEY is unset.
+INGEST_API_KEY = os.environ.get("INGEST_API_KEY", "")
+# Upper bound on a decompressed ingest body, so a gzip bomb cannot exhaust memory.
+INGEST_MAX_BYTES = 256 * 1024 * 1024
+
+# Keyset pagination orders for /api/assets: (sort key columns, direction).
+# Each matches an idx_assets_page_* index, so a page is an index range scan
+# starting at the cursor instead of an OFFSET walk over every earlier row.
+ASSET_PAGE_ORDERS = {
+    "name": (("type", "page_name", "id"), "ASC"),
+    "capacity": (("page_capacity", "id"), "DESC"),
+}
+# Generated sort-key columns on assets, not part of the GeoJSON properties.
+ASSET_PAGE_COLUMNS = ("page_name", "page_capacity")
 
 app = Flask(__name__)
 
+# Schema setup runs once per process at startup; init_db() only executes the
+# DDL script when the on-disk schema version is behind.
+init_db()
+
+
+def get_read_conn(db_path: str | None = None, mode: str = "rw") -> sqlite3.Connection:
+    """This request's read connection for ``db_path``, checked out of osint_db's pool.
+
+    Werkzeug's threaded server runs each request on a new thread, so the
+    pool, not the thread, is what reuses connections. They go back when the
+    app context ends, or when a streamed body closes (_release_after).
+    """
+    conns = g.setdefault("read_conns", {})
+    conn = conns.get((db_path, mode))
+    if conn is None:
+        conn = conns[(db_path, mode)] = checkout_read_conn(db_path, mode)
+    return conn
+
+
+@app.teardown_appcontext
+def _release_read_conns(exc: BaseException | None) -> None:
+    for (db_path, mode), conn in g.pop("read_conns", {}).items():
+        release_read_conn(conn, db_path, mode)
+
+
+def _release_after(body: Iterable[Any], db_path: str | None = None, mode: str = "rw") -> ClosingIterator:
+    """Keep this request's connection until the streamed ``body`` is closed.
+
+    The app context ends once the view returns, before the body's cursor
+    is read, so the connection must not go back to the pool with it.
+    """
+    conn = g.read_conns.pop((db_path, mode))
+    return ClosingIterator(body, functools.partial(release_read_conn, conn, db_path, mode))
+
+
+_ingest_lock = threading.Lock()
+
+_response_cache: OrderedDict[tuple, tuple[str, bytes, str, list[tuple[str, str]]]] = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def cached_response(
+    *tables: str,
+    db_path: str | None = None,
+    db_mode: str = "rw",
+    vary: Callable[[], Any] | None = None,
+) -> Callable:
+    """Cache a JSON endpoint until one of ``tables`` changes, with strong ETags.
+
+    The ingest helpers bump data_versions for each table they write, so a
+    cached body is reused for as long as those versions are unchanged, and a
+    client presenting the body's ETag in If-None-Match gets a 304. ``vary``
+    adds inputs the query string does not carry (e.g. today's date).
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                versions = get_data_versions(get_read_conn(db_path, db_mode), tables)
+            except sqlite3.Error:
+                return view(*args, **kwargs)
+            key = (
+                request.path,
+                tuple(sorted(request.args.items(multi=True))),
+                versions,
+                vary() if vary else None,
+            )
+            with _response_cache_lock:
+                hit = _response_cache.get(key)
+                if hit is not None:
+                    _response_cache.move_to_end(key)
+            if hit is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                # X-* headers (e.g. X-Next-Cursor) are part of the cached reply
+                headers = [(k, v) for k, v in response.headers.items() if k.startswith("X-")]
+                hit = (hashlib.sha256(body).hexdigest(), body, response.mimetype, headers)
+                if len(body) <= RESPONSE_CACHE_MAX_BODY:
+                    with _response_cache_lock:
+                        _response_cache[key] = hit
+                        while len(_response_cache) > RESPONSE_CACHE_ENTRIES:
+                            _response_cache.popitem(last=False)
+
+            etag, body, mimetype, headers = hit
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype=mimetype)
+            response.headers.extend(headers)
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate it on every request
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
 
 @app.after_request
 def add_cors_headers(response: Any) -> Any:
     response.headers.setdefault("Access-Control-Allow-Origin", "*")
-    response.headers.setdefault("Access-Control-Allow-Headers", "Content-Type")
+    response.headers.setdefault("Access-Control-Allow-Headers", "Content-Type, X-API-Key")
+    response.headers.setdefault("Access-Control-Expose-Headers", "ETag, X-Next-Cursor")
     return response
 
 
@@ -39,7 +267,7 @@ def _parse_json(value: str | None) -> dict[str, Any]:
 
 
 def _asset_feature(row: dict[str, Any]) -> dict[str, Any]:
-    properties = dict(row)
+    properties = {k: v for k, v in row.items() if k not in ASSET_PAGE_COLUMNS}
     metadata = _parse_json(properties.pop("metadata_json", None))
     lat = properties.pop("lat", None)
     lng = properties.pop("lng", None)
@@ -55,9 +283,49 @@ def _asset_feature(row: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-@app.before_request
-def ensure_db() -> None:
-    init_db()
+def _asset_feature_text(row: sqlite3.Row) -> str:
+    """Encode one asset as GeoJSON text, splicing metadata_json in verbatim.
+
+    Produces the same feature as _asset_feature() without parsing and
+    re-encoding the metadata; upsert_assets() always stores it as a JSON object.
+    """
+    properties = {k: row[k] for k in row.keys() if k not in ASSET_PAGE_COLUMNS}
+    metadata = properties.pop("metadata_json", None) or "{}"
+    if not (metadata.startswith("{") and metadata.endswith("}")):
+        metadata = "{}"
+    lat = properties.pop("lat", None)
+    lng = properties.pop("lng", None)
+    geometry = None
+    if lat is not None and lng is not None:
+        geometry = {"type": "Point", "coordinates": [lng, lat]}
+    head = _encode({"type": "Feature", "id": row["id"], "geometry": geometry})
+    props = _encode(properties)
+    return f'{head[:-1]},"properties":{props[:-1]},"metadata":{metadata}}}}}'
+
+
+def _stream_features(cursor: sqlite3.Cursor, limit: int, page_key: Callable[[sqlite3.Row], str]) -> Any:
+    """Stream up to ``limit`` features; the query fetches one extra row so
+    the closing chunk can say whether there is a next page."""
+    yield '{"type":"FeatureCollection","features":['
+    separator = ""
+    sent = 0
+    last = None
+    next_cursor = None
+    while True:
+        rows = cursor.fetchmany(STREAM_CHUNK_ROWS)
+        if not rows:
+            break
+        if sent + len(rows) > limit:
+            rows = rows[: limit - sent]
+            next_cursor = page_key(rows[-1] if rows else last)
+        if rows:
+            yield separator + ",".join(_asset_feature_text(row) for row in rows)
+            separator = ","
+            sent += len(rows)
+            last = rows[-1]
+        if next_cursor is not None:
+            break
+    yield f'],"next_cursor":{_encode(next_cursor)}}}'
 
 
 @app.get("/api/health")
@@ -66,112 +334,639 @@ def health() -> Any:
 
 
 @app.get("/api/assets")
+@cached_response("assets")
 def assets() -> Any:
+    """Asset GeoJSON; ``stream=1`` streams features chunk by chunk (uncached).
+
+    Pages are keyset-paginated: when more rows match, the body carries
+    ``next_cursor`` (also sent as X-Next-Cursor), which is passed back as
+    ``cursor`` to continue after the last feature of this page.
+    """
     asset_type = request.args.get("type")
     state = request.args.get("state")
-    limit = _qint("limit", 5000, 25000)
+    limit = max(_qint("limit", 5000, 25000), 1)
+    bbox = _qbbox()
+    zoom = _qint("zoom", ASSET_DETAIL_ZOOM)
+    order_name = "capacity" if zoom < ASSET_DETAIL_ZOOM else "name"
+    key_columns, direction = ASSET_PAGE_ORDERS[order_name]
+    try:
+        after = _qcursor(order_name, len(key_columns))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
+    joins = ""
     where = []
     params: list[Any] = []
+    if bbox:
+        west, south, east, north = bbox
+        joins = "JOIN assets_rtree r ON r.rid = a.rowid"
+        where.append("r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?")
+        params.extend([south, north, west, east])
     if asset_type:
-        where.append("type = ?")
+        where.append("a.type = ?")
         params.append(asset_type)
     if state:
-        where.append("state = ?")
+        where.append("a.state = ?")
         params.append(state.upper())
+    if after is not None:
+        keys = ", ".join(f"a.{column}" for column in key_columns)
+        where.append(f"({keys}) {'>' if direction == 'ASC' else '<'} ({', '.join('?' * len(after))})")
+        params.extend(after)
     clause = f"WHERE {' AND '.join(where)}" if where else ""
+    order = ", ".join(f"a.{column} {direction}" for column in key_columns)
 
     sql = f"""
-        SELECT * FROM assets
+        SELECT a.* FROM assets a
+        {joins}
         {clause}
-        ORDER BY type, name
+        ORDER BY {order}
         LIMIT ?
     """
-    params.append(limit)
-    with get_conn() as conn:
-        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
-    return jsonify({"type": "FeatureCollection", "features": [_asset_feature(row) for row in rows]})
+    # One extra row tells whether another page follows
+    params.append(limit + 1)
+
+    def page_key(row: sqlite3.Row) -> str:
+        return _encode_cursor(order_name, [row[column] for column in key_columns])
+
+    cursor = get_read_conn().execute(sql, params)
+    if request.args.get("stream") == "1":
+        # Chunked path: features are encoded straight off the cursor, so
+        # memory stays flat and the first bytes leave before the query ends.
+        return Response(_release_after(_stream_features(cursor, limit, page_key)), mimetype="application/json")
+    rows = cursor.fetchall()
+    next_cursor = page_key(rows[limit - 1]) if len(rows) > limit else None
+    features = [_asset_feature(dict(row)) for row in rows[:limit]]
+    response = jsonify({"type": "FeatureCollection", "features": features, "next_cursor": next_cursor})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _cluster_features(rows: list[sqlite3.Row], z: int, x: int, y: int) -> list[dict[str, Any]]:
+    """Bin tile rows into CLUSTER_CELLS² cells with count, MW and dominant fuel."""
+    cells: dict[tuple[int, int], dict[str, Any]] = {}
+    for row in rows:
+        fx, fy = tile_coords(row["lat"], row["lng"], z)
+        cx = min(max(int((fx - x) * CLUSTER_CELLS), 0), CLUSTER_CELLS - 1)
+        cy = min(max(int((fy - y) * CLUSTER_CELLS), 0), CLUSTER_CELLS - 1)
+        cell = cells.get((cx, cy))
+        if cell is None:
+            cell = cells[(cx, cy)] = {
+                "count": 0, "capacity_mw": 0.0, "lat": 0.0, "lng": 0.0,
+                "fuels": defaultdict(float), "types": defaultdict(int),
+            }
+        capacity = row["capacity_mw"] or 0.0
+        cell["count"] += 1
+        cell["capacity_mw"] += capacity
+        cell["lat"] += row["lat"]
+        cell["lng"] += row["lng"]
+        cell["types"][row["type"]] += 1
+        if row["fuel_type"]:
+            # Weight by MW; +1 keeps zero-capacity assets from being ignored
+            cell["fuels"][row["fuel_type"]] += capacity + 1.0
+
+    features = []
+    for (cx, cy), cell in sorted(cells.items()):
+        count = cell["count"]
+        dominant = max(cell["fuels"].items(), key=lambda item: item[1])[0] if cell["fuels"] else None
+        features.append(
+            {
+                "type": "Feature",
+                "id": f"{z}/{x}/{y}/{cx}/{cy}",
+                "geometry": {"type": "Point", "coordinates": [cell["lng"] / count, cell["lat"] / count]},
+                "properties": {
+                    "cluster": True,
+                    "count": count,
+                    "capacity_mw": round(cell["capacity_mw"], 1),
+                    "dominant_fuel": dominant,
+                    "types": dict(cell["types"]),
+                },
+            }
+        )
+    return features
+
+
+@app.get("/api/assets/tiles/<int:z>/<int:x>/<int:y>")
+def asset_tile(z: int, x: int, y: int) -> Any:
+    """Clustered asset tile up to TILE_CLUSTER_MAX_ZOOM, raw points above it.
+
+    Cluster tiles are cached in asset_tiles and dropped by upsert_assets()
+    when an asset inside them changes. Caching is best-effort: the tile is
+    served either way.
+    """
+    if z < 0 or z > 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "tile out of range"}), 400
+    asset_type = request.args.get("type") or ""
+    clustered = z <= TILE_CLUSTER_MAX_ZOOM
+    conn = get_read_conn()
+
+    if clustered:
+        cached = conn.execute(
+            "SELECT body FROM asset_tiles WHERE type = ? AND z = ? AND x = ? AND y = ?",
+            (asset_type, z, x, y),
+        ).fetchone()
+        if cached is not None:
+            return Response(cached["body"], mimetype="application/json")
+
+    # upsert_assets() bumps the assets version with its invalidation; if it
+    # moves before the tile is cached, the body may be stale and is not cached.
+    (assets_version,) = get_data_versions(conn, ["assets"])
+    west, south, east, north = tile_bounds(z, x, y)
+    sql = """
+        SELECT a.* FROM assets a
+        JOIN assets_rtree r ON r.rid = a.rowid
+        WHERE r.max_lat >= ? AND r.min_lat < ? AND r.max_lng >= ? AND r.min_lng < ?
+    """
+    params: list[Any] = [south, north, west, east]
+    if asset_type:
+        sql += " AND a.type = ?"
+        params.append(asset_type)
+    if clustered:
+        rows = conn.execute(sql, params).fetchall()
+        features = _cluster_features(rows, z, x, y)
+    else:
+        sql += " ORDER BY a.capacity_mw DESC LIMIT ?"
+        params.append(TILE_POINT_LIMIT)
+        features = [_asset_feature(dict(row)) for row in conn.execute(sql, params).fetchall()]
+
+    body = json.dumps({"type": "FeatureCollection", "clustered": clustered, "features": features})
+    if clustered:
+        _cache_tile(asset_type, z, x, y, body, assets_version)
+    return Response(body, mimetype="application/json")
+
+
+def _cache_tile(asset_type: str, z: int, x: int, y: int, body: str, assets_version: int) -> None:
+    """Store a cluster tile built at ``assets_version`` unless assets changed since."""
+    writer = get_conn()
+    try:
+        writer.execute(f"PRAGMA busy_timeout = {TILE_CACHE_BUSY_MS}")
+        # The version is re-read under the write lock, so no upsert can
+        # commit between the check and the insert.
+        writer.execute("BEGIN IMMEDIATE")
+        if get_data_versions(writer, ["assets"]) == (assets_version,):
+            writer.execute(
+                "INSERT OR REPLACE INTO asset_tiles (type, z, x, y, body) VALUES (?, ?, ?, ?, ?)",
+                (asset_type, z, x, y, body),
+            )
+        writer.commit()
+    except sqlite3.OperationalError:
+        pass  # locked by an ingest; the next request caches it
+    finally:
+        writer.close()
 
 
 @app.get("/api/assets/types")
+@cached_response("assets")
 def asset_types() -> Any:
-    with get_conn() as conn:
-        rows = conn.execute(
-            "SELECT type, COUNT(*) as count FROM assets GROUP BY type ORDER BY count DESC"
-        ).fetchall()
+    rows = get_read_conn().execute(
+        "SELECT type, COUNT(*) as count FROM assets GROUP BY type ORDER BY count DESC"
+    ).fetchall()
     return jsonify([dict(row) for row in rows])
 
 
 @app.get("/api/grid/current")
+@cached_response("grid_snapshots")
 def grid_current() -> Any:
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            WITH latest AS (
-                SELECT iso, metric, fuel, MAX(timestamp) AS timestamp
-                FROM grid_snapshots
-                GROUP BY iso, metric, fuel
-            )
-            SELECT g.iso, g.timestamp, g.metric, g.fuel, g.value, g.unit, g.metadata_json
-            FROM grid_snapshots g
-            JOIN latest l
-              ON g.iso = l.iso
-             AND g.metric = l.metric
-             AND COALESCE(g.fuel, '') = COALESCE(l.fuel, '')
-             AND g.timestamp = l.timestamp
-            ORDER BY g.iso, g.metric, g.fuel
-            """
-        ).fetchall()
+    """Newest sample of every series, grouped by region.
+
+    Optional ``region_type`` ('iso' or 'ba') and ``source`` ('gridstatus',
+    'eia930') filters; each item carries both.
+    """
+    where: list[str] = []
+    params: list[Any] = []
+    for column in ("region_type", "source"):
+        if request.args.get(column):
+            where.append(f"{column} = ?")
+            params.append(request.args[column])
+    rows = get_read_conn().execute(
+        f"""
+        SELECT region, region_type, source, timestamp, metric, fuel, value, unit, metadata_json
+        FROM grid_latest
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY region, metric, fuel, source
+        """,
+        params,
+    ).fetchall()
     payload: dict[str, list[dict[str, Any]]] = {}
     for row in rows:
         item = dict(row)
         item["metadata"] = _parse_json(item.pop("metadata_json", None))
-        payload.setdefault(item.pop("iso"), []).append(item)
+        payload.setdefault(item.pop("region"), []).append(item)
     return jsonify(payload)
 
 
+@app.get("/api/grid/alerts")
+@cached_response("grid_alerts", vary=lambda: datetime.now(timezone.utc).strftime("%Y-%m-%dT%H"))
+def grid_alerts() -> Any:
+    """Detector alerts (see grid_anomaly.py) from the last ``hours``, newest first."""
+    where = ["timestamp >= ?"]
+    params: list[Any] = [(datetime.now(timezone.utc) - timedelta(hours=_qint("hours", 24, 24 * 30))).isoformat()]
+    for column in ("region", "source", "severity"):
+        if request.args.get(column):
+            where.append(f"{column} = ?")
+            params.append(request.args[column])
+    params.append(_qint("limit", 200, 2000))
+    rows = get_read_conn().execute(
+        f"""
+        SELECT id, region, region_type, source, timestamp, metric, severity, message, value, threshold, metadata_json
+        FROM grid_alerts
+        WHERE {" AND ".join(where)}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+    alerts = []
+    for row in rows:
+        item = dict(row)
+        item["metadata"] = _parse_json(item.pop("metadata_json", None))
+        alerts.append(item)
+    return jsonify({"count": len(alerts), "alerts": alerts})
+
+
+@app.get("/api/grid/forecast-error")
+@cached_response("grid_forecast_error")
+def grid_forecast_error() -> Any:
+    """EIA-930 day-ahead demand forecast error per BA (see grid_forecast.py).
+
+    Without ``region``: every BA ranked by MAPE over the last ``days`` days
+    of data. With it: that BA's daily MAPE and bias over the same window.
+    """
+    days = max(_qint("days", 7, 366), 1)
+    end = request.args.get("end")
+    conn = get_read_conn()
+    region = request.args.get("region")
+    if not region:
+        return jsonify({"days": days, "ranking": forecast_error_ranking(conn, days, end)})
+    rows = conn.execute(
+        """
+        SELECT day, n AS hours, ape_sum / n AS mape, err_sum / n AS bias_mwh, err_sum / actual_sum AS bias_pct
+        FROM grid_forecast_error_daily
+        WHERE region = ? AND day > date(COALESCE(?, (SELECT MAX(day) FROM grid_forecast_error_daily WHERE region = ?)), ?)
+          AND day <= COALESCE(?, '9999')
+        ORDER BY day
+        """,
+        (region, end, region, f"-{days} days", end),
+    ).fetchall()
+    return jsonify({"region": region, "days": days, "daily": [dict(row) for row in rows]})
+
+
+def _epoch(timestamp: str) -> float:
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _lttb(points: list[tuple[float, float, str]], threshold: int) -> list[tuple[float, float, str]]:
+    """Largest-triangle-three-buckets downsampling of (x, y, label) points.
+
+    Keeps the first and last points and, from each of ``threshold - 2``
+    equal buckets, the point forming the largest triangle with the previous
+    pick and the next bucket's average, which preserves peaks and troughs.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_bucket = points[end:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+        ax, ay = points[a][0], points[a][1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+@app.get("/api/grid/series")
+def grid_series() -> Any:
+    """Time series for one region/metric/fuel, downsampled to max_points.
+
+    ``source`` is required only when the region reports the metric from
+    more than one feed. Spans up to SERIES_RAW_MAX_HOURS read raw samples; longer spans read the
+    hourly or daily rollups (bucket means), so the scan is bounded by the
+    number of buckets rather than the sample rate.
+    """
+    region = request.args.get("region")
+    if not region:
+        return jsonify({"error": "region is required"}), 400
+    metric = request.args.get("metric", "fuel_mix_mw")
+    fuel = request.args.get("fuel", "")
+    source = request.args.get("source")
+    max_points = max(_qint("max_points", 500, 5000), 3)
+    end = _qtime("end") or datetime.now(timezone.utc)
+    start = _qtime("start") or end - timedelta(days=7)
+    if start >= end:
+        return jsonify({"error": "start must be before end"}), 400
+
+    span = end - start
+    resolution = request.args.get("resolution", "auto")
+    raw_horizon = (
+        datetime.now(timezone.utc) - timedelta(days=GRID_RETENTION_DAYS) if GRID_RETENTION_DAYS else None
+    )
+    if resolution not in {"raw", "hourly", "daily"}:
+        # Raw samples past the retention horizon are gone; their rollups remain
+        if span <= timedelta(hours=SERIES_RAW_MAX_HOURS) and not (raw_horizon and start < raw_horizon):
+            resolution = "raw"
+        elif span <= timedelta(days=SERIES_HOURLY_MAX_DAYS):
+            resolution = "hourly"
+        else:
+            resolution = "daily"
+
+    conn = get_read_conn()
+    series = conn.execute(
+        """
+        SELECT series_id, region_type, source FROM grid_series
+        WHERE region = ? AND metric = ? AND fuel = ? AND source = COALESCE(?, source)
+        """,
+        (region, metric, fuel, source),
+    ).fetchall()
+    feeds = sorted({(row["region_type"], row["source"]) for row in series})
+    if len(feeds) > 1:
+        return jsonify({"error": "several sources report this series; pass source", "sources": [f[1] for f in feeds]}), 400
+    region_type, source = feeds[0] if feeds else ("", source or "")
+    if resolution == "raw":
+        # Straight off the compact samples by integer series id and epoch
+        # second. The ids are bound as values (not an IN subquery) so SQLite
+        # pushes the filter into each partition and seeks (series_id, ts).
+        series_ids = [row["series_id"] for row in series]
+        rows = series_ids and conn.execute(
+            f"""
+            SELECT strftime('%Y-%m-%dT%H:%M:%S+00:00', ts, 'unixepoch') AS t, value AS v
+            FROM grid_samples
+            WHERE series_id IN ({", ".join("?" * len(series_ids))})
+              AND ts >= ? AND ts <= ?
+            ORDER BY ts
+            """,
+            (*series_ids, int(start.timestamp()), int(end.timestamp())),
+        ).fetchall()
+    else:
+        table = "grid_rollup_hourly" if resolution == "hourly" else "grid_rollup_daily"
+        # Bucket prefix of `start`, so the bucket containing it is included
+        lo = start.strftime("%Y-%m-%dT%H") if resolution == "hourly" else start.date().isoformat()
+        rows = conn.execute(
+            f"""
+            SELECT bucket AS t, sum / n AS v
+            FROM {table}
+            WHERE region = ? AND region_type = ? AND source = ? AND metric = ? AND fuel = ?
+              AND bucket >= ? AND bucket <= ?
+            ORDER BY bucket
+            """,
+            (region, region_type, source, metric, fuel, lo, end.isoformat()),
+        ).fetchall()
+
+    points = _lttb([(_epoch(row["t"]), row["v"], row["t"]) for row in rows], max_points)
+    return jsonify(
+        {
+            "region": region,
+            "region_type": region_type,
+            "source": source,
+            "metric": metric,
+            "fuel": fuel,
+            "resolution": resolution,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "source_points": len(rows),
+            "points": [[label, value] for _, value, label in points],
+        }
+    )
+
+
 @app.get("/api/incidents")
+@cached_response("incidents", vary=lambda: datetime.now(timezone.utc).date())
 def incidents() -> Any:
+    """Incidents newest first, keyset-paginated on (date, id).
+
+    The body stays a plain list; when more rows match, X-Next-Cursor carries
+    the token to pass back as ``cursor`` for the following page.
+    """
     days = _qint("days", 30)
+    limit = max(_qint("limit", 1000, 5000), 1)
     since = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT * FROM incidents
-            WHERE date >= ?
-            ORDER BY date DESC
-            LIMIT 1000
-            """,
-            (since,),
-        ).fetchall()
-    return jsonify([dict(row) for row in rows])
+    try:
+        after = _qcursor("date", 2)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
+    sql = "SELECT * FROM incidents WHERE date >= ?"
+    params: list[Any] = [since]
+    if after is not None:
+        sql += " AND (date, id) < (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY date DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = get_read_conn().execute(sql, params).fetchall()
 
-@app.get("/api/news")
-def news() -> Any:
-    limit = _qint("limit", 20, 100)
-    db_path = os.environ.get("DB_PATH", "articles.db")
+    response = jsonify([dict(row) for row in rows[:limit]])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers["X-Next-Cursor"] = _encode_cursor("date", [last["date"], last["id"]])
+    return response
+
+
+@app.get("/api/export/<dataset>")
+def export(dataset: str) -> Any:
+    """Bulk columnar export: ?format=arrow (IPC file, default) or parquet.
+
+    Filters: type/state (assets), state/start/end (incidents) and
+    region/source/metric/start/end (grid). The body is streamed in record batches.
+    """
+    if dataset not in osint_export.DATASETS:
+        return jsonify({"error": f"unknown dataset {dataset!r}"}), 404
+    fmt = request.args.get("format", "arrow")
+    if fmt not in osint_export.FORMATS:
+        return jsonify({"error": "format must be arrow or parquet"}), 400
+    if not osint_export.available():
+        return jsonify({"error": "pyarrow is not installed on this server"}), 501
+
+    sql, params = osint_export.export_query(
+        dataset,
+        asset_type=request.args.get("type"),
+        state=request.args.get("state"),
+        region=request.args.get("region"),
+        source=request.args.get("source"),
+        metric=request.args.get("metric"),
+        start=_qtime("start"),
+        end=_qtime("end"),
+    )
+    cursor = get_read_conn().execute(sql, params)
+    mimetype, extension = osint_export.FORMATS[fmt]
+    response = Response(_release_after(osint_export.iter_export(cursor, dataset, fmt)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{dataset}.{extension}"'
+    return response
+
+
+class IngestError(ValueError):
+    """Malformed ingest body; reported to the client as a 400."""
+
+
+def _check_ingest_key() -> Any | None:
+    if not INGEST_API_KEY:
+        return jsonify({"error": "ingest is disabled (INGEST_API_KEY not set)"}), 503
+    supplied = request.headers.get("X-API-Key", "")
+    if not hmac.compare_digest(supplied.encode("utf-8"), INGEST_API_KEY.encode("utf-8")):
+        return jsonify({"error": "invalid API key"}), 401
+    return None
+
+
+def _ingest_body() -> bytes:
+    data = request.get_data(cache=False)
+    if request.content_encoding == "gzip" or data[:2] == b"\x1f\x8b":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = inflater.decompress(data, INGEST_MAX_BYTES)
+        except zlib.error as exc:
+            raise IngestError(f"invalid gzip body: {exc}") from exc
+        if inflater.unconsumed_tail:
+            raise IngestError("decompressed body exceeds INGEST_MAX_BYTES")
+    return data
+
+
+def _ingest_records(key: str) -> list[dict[str, Any]]:
+    """Parse a JSON (``{key: [...]}`` or a bare list) or NDJSON ingest body."""
+    data = _ingest_body()
+    if request.mimetype in {"application/x-ndjson", "application/jsonl", "application/json-seq"}:
+        try:
+            records = [json.loads(line) for line in data.splitlines() if line.strip()]
+        except ValueError as exc:
+            raise IngestError(f"invalid NDJSON line: {exc}") from exc
+    else:
+        try:
+            payload = json.loads(data)
+        except ValueError as exc:
+            raise IngestError(f"invalid JSON body: {exc}") from exc
+        records = payload.get(key) if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise IngestError(f"expected a list of objects under {key!r}")
+    return records
+
+
+def _ingest(
+    key: str,
+    write: Callable[[sqlite3.Connection, list[dict[str, Any]]], dict[str, int]],
+) -> Any:
+    """Shared body of the ingest routes: auth, parse, one transaction per batch.
+
+    A request carrying X-Batch-Id (spool.py sends one per batch) is applied
+    at most once: a retry of a committed batch gets the original reply
+    with ``"duplicate": true`` and writes nothing.
+    """
+    denied = _check_ingest_key()
+    if denied is not None:
+        return denied
+    batch_id = request.headers.get("X-Batch-Id", "")
     try:
-        import sqlite3
+        records = _ingest_records(key)
+    except IngestError as exc:
+        return jsonify({"error": str(exc)}), 400
 
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+    with _ingest_lock:
+        conn = get_conn()
         try:
-            rows = conn.execute(
-                """
-                SELECT id, title, url, feed_name, category, published_at, created_at
-                FROM articles
-                ORDER BY COALESCE(published_at, created_at) DESC
-                LIMIT ?
-                """,
-                (limit,),
-            ).fetchall()
+            conn.execute("BEGIN IMMEDIATE")
+            if batch_id:
+                previous = seen_ingest_batch(conn, batch_id)
+                if previous is not None:
+                    conn.rollback()
+                    return jsonify({**previous, "duplicate": True})
+            counts = {**write(conn, records), "received": len(records)}
+            if batch_id:
+                record_ingest_batch(conn, batch_id, request.path, counts)
+            conn.commit()
+        except (KeyError, TypeError, ValueError) as exc:
+            conn.rollback()
+            return jsonify({"error": f"invalid record: {exc!r}"}), 400
         finally:
             conn.close()
+    return jsonify(counts)
+
+
+def _write_grid(conn: sqlite3.Connection, records: list[dict[str, Any]]) -> dict[str, int]:
+    return {"inserted": insert_grid_snapshots(conn, records)}
+
+
+def _write_assets(conn: sqlite3.Connection, records: list[dict[str, Any]]) -> dict[str, int]:
+    inserted, updated = upsert_assets(conn, records)
+    return {"upserted": inserted + updated, "inserted": inserted, "updated": updated}
+
+
+@app.post("/api/osint/grid/ingest")
+def ingest_grid() -> Any:
+    """Grid rows as pushed by push_grid.py / push_eia930.py; replies {"inserted": n}."""
+    return _ingest("rows", _write_grid)
+
+
+@app.post("/api/osint/assets/ingest")
+def ingest_assets() -> Any:
+    """Asset records as pushed by push_assets.py; replies {"upserted": n, ...}."""
+    return _ingest("assets", _write_assets)
+
+
+@app.get("/api/news")
+@cached_response("articles", db_path=NEWS_DB_PATH, db_mode="ro")
+def news() -> Any:
+    limit = _qint("limit", 20, 100)
+    try:
+        rows = get_read_conn(NEWS_DB_PATH, "ro").execute(
+            """
+            SELECT id, title, url, feed_name, category, published_at, created_at
+            FROM articles
+            ORDER BY COALESCE(published_at, created_at) DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
         return jsonify([dict(row) for row in rows])
     except Exception as exc:
         return jsonify({"error": str(exc), "articles": []}), 503
 
 
+@app.get("/api/digests")
+def digests() -> Any:
+    limit = _qint("limit", 52, 520)
+    try:
+        return jsonify(digest_archive.list_digests(limit))
+    except Exception as exc:
+        return jsonify({"error": str(exc), "digests": []}), 503
+
+
+@app.get("/api/digests/<week_key>")
+def digest(week_key: str) -> Any:
+    """Serve an archived digest: ?format=html (default), plain, or manifest."""
+    fmt = request.args.get("format", "html")
+    try:
+        row = digest_archive.latest_for_week(week_key)
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 503
+    if row is None:
+        return jsonify({"error": f"no archived digest for {week_key}"}), 404
+    if fmt == "manifest":
+        return jsonify(row)
+
+    sha = row["plain_sha256"] if fmt == "plain" else row["html_sha256"]
+    body = digest_archive.get_object(sha)
+    if body is None:
+        return jsonify({"error": "archived object missing", "sha256": sha}), 404
+    if request.if_none_match.contains(sha):
+        return Response(status=304)
+    mimetype = "text/plain" if fmt == "plain" else "text/html"
+    response = Response(body, mimetype=mimetype)
+    # Objects are content-addressed, so the digest is a stable strong validator
+    response.set_etag(sha)
+    return response
+
+
 if __name__ == "__main__":
     app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -2,6 +2,14 @@ import sqlite3
 import os
 
 DB_PATH = os.environ.get("DB_PATH", "articles.db")
+# Articles fetched longer ago than this drop out of the digest candidates,
+# so unsent leftovers in the cached articles.db do not pile up week after week.
+DIGEST_WINDOW_DAYS = int(os.environ.get("DIGEST_WINDOW_DAYS", "7"))
+_IN_WINDOW = "created_at >= datetime('now', ?)"
+
+
+def _window() -> str:
+    return f"-{DIGEST_WINDOW_DAYS} days"
 
 
 def get_conn():
@@ -10,6 +18,12 @@ def get_conn():
     return conn
 
 
+def _ensure_column(conn, table: str, column: str, decl: str):
+    cols = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def init_db():
     with get_conn() as conn:
         conn.execute("""
@@ -25,6 +39,30 @@ def init_db():
                 created_at TEXT DEFAULT (datetime('now'))
             )
         """)
+        # Incremental digest state: processed_at is set once an article has been
+        # deduplicated and keyword-categorized; duplicate marks near-duplicate titles.
+        _ensure_column(conn, "articles", "processed_at", "TEXT")
+        _ensure_column(conn, "articles", "duplicate", "INTEGER DEFAULT 0")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS article_scores (
+                article_id INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                score INTEGER,
+                scored_at TEXT,
+                PRIMARY KEY (article_id, category)
+            )
+        """)
+        conn.execute("DROP INDEX IF EXISTS idx_articles_unsent")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_unsent_window ON articles(sent, created_at)"
+        )
+        # Change counter read by dashboard_api's response cache
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
         conn.commit()
 
 
@@ -42,15 +80,102 @@ def save_article(guid, title, url, feed_name, category, published_at):
                    VALUES (?, ?, ?, ?, ?, ?)""",
                 (guid, title, url, feed_name, category, published_at),
             )
+            conn.execute(
+                """INSERT INTO data_versions (name, version) VALUES ('articles', 1)
+                   ON CONFLICT(name) DO UPDATE SET version = version + 1"""
+            )
             conn.commit()
         except sqlite3.IntegrityError:
             pass  # already exists
 
 
 def get_unsent_articles():
+    """Unsent articles fetched within the digest window."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM articles WHERE sent = 0 AND {_IN_WINDOW} ORDER BY category, feed_name",
+            (_window(),),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def get_unprocessed_articles():
+    """Unsent articles in the digest window not yet deduplicated/categorized."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""SELECT * FROM articles
+                WHERE sent = 0 AND processed_at IS NULL AND {_IN_WINDOW}
+                ORDER BY category, feed_name""",
+            (_window(),),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def get_processed_articles():
+    """Unsent, already-processed, non-duplicate articles in the digest window (the digest candidates)."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""SELECT * FROM articles
+                WHERE sent = 0 AND processed_at IS NOT NULL AND duplicate = 0 AND {_IN_WINDOW}
+                ORDER BY category, feed_name""",
+            (_window(),),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def mark_processed(article_ids: list, duplicate_ids: list = ()):
+    """Record that articles went through dedup + categorization."""
+    if not article_ids:
+        return
+    dupes = set(duplicate_ids)
+    with get_conn() as conn:
+        conn.executemany(
+            """UPDATE articles SET processed_at = datetime('now'), duplicate = ?
+               WHERE id = ?""",
+            [(int(i in dupes), i) for i in article_ids],
+        )
+        conn.commit()
+
+
+def save_category_slots(slots: list):
+    """Insert (article_id, category) pairs awaiting an AI score."""
+    if not slots:
+        return
+    with get_conn() as conn:
+        conn.executemany(
+            """INSERT OR IGNORE INTO article_scores (article_id, category)
+               VALUES (?, ?)""",
+            slots,
+        )
+        conn.commit()
+
+
+def save_scores(scores: list):
+    """Store (article_id, category, score) results from the AI filter."""
+    if not scores:
+        return
+    with get_conn() as conn:
+        conn.executemany(
+            """INSERT INTO article_scores (article_id, category, score, scored_at)
+               VALUES (?, ?, ?, datetime('now'))
+               ON CONFLICT(article_id, category) DO UPDATE SET
+                   score = excluded.score, scored_at = excluded.scored_at""",
+            scores,
+        )
+        conn.commit()
+
+
+def get_scored_slots(unscored_only: bool = False):
+    """Return category slots for unsent articles in the digest window joined with article fields."""
+    clause = "AND s.score IS NULL" if unscored_only else ""
     with get_conn() as conn:
         rows = conn.execute(
-            "SELECT * FROM articles WHERE sent = 0 ORDER BY category, feed_name"
+            f"""SELECT a.*, s.category AS slot_category, s.score, s.scored_at
+                FROM article_scores s
+                JOIN articles a ON a.id = s.article_id
+                WHERE a.sent = 0 AND a.duplicate = 0 AND a.{_IN_WINDOW} {clause}
+                ORDER BY s.category, a.category, a.feed_name""",
+            (_window(),),
         ).fetchall()
         return [dict(r) for r in rows]
 
@@ -0,0 +1,192 @@
+"""
+digest_archive.py — Content-addressed archive of rendered weekly digests.
+
+Rendered HTML/plain bodies are stored once under DIGEST_ARCHIVE_DIR as
+gzip blobs named by their SHA-256. The digest_archive table in articles.db
+indexes each render by week_key with the input hash and the article-id
+manifest, so an identical re-render is served from the archive and the
+dashboard can show past digests without recomputing anything.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from db import DB_PATH, get_conn
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.environ.get("DIGEST_ARCHIVE_DIR", "digest_archive")
+
+_archive_ready = False
+
+
+def init_archive():
+    with get_conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS digest_archive (
+                week_key TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                html_sha256 TEXT NOT NULL,
+                plain_sha256 TEXT NOT NULL,
+                subject TEXT,
+                article_ids TEXT NOT NULL,
+                article_count INTEGER NOT NULL,
+                sent INTEGER DEFAULT 0,
+                rendered_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (week_key, input_hash)
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_digest_archive_hash ON digest_archive(input_hash)"
+        )
+        conn.commit()
+
+
+def _ensure_archive() -> bool:
+    """Create the index table on first read; False when articles.db does not exist.
+
+    The dashboard API reads through this, so serving it never creates
+    articles.db in the working directory. emailer.py calls init_archive().
+    """
+    global _archive_ready
+    if not _archive_ready:
+        if not Path(DB_PATH).exists():
+            return False
+        init_archive()
+        _archive_ready = True
+    return True
+
+
+def week_key_for(now: datetime | None = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    # ISO week-numbering year: 2024-12-30 is 2025-W01, not 2024-W01
+    year, week, _ = now.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def article_manifest(articles: dict) -> list[int]:
+    return sorted({a["id"] for items in articles.values() for a in items if a.get("id") is not None})
+
+
+def input_hash(articles: dict, date_str: str, from_addr: str) -> str:
+    """Hash everything the renderers read, so equal hashes mean equal output."""
+    payload = {
+        "date_str": date_str,
+        "from_addr": from_addr,
+        "categories": [
+            [category, [[a.get("title", ""), a.get("url", ""), a.get("feed_name", "")] for a in items]]
+            for category, items in articles.items()
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _object_path(sha: str) -> Path:
+    return Path(ARCHIVE_DIR) / "objects" / sha[:2] / f"{sha}.gz"
+
+
+def put_object(text: str) -> str:
+    """Store text under its SHA-256 and return the digest; existing blobs are kept."""
+    data = text.encode("utf-8")
+    sha = hashlib.sha256(data).hexdigest()
+    path = _object_path(sha)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(data, mtime=0))
+        os.replace(tmp, path)
+    return sha
+
+
+def get_object(sha: str) -> str | None:
+    path = _object_path(sha)
+    if not path.exists():
+        return None
+    return gzip.decompress(path.read_bytes()).decode("utf-8")
+
+
+def find_render(digest_hash: str) -> tuple[str, str] | None:
+    """Return (html, plain) for a previous render with the same input, if archived."""
+    with get_conn() as conn:
+        row = conn.execute(
+            """SELECT html_sha256, plain_sha256 FROM digest_archive
+               WHERE input_hash = ? ORDER BY rendered_at DESC LIMIT 1""",
+            (digest_hash,),
+        ).fetchone()
+    if row is None:
+        return None
+    html_body = get_object(row["html_sha256"])
+    plain_body = get_object(row["plain_sha256"])
+    if html_body is None or plain_body is None:
+        log.warning(f"Digest archive index points at missing objects for {digest_hash[:12]}")
+        return None
+    return html_body, plain_body
+
+
+def store_render(
+    week_key: str,
+    digest_hash: str,
+    articles: dict,
+    subject: str,
+    html_body: str,
+    plain_body: str,
+) -> None:
+    ids = article_manifest(articles)
+    html_sha = put_object(html_body)
+    plain_sha = put_object(plain_body)
+    with get_conn() as conn:
+        conn.execute(
+            """INSERT OR IGNORE INTO digest_archive
+                   (week_key, input_hash, html_sha256, plain_sha256, subject, article_ids, article_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (week_key, digest_hash, html_sha, plain_sha, subject, json.dumps(ids), len(ids)),
+        )
+        conn.commit()
+    log.info(f"Archived digest {week_key} ({digest_hash[:12]}) with {len(ids)} articles.")
+
+
+def mark_render_sent(week_key: str, digest_hash: str) -> None:
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE digest_archive SET sent = 1 WHERE week_key = ? AND input_hash = ?",
+            (week_key, digest_hash),
+        )
+        conn.commit()
+
+
+def list_digests(limit: int = 52) -> list[dict]:
+    if not _ensure_archive():
+        return []
+    with get_conn() as conn:
+        rows = conn.execute(
+            """SELECT week_key, input_hash, subject, article_count, sent, rendered_at
+               FROM digest_archive
+               ORDER BY rendered_at DESC
+               LIMIT ?""",
+            (limit,),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def latest_for_week(week_key: str) -> dict | None:
+    """Index row for the most recent render of a week (sent renders win)."""
+    if not _ensure_archive():
+        return None
+    with get_conn() as conn:
+        row = conn.execute(
+            """SELECT * FROM digest_archive
+               WHERE week_key = ?
+               ORDER BY sent DESC, rendered_at DESC
+               LIMIT 1""",
+            (week_key,),
+        ).fetchone()
+    if row is None:
+        return None
+    item = dict(row)
+    item["article_ids"] = json.loads(item["article_ids"])
+    return item
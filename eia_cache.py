@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""On-disk cache and streaming reader for EIA v2 API responses.
+
+push_eia930.py and push_assets.py read every EIA response through
+stream_records(), which yields ``response.data`` records as the body
+arrives (iter_array() is an incremental parser over json's raw_decode), so
+neither the raw body nor the parsed page is ever held whole.
+
+EIA data for a closed period does not change, yet push_assets.latest_period()
+probes several months on every run and local debugging re-downloads the same
+5000-row pages. stream_records() keys each response on the endpoint URL plus its
+query parameters sorted, without ``api_key``. The body is stored
+gzip-compressed under EIA_CACHE_DIR (default ``.eia_cache``; ``off``
+disables caching).
+
+How long a response stays fresh depends on how old the period it asked for
+(the ``end`` parameter, else ``start``) is:
+
+    hourly (YYYY-MM-DDTHH)  still open: 5 min, < 2 days: 1 h, < 14 days: 1 day, older: forever
+    monthly (YYYY-MM)       < 90 days after month end: 1 day, older: forever
+    no period               1 h
+
+An empty ``response.data`` is kept at most 6 h whatever its period, because
+EIA publishes periods late: a month that latest_period() probes before its
+release must not stay "empty" in the cache.
+
+    python eia_cache.py status
+    python eia_cache.py purge      # delete expired entries
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, ContextManager, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+EIA_CACHE_DIR = os.environ.get("EIA_CACHE_DIR", ".eia_cache")
+
+HOUR = 3600
+DAY = 24 * HOUR
+EMPTY_TTL = 6 * HOUR
+# Query parameters that do not change the response
+UNKEYED_PARAMS = {"api_key"}
+
+STATS = {"hits": 0, "misses": 0}
+
+# Bytes read from a response (or cache entry) per parser step
+CHUNK_BYTES = 64 * 1024
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+def _enabled() -> bool:
+    return EIA_CACHE_DIR.lower() not in {"", "0", "off", "false"}
+
+
+def cache_key(url: str, params: Iterable[tuple[Any, Any]]) -> str:
+    """Endpoint plus sorted query, without the API key."""
+    query = sorted((str(k), str(v)) for k, v in params if k not in UNKEYED_PARAMS)
+    return hashlib.sha256(f"{url}?{urllib.parse.urlencode(query)}".encode()).hexdigest()
+
+
+def ttl_for(params: Iterable[tuple[Any, Any]], empty: bool, now: datetime | None = None) -> float | None:
+    """Seconds a response stays fresh; None means it never expires."""
+    values = dict((str(k), str(v)) for k, v in params)
+    period = values.get("end") or values.get("start")
+    now = now or datetime.now(timezone.utc)
+    ttl: float | None = HOUR
+    if period:
+        try:
+            closes = datetime.strptime(period, "%Y-%m-%dT%H") + timedelta(hours=1)
+            hourly = True
+        except ValueError:
+            try:
+                month = datetime.strptime(period, "%Y-%m")
+                closes = (month + timedelta(days=32)).replace(day=1)
+                hourly = False
+            except ValueError:
+                closes, hourly = None, False
+        if closes is not None:
+            age = (now - closes.replace(tzinfo=timezone.utc)).total_seconds()
+            if hourly:
+                ttl = 5 * 60 if age < 0 else HOUR if age < 2 * DAY else DAY if age < 14 * DAY else None
+            else:
+                ttl = DAY if age < 90 * DAY else None
+    if empty:
+        ttl = EMPTY_TTL if ttl is None else min(ttl, EMPTY_TTL)
+    return ttl
+
+
+def _path(key: str) -> Path:
+    return Path(EIA_CACHE_DIR) / key[:2] / f"{key}.json.gz"
+
+
+class _Reader:
+    """Incremental JSON tokenizer over a binary stream, CHUNK_BYTES at a time."""
+
+    def __init__(self, fh: BinaryIO) -> None:
+        self.fh = fh
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(CHUNK_BYTES)
+        self.eof = not chunk
+        # Drop what was consumed, so the buffer holds about one chunk
+        self.buf = self.buf[self.pos:] + self.text.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON body")
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"expected one of {expected!r} in JSON body, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number that ends the buffer may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _members(reader: _Reader, path: tuple[str, ...], meta: dict[str, Any]) -> Iterator[Any]:
+    reader.take("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.take(":")
+        if path and key == path[0]:
+            if len(path) > 1:
+                yield from _members(reader, path[1:], meta)
+            else:
+                reader.take("[")
+                if reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.take(",]") == "]":
+                            break
+        else:
+            meta[key] = reader.value()
+        if reader.take(",}") == "}":
+            return
+
+
+def iter_array(fh: BinaryIO, path: tuple[str, ...], meta: dict[str, Any]) -> Iterator[Any]:
+    """Yield the elements of the array at ``path`` in the JSON object read from ``fh``.
+
+    Elements are decoded one at a time as the bytes arrive, so memory holds
+    one chunk and one element rather than the whole body. Every other member
+    met on the way (for EIA, ``total`` and ``request``) is stored in ``meta``
+    under its own key. The stream is read to its end.
+    """
+    reader = _Reader(fh)
+    yield from _members(reader, path, meta)
+    while reader.fill():
+        reader.pos = len(reader.buf)
+
+
+class _Tee:
+    """Read-through wrapper that copies everything read into ``sink``."""
+
+    def __init__(self, fh: BinaryIO, sink: BinaryIO) -> None:
+        self.fh = fh
+        self.sink = sink
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fh.read(size)
+        self.sink.write(data)
+        return data
+
+
+def _open_fresh(path: Path) -> BinaryIO | None:
+    """The cached body, positioned after its header, if present and fresh."""
+    try:
+        fh = gzip.open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        header = json.loads(fh.readline())
+        if header["expires"] is None or header["expires"] >= time.time():
+            return fh
+    except (OSError, EOFError, ValueError, KeyError) as exc:
+        log.warning("Ignoring unreadable EIA cache entry %s: %s", path.name, exc)
+    fh.close()
+    return None
+
+
+def stream_records(
+    url: str,
+    params: list[tuple[Any, Any]],
+    open_response: Callable[[], ContextManager[BinaryIO]],
+    meta: dict[str, Any],
+) -> Iterator[dict[str, Any]]:
+    """Yield the ``response.data`` records for ``url``/``params`` as they are parsed.
+
+    Other response members (``total`` comes before ``data``) land in
+    ``meta``. On a miss ``open_response()`` is streamed and copied into a
+    new cache entry, which is kept only if the body was read to the end.
+    """
+    path = ("response", "data")
+    if not _enabled():
+        with open_response() as resp:
+            yield from iter_array(resp, path, meta)
+        return
+    entry = _path(cache_key(url, params))
+    cached = _open_fresh(entry)
+    if cached is not None:
+        STATS["hits"] += 1
+        with cached:
+            yield from iter_array(cached, path, meta)
+        return
+
+    STATS["misses"] += 1
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    body = entry.with_name(f".{entry.name}.{secrets.token_hex(4)}.body")
+    try:
+        count = 0
+        with open_response() as resp, gzip.open(body, "wb", compresslevel=6) as sink:
+            for record in iter_array(_Tee(resp, sink), path, meta):
+                count += 1
+                yield record
+        if "error" in meta:
+            return
+        # The header's expiry depends on whether data was empty, so it is
+        # written last, as a gzip member of its own in front of the body
+        ttl = ttl_for(params, empty=not count)
+        header = json.dumps({"url": url, "expires": None if ttl is None else time.time() + ttl}).encode()
+        tmp = body.with_suffix(".tmp")
+        with open(tmp, "wb") as out, open(body, "rb") as compressed:
+            out.write(gzip.compress(header + b"\n", compresslevel=6))
+            shutil.copyfileobj(compressed, out)
+        os.replace(tmp, entry)
+    finally:
+        body.unlink(missing_ok=True)
+
+
+def _entries() -> Iterable[tuple[Path, float | None]]:
+    for path in Path(EIA_CACHE_DIR).glob("*/*.json.gz"):
+        try:
+            with gzip.open(path, "rb") as fh:
+                yield path, json.loads(fh.readline())["expires"]
+        except (OSError, EOFError, ValueError, KeyError):
+            yield path, 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="status", choices=("status", "purge"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    now = time.time()
+    entries = list(_entries())
+    expired = [path for path, expires in entries if expires is not None and expires < now]
+    if args.command == "purge":
+        for path in expired:
+            path.unlink(missing_ok=True)
+        log.info("Deleted %d expired of %d entries", len(expired), len(entries))
+        return
+    size = sum(path.stat().st_size for path, _ in entries)
+    permanent = sum(1 for _, expires in entries if expires is None)
+    print(f"{len(entries)} entries ({size / 1e6:.1f} MB): {permanent} permanent, {len(expired)} expired")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+import digest_archive
+
 log = logging.getLogger(__name__)
 
 CATEGORY_ICONS = {
@@ -191,29 +193,61 @@ def render_plain(articles: dict, date_str: str) -> str:
     return "\n".join(lines)
 
 
-def send_email(articles: dict) -> bool:
-    """Send the digest email. Returns True on success."""
+def render_digest(articles: dict, date_str: str, from_addr: str, subject: str) -> tuple[str, str, str, str]:
+    """Return (html, plain, week_key, input_hash), reusing an archived render when
+    the input is unchanged and archiving new renders."""
+    digest_archive.init_archive()
+    week_key = digest_archive.week_key_for()
+    digest_hash = digest_archive.input_hash(articles, date_str, from_addr)
+    cached = digest_archive.find_render(digest_hash)
+    if cached is not None:
+        log.info(f"Digest input unchanged ({digest_hash[:12]}) — reusing archived render.")
+        html_body, plain_body = cached
+    else:
+        plain_body = render_plain(articles, date_str)
+        html_body = render_html(articles, date_str, from_addr)
+    # Index under this week; an identical (week, input) pair is already recorded
+    digest_archive.store_render(week_key, digest_hash, articles, subject, html_body, plain_body)
+    return html_body, plain_body, week_key, digest_hash
+
+
+def send_email(articles: dict, dry_run: bool = False) -> bool:
+    """Send the digest email. Returns True on success.
+
+    With dry_run=True the digest is rendered and archived but not sent, and
+    the return value is False so callers do not mark articles as sent.
+    """
     if not articles:
         log.info("No new articles — skipping email.")
         return False
 
-    smtp_host = os.environ["SMTP_HOST"]
-    smtp_port = int(os.environ.get("SMTP_PORT", 587))
-    smtp_user = os.environ["SMTP_USER"]
-    smtp_pass = os.environ["SMTP_PASS"]
-    from_addr = os.environ.get("FROM_ADDRESS", smtp_user)
-    recipients = [r.strip() for r in os.environ["RECIPIENT_EMAILS"].split(",")]
+    if dry_run:
+        smtp_user = os.environ.get("SMTP_USER", "")
+        from_addr = os.environ.get("FROM_ADDRESS", smtp_user)
+    else:
+        smtp_host = os.environ["SMTP_HOST"]
+        smtp_port = int(os.environ.get("SMTP_PORT", 587))
+        smtp_user = os.environ["SMTP_USER"]
+        smtp_pass = os.environ["SMTP_PASS"]
+        from_addr = os.environ.get("FROM_ADDRESS", smtp_user)
+        recipients = [r.strip() for r in os.environ["RECIPIENT_EMAILS"].split(",")]
 
     date_str = datetime.now().strftime("%A, %B %-d, %Y")
     subject = f"Energy Security Weekly — {date_str}"
 
+    html_body, plain_body, week_key, digest_hash = render_digest(articles, date_str, from_addr, subject)
+
+    if dry_run:
+        log.info(f"Dry run — digest {week_key} rendered and archived, email not sent.")
+        return False
+
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = f"Energy Security Digest <{from_addr}>"
     msg["To"] = ", ".join(recipients)
 
-    msg.attach(MIMEText(render_plain(articles, date_str), "plain"))
-    msg.attach(MIMEText(render_html(articles, date_str, from_addr), "html"))
+    msg.attach(MIMEText(plain_body, "plain"))
+    msg.attach(MIMEText(html_body, "html"))
 
     try:
         with smtplib.SMTP(smtp_host, smtp_port) as server:
@@ -222,7 +256,9 @@ def send_email(articles: dict) -> bool:
             server.login(smtp_user, smtp_pass)
             server.sendmail(from_addr, recipients, msg.as_string())
         log.info(f"Email sent to {len(recipients)} recipient(s) with {sum(len(v) for v in articles.values())} articles.")
-        return True
     except Exception as e:
         log.error(f"Failed to send email: {e}")
         raise
+
+    digest_archive.mark_render_sent(week_key, digest_hash)
+    return True
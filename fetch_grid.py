@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
-"""Fetch current ISO fuel-mix telemetry with gridstatus and store it in osint.db."""
+"""Fetch current ISO fuel-mix telemetry with gridstatus and store it in osint.db.
+
+ISOs are fetched concurrently, each under its own deadline, so one slow
+endpoint no longer stretches the whole run; see fetch_all().
+"""
 from __future__ import annotations
 
 import argparse
+import functools
+import importlib
 import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from datetime import datetime, timezone
 from typing import Any
 
@@ -33,68 +43,97 @@ ISO_TO_BA = {
 }
 
 
-def _load_iso(class_name: str) -> Any:
-    import importlib
+# Seconds an ISO fetch may take before fetch_all() gives up on it.
+FETCH_TIMEOUT = float(os.environ.get("GRID_FETCH_TIMEOUT", "45"))
+# MISO and CAISO are routinely the slowest endpoints.
+ISO_TIMEOUTS = {"MISO": 90.0, "CAISO": 90.0}
+
+# Per-ISO outcome counters and last-run latency for this process.
+ISO_METRICS: dict[str, dict[str, Any]] = {
+    iso: {
+        "runs": 0, "ok": 0, "failed": 0, "timeout": 0, "skipped": 0,
+        "last_status": None, "last_latency_ms": None, "last_rows": 0,
+        "last_error": None, "last_success": None,
+    }
+    for iso in ISO_CLASSES
+}
+
+# Held while an ISO fetch is in flight. A fetch abandoned at its deadline
+# keeps the lock until it returns, so later runs skip that ISO instead of
+# stacking more requests on the same client.
+_in_flight = {iso: threading.Lock() for iso in ISO_CLASSES}
 
+
+@functools.lru_cache(maxsize=None)
+def _load_iso(class_name: str) -> Any:
+    """gridstatus client for ``class_name``, built once per process and reused."""
     module = importlib.import_module("gridstatus")
     return getattr(module, class_name)()
 
 
-def _normalize_timestamp(value: Any, fallback: str) -> str:
-    if value is None:
-        return fallback
-    if hasattr(value, "to_pydatetime"):
-        value = value.to_pydatetime()
-    if isinstance(value, datetime):
-        if value.tzinfo is None:
-            value = value.replace(tzinfo=timezone.utc)
-        return value.astimezone(timezone.utc).isoformat()
-    return str(value)
+# Columns that carry interval times rather than per-fuel values; the first
+# three are, in order, the candidates for a row's timestamp.
+TIME_COLUMNS = ("Time", "Interval Start", "timestamp", "Interval End", "index")
 
 
 def _fuel_rows_from_dataframe(iso: str, data: Any, fetched_at: str) -> list[dict[str, Any]]:
-    rows: list[dict[str, Any]] = []
-    if data is None:
-        return rows
+    """Melt a wide gridstatus fuel-mix frame into one row per (time, fuel).
+
+    Timestamp parsing, numeric coercion and null filtering all run over
+    whole columns: times are normalized to UTC (naive means UTC; missing or
+    unparseable times fall back to ``fetched_at``), fuel columns go through
+    pd.to_numeric, and a NumPy mask over the value matrix drops NaN cells.
+    Rows come out in (time, column) order, ready for insert_grid_snapshots().
+    """
+    import numpy as np
+    import pandas as pd
 
+    if data is None:
+        return []
     if hasattr(data, "reset_index"):
         frame = data.reset_index()
-        records = frame.to_dict("records")
-    elif isinstance(data, list):
-        records = data
     else:
-        records = [data]
+        records = data if isinstance(data, list) else [data]
+        frame = pd.DataFrame([record for record in records if isinstance(record, dict)])
+    if frame.empty:
+        return []
 
-    for record in records:
-        if not isinstance(record, dict):
-            continue
-        timestamp = _normalize_timestamp(
-            record.get("Time") or record.get("Interval Start") or record.get("timestamp"),
-            fetched_at,
+    times = pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns, UTC]")
+    for column in TIME_COLUMNS[:3]:
+        if column in frame:
+            times = times.fillna(pd.to_datetime(frame[column], utc=True, errors="coerce"))
+            if times.notna().all():
+                break
+    # datetime_as_string formats in C; Series.dt.strftime goes row by row
+    seconds = times.dt.tz_convert(None).to_numpy(dtype="datetime64[s]")
+    stamps = np.char.add(np.datetime_as_string(seconds, unit="s"), "+00:00").astype(object)
+    stamps[np.isnat(seconds)] = fetched_at
+
+    fuel_columns = [column for column in frame.columns if column not in TIME_COLUMNS]
+    if not fuel_columns:
+        return []
+    values = frame[fuel_columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    row_idx, col_idx = np.nonzero(~np.isnan(values))
+    fuels = np.array([str(column).strip() for column in fuel_columns], dtype=object)[col_idx]
+
+    region = ISO_TO_BA.get(iso, iso)
+    metadata = {"fetched_at": fetched_at}
+    return [
+        {
+            "region":      region,
+            "region_type": "iso",
+            "source":      "gridstatus",
+            "timestamp":   timestamp,
+            "metric":      "fuel_mix_mw",
+            "fuel":        fuel,
+            "value":       value,
+            "unit":        "MW",
+            "metadata":    metadata,
+        }
+        for timestamp, fuel, value in zip(
+            stamps[row_idx].tolist(), fuels.tolist(), values[row_idx, col_idx].tolist()
         )
-        for key, value in record.items():
-            if key in {"Time", "Interval Start", "Interval End", "timestamp", "index"}:
-                continue
-            if value is None or value == "":
-                continue
-            try:
-                numeric = float(value)
-            except (TypeError, ValueError):
-                continue
-            rows.append(
-                {
-                    "region":      ISO_TO_BA.get(iso, iso),
-                    "region_type": "iso",
-                    "source":      "gridstatus",
-                    "timestamp":   timestamp,
-                    "metric":      "fuel_mix_mw",
-                    "fuel":        str(key).strip(),
-                    "value":       numeric,
-                    "unit":        "MW",
-                    "metadata":    {"fetched_at": fetched_at},
-                }
-            )
-    return rows
+    ]
 
 
 def fetch_iso_fuel_mix(iso: str) -> list[dict[str, Any]]:
@@ -106,28 +145,112 @@ def fetch_iso_fuel_mix(iso: str) -> list[dict[str, Any]]:
     return _fuel_rows_from_dataframe(iso, data, fetched_at)
 
 
-def fetch_all(selected: list[str] | None = None) -> list[dict[str, Any]]:
-    all_rows: list[dict[str, Any]] = []
+def _start_fetch(iso: str) -> Future:
+    """Run fetch_iso_fuel_mix(iso) on a daemon thread; the caller holds _in_flight[iso].
+
+    Not a ThreadPoolExecutor: its workers are joined at interpreter exit, so
+    a hung HTTP call would keep a cron run alive past every deadline.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fetch_iso_fuel_mix(iso))
+                except Exception as exc:
+                    future.set_exception(exc)
+        finally:
+            _in_flight[iso].release()
+
+    threading.Thread(target=run, name=f"fetch-{iso}", daemon=True).start()
+    return future
+
+
+def _record(iso: str, status: str, elapsed: float, rows: int = 0, error: str | None = None) -> None:
+    metrics = ISO_METRICS[iso]
+    metrics["runs"] += 1
+    metrics[status] += 1
+    metrics["last_status"] = status
+    metrics["last_latency_ms"] = round(elapsed * 1000, 1)
+    metrics["last_rows"] = rows
+    metrics["last_error"] = error
+    if status == "ok":
+        metrics["last_success"] = datetime.now(timezone.utc).isoformat()
+
+
+def fetch_all(selected: list[str] | None = None, timeout: float | None = None) -> list[dict[str, Any]]:
+    """Fetch every selected ISO concurrently and return their rows in ISO order.
+
+    Each ISO gets ``timeout`` seconds (default ISO_TIMEOUTS / FETCH_TIMEOUT).
+    An ISO that misses its deadline is abandoned: its rows are dropped and
+    it is skipped until the stuck call returns. Outcomes and latencies are
+    recorded in ISO_METRICS.
+    """
     isos = selected or list(ISO_CLASSES)
+    started = time.monotonic()
+    futures: dict[Future, str] = {}
+    deadlines: dict[str, float] = {}
     for iso in isos:
-        try:
-            rows = fetch_iso_fuel_mix(iso)
-            all_rows.extend(rows)
-            log.info("%s: normalized %s fuel-mix rows", iso, len(rows))
-        except Exception as exc:
-            log.warning("%s: fuel-mix fetch failed: %s", iso, exc)
-    return all_rows
+        if not _in_flight[iso].acquire(blocking=False):
+            log.warning("%s: previous fetch still running; skipped", iso)
+            _record(iso, "skipped", 0.0)
+            continue
+        deadlines[iso] = started + (timeout or ISO_TIMEOUTS.get(iso, FETCH_TIMEOUT))
+        futures[_start_fetch(iso)] = iso
+
+    results: dict[str, list[dict[str, Any]]] = {}
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if deadlines[futures[f]] <= now]:
+            iso = futures[future]
+            pending.discard(future)
+            future.cancel()
+            log.warning("%s: fuel-mix fetch timed out after %.0f s", iso, now - started)
+            _record(iso, "timeout", now - started, error="timeout")
+        if not pending:
+            break
+        done, pending = wait(
+            pending,
+            timeout=min(deadlines[futures[f]] for f in pending) - now,
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            iso = futures[future]
+            elapsed = time.monotonic() - started
+            try:
+                rows = future.result()
+            except Exception as exc:
+                log.warning("%s: fuel-mix fetch failed: %s", iso, exc)
+                _record(iso, "failed", elapsed, error=str(exc))
+                continue
+            results[iso] = rows
+            _record(iso, "ok", elapsed, rows=len(rows))
+            log.info("%s: normalized %s fuel-mix rows in %.1f s", iso, len(rows), elapsed)
+
+    log.info(
+        "Fetched %s/%s ISOs in %.1f s (%s)",
+        len(results),
+        len(isos),
+        time.monotonic() - started,
+        ", ".join(f"{iso} {ISO_METRICS[iso]['last_status']} {ISO_METRICS[iso]['last_latency_ms']:.0f} ms" for iso in isos),
+    )
+    return [row for iso in isos for row in results.get(iso, [])]
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--db", default=None, help="SQLite path; defaults to OSINT_DB_PATH or osint.db")
     parser.add_argument("--iso", action="append", choices=sorted(ISO_CLASSES), help="Limit to one ISO; repeatable")
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="Per-ISO deadline in seconds (default GRID_FETCH_TIMEOUT, 90 for MISO/CAISO)"
+    )
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     init_db(args.db)
-    rows = fetch_all(args.iso)
+    rows = fetch_all(args.iso, args.timeout)
     with get_conn(args.db) as conn:
         inserted = insert_grid_snapshots(conn, rows)
         conn.commit()
@@ -142,8 +142,14 @@ def similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
-def deduplicate(articles: list[dict], threshold: float = 0.85) -> list[dict]:
-    seen = []
+def deduplicate(
+    articles: list[dict],
+    threshold: float = 0.85,
+    seen_titles: list[str] | None = None,
+) -> list[dict]:
+    """Drop near-duplicate titles. ``seen_titles`` holds titles already kept
+    by an earlier run so incremental batches are only compared against them."""
+    seen = list(seen_titles or [])
     unique = []
     for article in articles:
         title = article["title"]
@@ -209,55 +215,75 @@ def score_article(title: str, category: str, client) -> int:
         return 5
 
 
-def ai_filter(categorized: dict) -> dict:
+def get_groq_client():
+    """Return a Groq client, or None when the key or package is unavailable."""
     api_key = os.environ.get("GROQ_API_KEY")
     if not api_key:
         log.warning("GROQ_API_KEY not set — skipping AI filter.")
-        return categorized
+        return None
 
     try:
         from groq import Groq
-        client = Groq(api_key=api_key)
+        return Groq(api_key=api_key)
     except ImportError:
         log.warning("groq package not installed — skipping AI filter.")
-        return categorized
+        return None
 
-    to_score = []
-    for category, articles in categorized.items():
-        for article in articles:
-            to_score.append((category, article))
 
+def score_slots(to_score: list[tuple[str, dict]], client) -> list[tuple[str, dict, int]]:
+    """AI-score (category, article) slots, capped at AI_SCORE_LIMIT."""
     if len(to_score) > AI_SCORE_LIMIT:
         log.warning(f"Capping AI scoring at {AI_SCORE_LIMIT} articles (had {len(to_score)})")
         to_score = to_score[:AI_SCORE_LIMIT]
 
     log.info(f"AI scoring {len(to_score)} articles via Groq...")
 
-    def score_item(item):
-        category, article = item
-        score = score_article(article["title"], category, client)
-        return category, article, score
-
     results = []
-    for item in to_score:
+    for category, article in to_score:
         try:
-            results.append(score_item(item))
+            score = score_article(article["title"], category, client)
+            results.append((category, article, score))
         except Exception as e:
             log.warning(f"Scoring failed: {e}")
+    return results
+
+
+def select_top(results: list[tuple[str, dict, int | None]], per_category: int | None = 10) -> dict:
+    """Apply the relevance threshold and keep the best-scored articles per category.
 
+    A score of None means the slot was never scored (no AI client) and passes.
+    Ties keep their incoming order; ``per_category=None`` keeps every article.
+    """
     filtered: dict = {cat: [] for cat in CATEGORY_ORDER}
     passed = 0
     dropped = 0
     for category, article, score in results:
-        if score >= AI_RELEVANCE_THRESHOLD:
-            filtered[category].append(article)
+        if score is None or score >= AI_RELEVANCE_THRESHOLD:
+            filtered.setdefault(category, []).append((score, article))
             passed += 1
         else:
             dropped += 1
             log.info(f"  DROPPED (score {score}): {article['title'][:80]}")
 
     log.info(f"AI filter: {passed} passed, {dropped} dropped.")
-    return {k: v[:10] for k, v in filtered.items() if v}
+    return {
+        k: [a for _, a in sorted(v, key=lambda pair: -(pair[0] or 0))][:per_category]
+        for k, v in filtered.items()
+        if v
+    }
+
+
+def ai_filter(categorized: dict) -> dict:
+    client = get_groq_client()
+    if client is None:
+        return categorized
+
+    to_score = []
+    for category, articles in categorized.items():
+        for article in articles:
+            to_score.append((category, article))
+
+    return select_top(score_slots(to_score, client))
 
 
 def filter_and_categorize(articles: list[dict]) -> dict:
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Streaming anomaly detection over grid telemetry, writing grid_alerts.
+
+osint_db.insert_grid_snapshots() calls detect_grid_anomalies() with the id
+watermark it took before inserting, so every new sample is seen exactly once
+by both ingest paths (fetch_grid.py and the /api/osint/grid/ingest route fed
+by push_eia930.py / push_grid.py). History is never rescanned: each series
+(one grid_series row, i.e. region/metric/fuel/unit) carries a fixed-size row
+in grid_detector_state that is updated in O(1) per sample:
+
+* an exponentially weighted level (mean) with a time-based decay,
+  so 5-minute ISO feeds and hourly EIA-930 feeds age at the same rate;
+* an hour-of-week baseline, 168 float32 EW means packed into one BLOB;
+* an EW variance of the residual against that baseline.
+
+Three kinds of alert are raised:
+
+* deviation - a sample GRID_ALERT_Z or more residual standard deviations
+  from its baseline (after a warm-up, and once its hour of the week has
+  been seen), at most once per cooldown window;
+* drop_off  - a fuel's output falling by GRID_DROP_FRACTION or more between
+  consecutive samples and to at most (1 - GRID_DROP_FRACTION) of its
+  hour-of-week baseline, so solar setting every evening is not an alert;
+* stale     - a series that was reporting but has not advanced for
+  GRID_STALE_FACTOR of its usual interval (at least GRID_STALE_MIN_HOURS),
+  measured after an ingest against the newest sample of its source.
+
+Samples older than ALERT_HORIZON (backfills, late EIA revisions) update the
+state but never alert. Run directly to check for stale feeds and list
+recent alerts:
+
+    python grid_anomaly.py --hours 24
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Collection
+
+from osint_db import bump_data_version, get_conn, init_db
+
+log = logging.getLogger(__name__)
+
+GRID_ALERT_Z = float(os.environ.get("GRID_ALERT_Z", "4"))
+GRID_DROP_FRACTION = float(os.environ.get("GRID_DROP_FRACTION", "0.5"))
+GRID_STALE_FACTOR = float(os.environ.get("GRID_STALE_FACTOR", "6"))
+GRID_STALE_MIN_HOURS = float(os.environ.get("GRID_STALE_MIN_HOURS", "3"))
+
+# Samples needed before a series' baseline is trusted for deviation alerts.
+WARMUP_SAMPLES = 24
+# Decay time constants (seconds of sample time) for the level, the residual
+# variance and the sample interval; the seasonal slots forget over weeks.
+LEVEL_TAU = 6 * 3600
+RESIDUAL_TAU = 3 * 86400
+INTERVAL_TAU = 86400
+SEASON_WEEKS = 4
+# Deviation alerts for one series are at least this far apart.
+ALERT_COOLDOWN = 3600
+# Drop-offs are only judged for fuels averaging at least this much output.
+DROP_MIN_LEVEL = 50.0
+# Only samples (and stale feeds) this recent relative to now raise alerts.
+ALERT_HORIZON = timedelta(days=7)
+
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday; shift so hour-of-week 0 is Monday 00:00 UTC.
+_EPOCH_WEEKDAY_HOURS = 3 * 24
+
+_STATE_COLUMNS = (
+    "series_id, last_ts, last_value, n, mean, resid_var, interval, last_alert_ts, stale_alerted, seasonal"
+)
+
+
+def _hour_of_week(ts: int) -> int:
+    return (ts // 3600 + _EPOCH_WEEKDAY_HOURS) % HOURS_PER_WEEK
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class SeriesState:
+    """Rolling statistics of one series; see the module docstring."""
+
+    __slots__ = (
+        "series_id", "last_ts", "last_value", "n", "mean",
+        "resid_var", "interval", "last_alert_ts", "stale_alerted", "seasonal",
+    )
+
+    def __init__(self, series_id: int, ts: int, value: float) -> None:
+        self.series_id = series_id
+        self.last_ts = ts
+        self.last_value = value
+        self.n = 1
+        self.mean = value
+        self.resid_var = 0.0
+        self.interval: float | None = None
+        self.last_alert_ts: int | None = None
+        self.stale_alerted = 0
+        self.seasonal = array("f", [math.nan]) * HOURS_PER_WEEK
+        self.seasonal[_hour_of_week(ts)] = value
+
+    @classmethod
+    def from_row(cls, row: tuple[Any, ...]) -> SeriesState:
+        state = cls.__new__(cls)
+        (
+            state.series_id, state.last_ts, state.last_value, state.n, state.mean,
+            state.resid_var, state.interval, state.last_alert_ts, state.stale_alerted, blob,
+        ) = row
+        state.seasonal = array("f")
+        state.seasonal.frombytes(blob)
+        return state
+
+    def to_row(self) -> tuple[Any, ...]:
+        return (
+            self.series_id, self.last_ts, self.last_value, self.n, self.mean,
+            self.resid_var, self.interval, self.last_alert_ts, self.stale_alerted, self.seasonal.tobytes(),
+        )
+
+    def baseline(self, ts: int) -> float:
+        seasonal = self.seasonal[_hour_of_week(ts)]
+        return self.mean if math.isnan(seasonal) else seasonal
+
+    def residual_sd(self, baseline: float) -> float:
+        # Floors keep flat series (e.g. nuclear) from alerting on rounding noise
+        return max(math.sqrt(self.resid_var), 0.01 * abs(baseline), 1e-6)
+
+    def update(self, ts: int, value: float) -> tuple[float, float]:
+        """Fold in a sample newer than last_ts; return (baseline, z) it was judged on."""
+        dt = ts - self.last_ts
+        baseline = self.baseline(ts)
+        sd = self.residual_sd(baseline)
+        residual = value - baseline
+        z = residual / sd
+        # Winsorize so a single outlier cannot inflate the variance it is judged by
+        clipped = max(-GRID_ALERT_Z * sd, min(GRID_ALERT_Z * sd, residual))
+
+        alpha = 1.0 - math.exp(-dt / RESIDUAL_TAU)
+        self.resid_var = (1.0 - alpha) * self.resid_var + alpha * clipped * clipped if self.n > 1 else clipped * clipped
+        alpha = 1.0 - math.exp(-dt / LEVEL_TAU)
+        self.mean += alpha * (value - self.mean)
+        alpha = 1.0 - math.exp(-dt / INTERVAL_TAU)
+        self.interval = dt if self.interval is None else self.interval + alpha * (dt - self.interval)
+        # Per-slot weight adds up to 1/SEASON_WEEKS per week at any sample rate
+        slot = _hour_of_week(ts)
+        if math.isnan(self.seasonal[slot]):
+            self.seasonal[slot] = value
+        else:
+            alpha = min(1.0, dt / (SEASON_WEEKS * 3600))
+            self.seasonal[slot] += alpha * (value - self.seasonal[slot])
+
+        self.last_ts = ts
+        self.last_value = value
+        self.n += 1
+        self.stale_alerted = 0
+        return baseline, z
+
+
+def _label(series: tuple[str, ...]) -> str:
+    region, _, _, metric, fuel, _ = series
+    return f"{region} {metric}/{fuel}" if fuel else f"{region} {metric}"
+
+
+def _alert(
+    series: tuple[str, ...],
+    ts: int,
+    severity: str,
+    kind: str,
+    message: str,
+    value: float | None,
+    threshold: float | None,
+    **extra: Any,
+) -> dict[str, Any]:
+    region, region_type, source, metric, fuel, unit = series
+    metadata = {"kind": kind, "fuel": fuel or None, "unit": unit or None, **extra}
+    return {
+        "region": region,
+        "region_type": region_type,
+        "source": source,
+        "timestamp": _iso(ts),
+        "metric": metric,
+        "severity": severity,
+        "message": message,
+        "value": value,
+        "threshold": threshold,
+        "metadata_json": json.dumps(metadata, sort_keys=True),
+    }
+
+
+def _judge(
+    state: SeriesState,
+    series: tuple[str, ...],
+    ts: int,
+    value: float,
+    horizon: int,
+) -> list[dict[str, Any]]:
+    """Update ``state`` with one sample and return the alerts it raises."""
+    previous, dt, warm = state.last_value, ts - state.last_ts, state.n >= WARMUP_SAMPLES
+    level, interval = state.mean, state.interval or dt
+    # Until this hour of the week has been seen, the baseline is the level,
+    # which says nothing about a fuel's daily shape
+    seasonal = not math.isnan(state.seasonal[_hour_of_week(ts)])
+    baseline, z = state.update(ts, value)
+    if ts < horizon:
+        return []
+
+    alerts = []
+    unit = f" {series[5]}" if series[5] else ""
+    if (
+        series[4]
+        and level >= DROP_MIN_LEVEL
+        and previous >= DROP_MIN_LEVEL
+        and value <= previous * (1.0 - GRID_DROP_FRACTION)
+        and seasonal
+        and value <= baseline * (1.0 - GRID_DROP_FRACTION)
+        and dt <= 3 * interval
+    ):
+        alerts.append(
+            _alert(
+                series, ts, "critical" if value <= 0.1 * previous else "warning", "drop_off",
+                f"{_label(series)} fell {1 - value / previous:.0%} in {dt // 60} min "
+                f"({previous:,.0f} -> {value:,.0f}{unit})",
+                value, previous * (1.0 - GRID_DROP_FRACTION),
+                previous=previous, seconds=dt, baseline=round(baseline, 3),
+            )
+        )
+    # A drop-off is the more specific report of the same sample
+    elif warm and seasonal and abs(z) >= GRID_ALERT_Z and (state.last_alert_ts is None or ts - state.last_alert_ts >= ALERT_COOLDOWN):
+        bound = baseline + math.copysign(GRID_ALERT_Z * state.residual_sd(baseline), z)
+        alerts.append(
+            _alert(
+                series, ts, "critical" if abs(z) >= 2 * GRID_ALERT_Z else "warning", "deviation",
+                f"{_label(series)} {value:,.0f}{unit} is {z:+.1f} sd from its hour-of-week baseline {baseline:,.0f}",
+                value, bound,
+                baseline=round(baseline, 3), z=round(z, 2),
+            )
+        )
+    if alerts:
+        state.last_alert_ts = ts
+    return alerts
+
+
+def check_stale_feeds(
+    conn: sqlite3.Connection,
+    now: datetime | None = None,
+    touched: Collection[int] = (),
+) -> list[dict[str, Any]]:
+    """Alert once for each recently live series that has stopped advancing.
+
+    After an ingest, pass the series it advanced as ``touched``: they are
+    skipped, and the rest are aged against the newest sample of their own
+    source rather than ``now``, so replaying past hours (a backfill, a spool
+    catch-up, EIA's reporting lag) does not make live feeds look stale.
+    """
+    now_ts = int((now or datetime.now(timezone.utc)).timestamp())
+    floor = GRID_STALE_MIN_HOURS * 3600
+    rows = conn.execute(
+        """
+        SELECT d.series_id, d.last_ts, d.last_value, d.interval,
+               CASE WHEN :relative THEN MIN(newest.ts, :now) ELSE :now END,
+               s.region, s.region_type, s.source, s.metric, s.fuel, s.unit
+        FROM grid_detector_state d
+        JOIN grid_series s ON s.series_id = d.series_id
+        JOIN (
+            SELECT s.source, MAX(d.last_ts) AS ts
+            FROM grid_detector_state d
+            JOIN grid_series s ON s.series_id = d.series_id
+            GROUP BY s.source
+        ) newest ON newest.source = s.source
+        WHERE d.stale_alerted = 0 AND d.last_ts >= :horizon
+          AND d.series_id NOT IN (SELECT value FROM json_each(:touched))
+        """,
+        {
+            "relative": bool(touched),
+            "now": now_ts,
+            "horizon": now_ts - int(ALERT_HORIZON.total_seconds()),
+            "touched": json.dumps(sorted(touched)),
+        },
+    ).fetchall()
+    alerts, stale = [], []
+    for series_id, last_ts, last_value, interval, reference, *series in rows:
+        allowed = max(floor, GRID_STALE_FACTOR * (interval or 0))
+        age = reference - last_ts
+        if age < allowed:
+            continue
+        stale.append((series_id,))
+        alerts.append(
+            _alert(
+                tuple(series), reference, "warning", "stale",
+                f"{_label(tuple(series))} feed stale: last sample {_iso(last_ts)} ({age / 3600:.1f} h ago)",
+                last_value, allowed / 3600,
+                last_timestamp=_iso(last_ts), age_hours=round(age / 3600, 2),
+            )
+        )
+    conn.executemany("UPDATE grid_detector_state SET stale_alerted = 1 WHERE series_id = ?", stale)
+    return alerts
+
+
+def detect_grid_anomalies(
+    conn: sqlite3.Connection,
+    since_id: int,
+    now: datetime | None = None,
+) -> list[dict[str, Any]]:
+    """Run new samples (id > since_id) through the detectors and store alerts.
+
+    Called inside the ingest transaction. Samples at or before a series'
+    last_ts (out-of-order or revised values) are skipped. Returns the
+    alerts inserted into grid_alerts.
+    """
+    now = now or datetime.now(timezone.utc)
+    horizon = int((now - ALERT_HORIZON).timestamp())
+    samples = conn.execute(
+        "SELECT series_id, ts, value FROM grid_samples WHERE id > ? ORDER BY series_id, ts",
+        (since_id,),
+    ).fetchall()
+
+    alerts: list[dict[str, Any]] = []
+    if samples:
+        ids_json = json.dumps(sorted({row[0] for row in samples}))
+        series = {
+            row[0]: tuple(row[1:])
+            for row in conn.execute(
+                "SELECT series_id, region, region_type, source, metric, fuel, unit FROM grid_series "
+                "WHERE series_id IN (SELECT value FROM json_each(?))",
+                (ids_json,),
+            )
+        }
+        states = {
+            row[0]: SeriesState.from_row(row)
+            for row in conn.execute(
+                f"SELECT {_STATE_COLUMNS} FROM grid_detector_state "
+                "WHERE series_id IN (SELECT value FROM json_each(?))",
+                (ids_json,),
+            )
+        }
+        for series_id, ts, value in samples:
+            state = states.get(series_id)
+            if state is None:
+                states[series_id] = SeriesState(series_id, ts, value)
+            elif ts > state.last_ts:
+                alerts.extend(_judge(state, series[series_id], ts, value, horizon))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO grid_detector_state ({_STATE_COLUMNS}) VALUES ({', '.join('?' * 10)})",
+            [state.to_row() for state in states.values()],
+        )
+
+    alerts.extend(check_stale_feeds(conn, now, touched={row[0] for row in samples}))
+    _store_alerts(conn, alerts)
+    return alerts
+
+
+def _store_alerts(conn: sqlite3.Connection, alerts: list[dict[str, Any]]) -> None:
+    if not alerts:
+        return
+    conn.executemany(
+        """
+        INSERT INTO grid_alerts
+            (region, region_type, source, timestamp, metric, severity, message, value, threshold, metadata_json)
+        VALUES (:region, :region_type, :source, :timestamp, :metric, :severity, :message, :value, :threshold, :metadata_json)
+        """,
+        alerts,
+    )
+    bump_data_version(conn, "grid_alerts")
+    log.info("Raised %s grid alerts", len(alerts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=None, help="SQLite path; defaults to OSINT_DB_PATH or osint.db")
+    parser.add_argument("--hours", type=float, default=24, help="list alerts raised in the last N hours")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    init_db(args.db)
+    with get_conn(args.db) as conn:
+        _store_alerts(conn, check_stale_feeds(conn))
+        conn.commit()
+        since = (datetime.now(timezone.utc) - timedelta(hours=args.hours)).isoformat()
+        for row in conn.execute(
+            "SELECT timestamp, severity, message FROM grid_alerts WHERE created_at >= datetime(?) ORDER BY id",
+            (since,),
+        ):
+            print(f"{row[0]}  {row[1]:<8}  {row[2]}")
+
+
+if __name__ == "__main__":
+    main()
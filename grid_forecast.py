@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Demand forecast error per balancing authority: EIA-930 DF vs D.
+
+push_eia930.py ingests ``demand_forecast_mwh`` (DF) and ``demand_mwh`` (D)
+for every BA. refresh_forecast_errors() runs inside insert_grid_snapshots()
+and pairs the two by (region, source, hour) with pandas. An hour is counted exactly
+once, in the call that stores the second of its two values. Each hour is
+added to grid_forecast_error_daily as additive sums (count, APE, signed,
+absolute and squared error, actual MWh), so MAPE, bias and RMSE over any
+window are a SUM over at most ``days`` rows per BA. /api/grid/forecast-error
+ranks 60+ BAs with one small aggregate instead of a recompute.
+
+Hours whose actual demand is missing or not positive (EIA placeholders) are
+skipped. Values are never revised in place (insert_grid_snapshots ignores
+duplicates), so a counted hour stays correct.
+
+    python grid_forecast.py --days 7     # print the current ranking
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import sqlite3
+from typing import Any
+
+from osint_db import bump_data_version, get_conn, init_db
+
+FORECAST_METRIC = "demand_forecast_mwh"
+ACTUAL_METRIC = "demand_mwh"
+# Forecast and actual pair up within one (region, region_type, source)
+REGION_KEY = ("region", "region_type", "source")
+
+_UPSERT_DAILY = """
+    INSERT INTO grid_forecast_error_daily
+        (region, region_type, source, day, n, ape_sum, err_sum, abs_err_sum, sq_err_sum, actual_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(region, region_type, source, day) DO UPDATE SET
+        n = n + excluded.n,
+        ape_sum = ape_sum + excluded.ape_sum,
+        err_sum = err_sum + excluded.err_sum,
+        abs_err_sum = abs_err_sum + excluded.abs_err_sum,
+        sq_err_sum = sq_err_sum + excluded.sq_err_sum,
+        actual_sum = actual_sum + excluded.actual_sum
+"""
+
+
+def refresh_forecast_errors(conn: sqlite3.Connection, since_id: int) -> int:
+    """Fold hours completed by samples with id > since_id; return how many."""
+    series = conn.execute(
+        "SELECT series_id, region, region_type, source, metric FROM grid_series WHERE metric IN (?, ?)",
+        (FORECAST_METRIC, ACTUAL_METRIC),
+    ).fetchall()
+    if not series:
+        return 0
+    placeholders = ", ".join("?" * len(series))
+    ids = [row[0] for row in series]
+    lo, hi = conn.execute(
+        f"SELECT MIN(ts), MAX(ts) FROM grid_samples WHERE id > ? AND series_id IN ({placeholders})",
+        (since_id, *ids),
+    ).fetchone()
+    if lo is None:
+        return 0
+
+    import pandas as pd
+
+    # Both sides of every hour the new samples touch; (series_id, ts) is the
+    # partitions' unique index, so this is one range seek per series.
+    samples = pd.read_sql_query(
+        f"SELECT id, series_id, ts, value FROM grid_samples WHERE series_id IN ({placeholders}) AND ts BETWEEN ? AND ?",
+        conn,
+        params=(*ids, lo, hi),
+    )
+    names = pd.DataFrame(series, columns=["series_id", *REGION_KEY, "metric"]).set_index("series_id")
+    samples = samples.join(names, on="series_id")
+    wide = samples.groupby([*REGION_KEY, "ts", "metric"]).agg(value=("value", "first"), id=("id", "max")).unstack("metric")
+    if ("value", FORECAST_METRIC) not in wide or ("value", ACTUAL_METRIC) not in wide:
+        return 0
+    forecast = wide[("value", FORECAST_METRIC)]
+    actual = wide[("value", ACTUAL_METRIC)]
+    newest = wide["id"].max(axis=1)
+    keep = forecast.notna() & (actual > 0) & (newest > since_id)
+    if not keep.any():
+        return 0
+
+    forecast, actual = forecast[keep], actual[keep]
+    err = forecast - actual
+    hours = pd.DataFrame(
+        {
+            "n": 1,
+            "ape_sum": err.abs() / actual,
+            "err_sum": err,
+            "abs_err_sum": err.abs(),
+            "sq_err_sum": err * err,
+            "actual_sum": actual,
+        }
+    )
+    ts = hours.index.get_level_values("ts")
+    hours["day"] = pd.to_datetime(ts // 86400 * 86400, unit="s").strftime("%Y-%m-%d")
+    hours.index = hours.index.droplevel("ts")
+    daily = hours.groupby([*REGION_KEY, "day"]).sum()
+    conn.executemany(
+        _UPSERT_DAILY,
+        (
+            (*key, int(row.n), row.ape_sum, row.err_sum, row.abs_err_sum, row.sq_err_sum, row.actual_sum)
+            for key, row in zip(daily.index, daily.itertuples(index=False))
+        ),
+    )
+    bump_data_version(conn, "grid_forecast_error")
+    return int(keep.sum())
+
+
+def forecast_error_ranking(
+    conn: sqlite3.Connection,
+    days: int,
+    end: str | None = None,
+) -> list[dict[str, Any]]:
+    """Per-BA MAPE/bias/RMSE over the ``days`` UTC days ending ``end``, worst MAPE first.
+
+    ``end`` defaults to the newest day with data, because EIA-930 actuals
+    lag the clock by hours and some BAs by days.
+    """
+    rows = conn.execute(
+        """
+        WITH bounds AS (
+            SELECT COALESCE(?, MAX(day)) AS end_day FROM grid_forecast_error_daily
+        )
+        SELECT region, region_type, source, SUM(n) AS hours,
+               SUM(ape_sum) / SUM(n) AS mape,
+               SUM(err_sum) / SUM(n) AS bias_mwh,
+               SUM(err_sum) / SUM(actual_sum) AS bias_pct,
+               SUM(sq_err_sum) / SUM(n) AS mse,
+               MIN(day) AS first_day, MAX(day) AS last_day
+        FROM grid_forecast_error_daily, bounds
+        WHERE day > date(end_day, ?) AND day <= end_day
+        GROUP BY region, region_type, source
+        ORDER BY mape DESC
+        """,
+        (end, f"-{days} days"),
+    ).fetchall()
+    ranking = []
+    for row in rows:
+        item = dict(zip((*REGION_KEY, "hours", "mape", "bias_mwh", "bias_pct", "mse", "first_day", "last_day"), row))
+        # SQLite's SQRT() is an optional build feature
+        item["rmse_mwh"] = math.sqrt(item.pop("mse"))
+        ranking.append(item)
+    return ranking
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=None, help="SQLite path; defaults to OSINT_DB_PATH or osint.db")
+    parser.add_argument("--days", type=int, default=7, help="window length in UTC days")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    with get_conn(args.db) as conn:
+        for row in forecast_error_ranking(conn, args.days):
+            print(
+                f"{row['region']:<6} {row['hours']:>5} h  MAPE {row['mape']:7.2%}  "
+                f"bias {row['bias_pct']:+7.2%} ({row['bias_mwh']:+10,.0f} MWh)  RMSE {row['rmse_mwh']:10,.0f} MWh"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Partition maintenance for grid samples in osint.db.
+
+Grid samples live in one compact table per UTC month; grid_samples and
+grid_snapshots are views over them. Run this daily (or
+from cron next to fetch_grid.py):
+
+    python grid_maintenance.py                      # rollover + retention + VACUUM if anything was dropped
+    python grid_maintenance.py --retention-days 90  # override GRID_RETENTION_DAYS
+    python grid_maintenance.py status               # list partitions
+
+rollover pre-creates this month's and next month's partitions so ingest
+never runs DDL at a month boundary; retention drops raw samples older than
+the retention window (hourly/daily rollups keep their aggregates) and
+VACUUM returns the freed pages to the filesystem.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from osint_db import (
+    GRID_RETENTION_DAYS,
+    apply_grid_retention,
+    ensure_grid_partitions,
+    get_conn,
+    grid_partitions,
+    init_db,
+)
+
+log = logging.getLogger(__name__)
+
+
+def rollover(conn: sqlite3.Connection, now: datetime | None = None) -> list[str]:
+    now = now or datetime.now(timezone.utc)
+    next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return ensure_grid_partitions(conn, [now.strftime("%Y-%m"), next_month.strftime("%Y-%m")])
+
+
+def status(conn: sqlite3.Connection) -> None:
+    for name in grid_partitions(conn):
+        count, first, last = conn.execute(
+            f"SELECT COUNT(*), datetime(MIN(ts), 'unixepoch'), datetime(MAX(ts), 'unixepoch') FROM {name}"
+        ).fetchone()
+        print(f"{name}  {count:>10} rows  {first or '-'} .. {last or '-'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="all", choices=("all", "rollover", "retain", "vacuum", "status"))
+    parser.add_argument("--db", default=None, help="SQLite path; defaults to OSINT_DB_PATH or osint.db")
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=GRID_RETENTION_DAYS,
+        help="keep raw samples this many days (default GRID_RETENTION_DAYS; 0 keeps everything)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    init_db(args.db)
+    conn = get_conn(args.db)
+    try:
+        if args.command == "status":
+            status(conn)
+            return
+
+        vacuum = args.command == "vacuum"
+        if args.command in {"all", "rollover"}:
+            log.info("Partitions ready: %s", ", ".join(rollover(conn)))
+        if args.command in {"all", "retain"}:
+            if args.retention_days > 0:
+                result = apply_grid_retention(conn, args.retention_days)
+                log.info(
+                    "Retention cutoff %s: dropped %s, deleted %s raw rows",
+                    result["cutoff"],
+                    ", ".join(result["dropped_partitions"]) or "no partitions",
+                    result["deleted_rows"],
+                )
+                vacuum = vacuum or bool(result["deleted_rows"])
+            else:
+                log.info("Retention disabled (--retention-days 0)")
+        conn.commit()
+
+        if vacuum:
+            # Needs no open transaction; rewrites the file without the dropped pages
+            log.info("VACUUM…")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ Modes:
   python main.py               # digest mode (default) — fetch + AI filter + send email
   python main.py --mode digest # same as above
   python main.py --mode curate # fetch + push to curator only, no email sent
+  python main.py --mode score  # fetch + dedup/categorize/AI-score new articles only
+  python main.py --dry-run     # digest mode, render + archive only, nothing sent
+
+Digest mode reuses the dedup/categorization/scores stored by earlier score
+runs, so at send time only the articles that arrived since the last run
+are scored before ranking and rendering.
 """
 import argparse
 import json
@@ -17,9 +23,27 @@ from collections import Counter
 from datetime import datetime, timezone
 
 from aggregator import aggregate
-from db import get_unsent_articles, mark_sent
+from db import (
+    get_processed_articles,
+    get_scored_slots,
+    get_unprocessed_articles,
+    get_unsent_articles,
+    mark_processed,
+    mark_sent,
+    save_category_slots,
+    save_scores,
+)
 from emailer import send_email
-from filter import deduplicate, filter_and_categorize, categorize, CATEGORY_SPECIFICITY
+from filter import (
+    AI_SCORE_LIMIT,
+    CATEGORY_SPECIFICITY,
+    categorize,
+    deduplicate,
+    get_groq_client,
+    resolve_cross_category_duplicates,
+    score_slots,
+    select_top,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger(__name__)
@@ -148,6 +172,63 @@ def print_weekly_stats(
     log.info("=" * 55)
 
 
+def process_new_articles(client) -> None:
+    """Dedup, categorize and AI-score articles that arrived since the last run.
+
+    New titles are only compared against titles kept within DIGEST_WINDOW_DAYS, and
+    only slots without a stored score are sent to Groq. Anything past
+    AI_SCORE_LIMIT stays unscored and is picked up by the next run.
+    """
+    new = get_unprocessed_articles()
+    if new:
+        known = get_processed_articles()
+        unique = deduplicate(new, seen_titles=[a["title"] for a in known])
+        kept_ids = {a["id"] for a in unique}
+        slots = [(a["id"], cat) for a in unique for cat in categorize(a)]
+        save_category_slots(slots)
+        mark_processed(
+            [a["id"] for a in new],
+            [a["id"] for a in new if a["id"] not in kept_ids],
+        )
+        log.info(
+            f"Processed {len(new)} new articles: {len(new) - len(unique)} duplicates, "
+            f"{len(slots)} category slots queued for scoring."
+        )
+
+    if client is None:
+        return
+
+    pending = get_scored_slots(unscored_only=True)
+    if not pending:
+        log.info("No unscored category slots.")
+        return
+    if len(pending) > AI_SCORE_LIMIT:
+        log.info(f"{len(pending) - AI_SCORE_LIMIT} slots deferred to the next run.")
+    results = score_slots([(row["slot_category"], row) for row in pending], client)
+    save_scores([(article["id"], category, score) for category, article, score in results])
+
+
+def build_digest_from_scores(client) -> dict:
+    """Rank stored scores and take the top 10 per category — no AI calls.
+
+    Without an AI client nothing was scored, so, as before the scores were
+    stored, every keyword-categorized article passes through uncapped.
+    """
+    article_fields = (
+        "id", "guid", "title", "url", "feed_name", "category", "published_at", "created_at",
+    )
+    results = []
+    for row in get_scored_slots():
+        # Slots left unscored only count when no AI client is configured,
+        # matching the legacy behaviour of skipping the AI filter entirely.
+        if row["score"] is None and client is not None:
+            continue
+        article = {k: row[k] for k in article_fields}
+        results.append((row["slot_category"], article, row["score"]))
+    per_category = 10 if client is not None else None
+    return resolve_cross_category_duplicates(select_top(results, per_category))
+
+
 def get_emailed_article_ids(categorized: dict, deduplicated_articles: list[dict]) -> list[int]:
     """Return unique DB IDs for articles that were actually included in the digest."""
     url_to_id = {
@@ -172,9 +253,17 @@ def main():
     parser = argparse.ArgumentParser(description="Energy Security Aggregator")
     parser.add_argument(
         "--mode",
-        choices=["digest", "curate"],
+        choices=["digest", "curate", "score"],
         default="digest",
-        help="digest: fetch + AI filter + send email (default). curate: fetch + push to curator only, no email.",
+        help=(
+            "digest: fetch + AI filter + send email (default). curate: fetch + push to "
+            "curator only, no email. score: fetch + score new articles for the next digest."
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="digest mode: render and archive the digest without sending it or marking articles sent.",
     )
     args = parser.parse_args()
     mode = args.mode
@@ -183,45 +272,56 @@ def main():
     # 1. Fetch new articles from all feeds and store in DB
     aggregate()
 
-    # 2. Get all articles not yet sent
-    articles = get_unsent_articles()
-    raw_count = len(articles)
-    log.info(f"{raw_count} unsent articles ready.")
+    if mode == "curate":
+        # Curate mode: push to curator only, no email, no marking as sent
+        articles = get_unsent_articles()
+        log.info(f"{len(articles)} unsent articles ready.")
+        if not articles:
+            log.info("No new articles found.")
+            return
+        articles = deduplicate(articles)
+        log.info(f"{len(articles)} articles after deduplication.")
+        push_to_curator(articles, mode)
+        log.info("Curate mode complete — no email sent, articles not marked as sent.")
+        return
 
-    if not articles:
-        log.info("No new articles found.")
+    # 2. Dedup, categorize and score whatever arrived since the last run
+    client = get_groq_client()
+    process_new_articles(client)
+
+    if mode == "score":
+        log.info("Score mode complete — results stored for the weekly digest.")
         return
 
-    # 3. Deduplicate
-    articles = deduplicate(articles)
+    # Digest mode: rank precomputed state and render
+    raw_count = len(get_unsent_articles())
+    articles = get_processed_articles()
     dedup_count = len(articles)
-    log.info(f"{dedup_count} articles after deduplication.")
+    log.info(f"{raw_count} unsent articles, {dedup_count} after deduplication.")
 
-    if mode == "curate":
-        # Curate mode: push to curator only, no email, no marking as sent
-        push_to_curator(articles, mode)
-        log.info("Curate mode complete — no email sent, articles not marked as sent.")
+    if not articles:
+        log.info("No new articles found.")
         return
 
-    # Digest mode: full pipeline
-    # 4. Push to curator alongside digest run
-    push_to_curator(articles, mode)
+    # 3. Push to curator alongside digest run
+    if not args.dry_run:
+        push_to_curator(articles, mode)
 
-    # 5. Run keyword filter and categorize (includes AI scoring)
-    categorized = filter_and_categorize(articles)
+    # 4. Rank stored scores and take the top articles per category
+    categorized = build_digest_from_scores(client)
     for cat, items in categorized.items():
         log.info(f"  {cat}: {len(items)} articles")
 
-    # 6. Send the email digest
-    success = send_email(categorized)
+    # 5. Send the email digest
+    success = send_email(categorized, dry_run=args.dry_run)
 
-    # 7. Mark only emailed articles as sent so dropped items can be reconsidered
+    # 6. Mark only emailed articles as sent so dropped items can be reconsidered
     if success:
         sent_ids = get_emailed_article_ids(categorized, articles)
         mark_sent(sent_ids)
         log.info(f"Marked {len(sent_ids)} emailed articles as sent.")
 
-    # 8. Print weekly stats summary
+    # 7. Print weekly stats summary
     print_weekly_stats(raw_count, dedup_count, categorized, articles)
 
 
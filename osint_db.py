@@ -3,14 +3,67 @@
 from __future__ import annotations
 
 import json
+import math
 import os
+import queue
 import sqlite3
-from datetime import datetime, timezone
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 DB_PATH = os.environ.get("OSINT_DB_PATH", "osint.db")
 
+# Bump whenever the schema script or a migration changes; stored in PRAGMA user_version.
+SCHEMA_VERSION = 15
+
+# Cluster tiles (web-mercator z/x/y) are pre-aggregated and cached up to this zoom.
+TILE_CLUSTER_MAX_ZOOM = 9
+
+# Read connections are long-lived and pooled, so tune them for scans. Each
+# holds up to a 64 MB page cache; at most READ_POOL_SIZE per database stay
+# open while idle, more only while that many requests read at once.
+READ_POOL_SIZE = int(os.environ.get("OSINT_READ_POOL_SIZE", "8"))
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Writer connections. Under WAL, synchronous=NORMAL only risks the latest
+# commits on an OS crash, and skips an fsync per transaction.
+WRITE_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Records per executemany() call in upsert_assets() / insert_grid_snapshots().
+BULK_CHUNK_ROWS = 5000
+
+# Grid samples are stored compactly in one table per UTC month (see
+# _create_grid_partition); grid_samples and grid_snapshots are views over them.
+GRID_PARTITION_PREFIX = "grid_samples_p"
+# Raw samples older than this many days are dropped by apply_grid_retention()
+# (their hourly/daily rollups are kept); 0 keeps raw history forever.
+GRID_RETENTION_DAYS = int(os.environ.get("GRID_RETENTION_DAYS", "0"))
+
+# Committed ingest batch ids are kept this long. A batch replayed later is
+# written again, which is harmless: grid inserts ignore duplicates and asset
+# ingest is an upsert.
+INGEST_BATCH_TTL_DAYS = int(os.environ.get("INGEST_BATCH_TTL_DAYS", "30"))
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+
+_read_pools: dict[tuple[str, str], queue.Queue[sqlite3.Connection]] = {}
+_read_pools_lock = threading.Lock()
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -21,14 +74,96 @@ def get_conn(db_path: str | os.PathLike[str] | None = None) -> sqlite3.Connectio
     path = Path(db_path or DB_PATH)
     conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma in WRITE_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def checkout_read_conn(db_path: str | os.PathLike[str] | None = None, mode: str = "rw") -> sqlite3.Connection:
+    """Take an idle read-only connection for ``db_path`` from the pool, or open one.
+
+    Hand it back with release_read_conn() (or use read_conn()); it may be
+    used by one thread at a time, and WAL (set by init_db(), never by
+    readers) lets it read while ingest jobs write. ``mode="ro"`` opens a
+    database another job owns, such as articles.db, without write access.
+    """
+    key = (str(Path(db_path or DB_PATH)), mode)
+    try:
+        return _read_pool(key).get_nowait()
+    except queue.Empty:
+        pass
+    # mode=rw/ro: a missing database is an error, not a new empty file
+    conn = sqlite3.connect(f"{Path(key[0]).absolute().as_uri()}?mode={mode}", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def release_read_conn(
+    conn: sqlite3.Connection,
+    db_path: str | os.PathLike[str] | None = None,
+    mode: str = "rw",
+) -> None:
+    """Return a checkout_read_conn() connection; past READ_POOL_SIZE idle ones it is closed."""
+    if conn.in_transaction:
+        conn.rollback()  # an open read would pin its WAL snapshot while idle
+    try:
+        _read_pool((str(Path(db_path or DB_PATH)), mode)).put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+@contextmanager
+def read_conn(db_path: str | os.PathLike[str] | None = None, mode: str = "rw") -> Iterator[sqlite3.Connection]:
+    """A pooled read-only connection for the duration of a ``with`` block."""
+    conn = checkout_read_conn(db_path, mode)
+    try:
+        yield conn
+    finally:
+        release_read_conn(conn, db_path, mode)
+
+
+def _read_pool(key: tuple[str, str]) -> queue.Queue[sqlite3.Connection]:
+    pool = _read_pools.get(key)
+    if pool is None:
+        with _read_pools_lock:
+            pool = _read_pools.setdefault(key, queue.Queue(READ_POOL_SIZE))
+    return pool
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _statements(script: str) -> Iterator[str]:
+    """Split an SQL script into its statements."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+
+
 def init_db(db_path: str | os.PathLike[str] | None = None) -> None:
-    """Create dashboard tables and indexes if they do not already exist."""
+    """Create dashboard tables and indexes unless the schema version is current."""
     with get_conn(db_path) as conn:
-        conn.executescript(
+        version = schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return
+        conn.execute("PRAGMA journal_mode = WAL")
+        # The whole upgrade is one write transaction: the backfills below
+        # rebuild derived tables from every stored sample, so no insert may
+        # slip in, and a process that waited here finds the work done.
+        conn.execute("BEGIN IMMEDIATE")
+        version = schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return
+        if version < 13:
+            _set_aside_iso_tables(conn)
+        # Statement by statement: executescript() would commit first
+        for statement in _statements(
             """
             CREATE TABLE IF NOT EXISTS assets (
                 id TEXT PRIMARY KEY,
@@ -57,20 +192,114 @@ def init_db(db_path: str | os.PathLike[str] | None = None) -> None:
             CREATE INDEX IF NOT EXISTS idx_assets_location ON assets(lat, lng);
             CREATE INDEX IF NOT EXISTS idx_assets_operator ON assets(operator);
 
-            CREATE TABLE IF NOT EXISTS grid_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                iso TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
+            -- Spatial index over asset points, keyed by assets.rowid and kept
+            -- in sync by upsert_asset().
+            CREATE VIRTUAL TABLE IF NOT EXISTS assets_rtree USING rtree(
+                rid, min_lat, max_lat, min_lng, max_lng
+            );
+
+            -- Rendered cluster tiles; type '' holds the all-types tile. Rows are
+            -- deleted by upsert_asset() when an asset inside the tile changes.
+            CREATE TABLE IF NOT EXISTS asset_tiles (
+                type TEXT NOT NULL,
+                z INTEGER NOT NULL,
+                x INTEGER NOT NULL,
+                y INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                created_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (type, z, x, y)
+            );
+
+            -- Compact grid telemetry. Each (region, region_type, source, metric,
+            -- fuel, unit) is one grid_series row and each ingest batch's metadata
+            -- one grid_batches row; samples in the monthly grid_samples_pYYYYMM
+            -- tables reference them by integer id with an epoch-seconds ts.
+            -- region is an ISO or balancing-authority code, region_type 'iso' or
+            -- 'ba' and source the feed ('gridstatus', 'eia930'); region_type,
+            -- source, fuel and unit are '' when absent. The grid_snapshots view
+            -- keeps the original row shape.
+            CREATE TABLE IF NOT EXISTS grid_series (
+                series_id INTEGER PRIMARY KEY,
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
                 metric TEXT NOT NULL,
-                fuel TEXT,
+                fuel TEXT NOT NULL DEFAULT '',
+                unit TEXT NOT NULL DEFAULT '',
+                UNIQUE(region, region_type, source, metric, fuel, unit)
+            );
+
+            CREATE TABLE IF NOT EXISTS grid_batches (
+                batch_id INTEGER PRIMARY KEY,
+                metadata_json TEXT NOT NULL,
+                created_at TEXT DEFAULT (datetime('now'))
+            );
+
+            -- Newest sample per (region, region_type, source, metric, fuel),
+            -- maintained by insert_grid_snapshots() so /api/grid/current never
+            -- scans history. fuel is '' when the sample has none.
+            CREATE TABLE IF NOT EXISTS grid_latest (
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                metric TEXT NOT NULL,
+                fuel TEXT NOT NULL DEFAULT '',
+                timestamp TEXT NOT NULL,
                 value REAL NOT NULL,
                 unit TEXT,
                 metadata_json TEXT DEFAULT '{}',
-                created_at TEXT DEFAULT (datetime('now')),
-                UNIQUE(iso, timestamp, metric, fuel)
+                PRIMARY KEY (region, region_type, source, metric, fuel)
             );
 
-            CREATE INDEX IF NOT EXISTS idx_grid_current ON grid_snapshots(iso, metric, timestamp);
+            -- Hourly/daily aggregates of grid_snapshots for time-series charts,
+            -- maintained incrementally by insert_grid_snapshots(). bucket is the
+            -- UTC hour ('YYYY-MM-DDTHH:00:00+00:00') or day ('YYYY-MM-DD').
+            CREATE TABLE IF NOT EXISTS grid_rollup_hourly (
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                metric TEXT NOT NULL,
+                fuel TEXT NOT NULL DEFAULT '',
+                bucket TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                PRIMARY KEY (region, region_type, source, metric, fuel, bucket)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS grid_rollup_daily (
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                metric TEXT NOT NULL,
+                fuel TEXT NOT NULL DEFAULT '',
+                bucket TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                PRIMARY KEY (region, region_type, source, metric, fuel, bucket)
+            ) WITHOUT ROWID;
+
+            -- Additive per-BA, per-UTC-day sums of EIA-930 demand forecast
+            -- error (DF - D) over hours with both values; maintained by
+            -- grid_forecast.refresh_forecast_errors().
+            CREATE TABLE IF NOT EXISTS grid_forecast_error_daily (
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                day TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                ape_sum REAL NOT NULL,
+                err_sum REAL NOT NULL,
+                abs_err_sum REAL NOT NULL,
+                sq_err_sum REAL NOT NULL,
+                actual_sum REAL NOT NULL,
+                PRIMARY KEY (region, region_type, source, day)
+            ) WITHOUT ROWID;
+
+            CREATE INDEX IF NOT EXISTS idx_grid_forecast_error_day ON grid_forecast_error_daily(day);
 
             CREATE TABLE IF NOT EXISTS incidents (
                 id TEXT PRIMARY KEY,
@@ -96,10 +325,13 @@ def init_db(db_path: str | os.PathLike[str] | None = None) -> None:
             CREATE INDEX IF NOT EXISTS idx_incidents_source_date ON incidents(source, date);
             CREATE INDEX IF NOT EXISTS idx_incidents_location ON incidents(lat, lng);
             CREATE INDEX IF NOT EXISTS idx_incidents_state_type ON incidents(state, type);
+            CREATE INDEX IF NOT EXISTS idx_incidents_date_id ON incidents(date, id);
 
             CREATE TABLE IF NOT EXISTS grid_alerts (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                iso TEXT NOT NULL,
+                region TEXT NOT NULL,
+                region_type TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
                 timestamp TEXT NOT NULL,
                 metric TEXT NOT NULL,
                 severity TEXT NOT NULL,
@@ -109,18 +341,512 @@ def init_db(db_path: str | os.PathLike[str] | None = None) -> None:
                 metadata_json TEXT DEFAULT '{}',
                 created_at TEXT DEFAULT (datetime('now'))
             );
+
+            CREATE INDEX IF NOT EXISTS idx_grid_alerts_timestamp ON grid_alerts(timestamp);
+
+            -- Rolling detector statistics per grid_series row, maintained by
+            -- grid_anomaly.detect_grid_anomalies(); seasonal packs 168
+            -- float32 hour-of-week means.
+            CREATE TABLE IF NOT EXISTS grid_detector_state (
+                series_id INTEGER PRIMARY KEY,
+                last_ts INTEGER NOT NULL,
+                last_value REAL NOT NULL,
+                n INTEGER NOT NULL,
+                mean REAL NOT NULL,
+                resid_var REAL NOT NULL,
+                interval REAL,
+                last_alert_ts INTEGER,
+                stale_alerted INTEGER NOT NULL DEFAULT 0,
+                seasonal BLOB NOT NULL
+            );
+
+            -- Batch ids (X-Batch-Id) the ingest routes already committed, with
+            -- the reply they sent, so a sender retrying after a lost response
+            -- gets the same answer instead of a second write.
+            CREATE TABLE IF NOT EXISTS ingest_batches (
+                batch_id TEXT PRIMARY KEY,
+                route TEXT NOT NULL,
+                response_json TEXT NOT NULL,
+                received_at INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ingest_batches_received ON ingest_batches(received_at);
+
+            -- Per-table change counters bumped by the ingest helpers below;
+            -- dashboard_api keys its response cache and ETags on them.
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+
+            -- Per-database settings kept by the helpers below; see
+            -- grid_retention_floor().
+            CREATE TABLE IF NOT EXISTS db_meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
             """
-        )
+        ):
+            conn.execute(statement)
+        _migrate(conn, version)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
 
 
+def _migrate(conn: sqlite3.Connection, from_version: int) -> None:
+    """Backfill derived tables for databases created by an older schema."""
+    if from_version < 13:
+        # Before the backfills below, which write the region-keyed tables
+        _copy_iso_tables(conn)
+    if from_version < 9:
+        # First: the backfills below read grid_snapshots, which is now a view
+        _compact_grid_snapshots(conn)
+        # Re-derive with the view's normalized UTC timestamps
+        conn.execute("DELETE FROM grid_latest")
+        _refresh_grid_latest(conn, 0)
+    if from_version < 2:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO assets_rtree (rid, min_lat, max_lat, min_lng, max_lng)
+            SELECT rowid, lat, lat, lng, lng FROM assets
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+            """
+        )
+    if from_version < 4:
+        _refresh_grid_latest(conn, since_id=0)
+    if from_version < 5:
+        _refresh_grid_rollups(conn, since_id=0)
+    if from_version < 7:
+        # NULL-free sort keys for keyset pagination in /api/assets. Virtual
+        # generated columns (rather than expression indexes) let SQLite seek
+        # on the whole (key, id) row value instead of only its first column.
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(assets)")}
+        if "page_name" not in columns:
+            conn.execute(
+                "ALTER TABLE assets ADD COLUMN page_name TEXT "
+                "GENERATED ALWAYS AS (IFNULL(name, '')) VIRTUAL"
+            )
+        if "page_capacity" not in columns:
+            conn.execute(
+                "ALTER TABLE assets ADD COLUMN page_capacity REAL "
+                "GENERATED ALWAYS AS (IFNULL(capacity_mw, -1)) VIRTUAL"
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_page_name ON assets(type, page_name, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_page_capacity ON assets(page_capacity, id)")
+    if from_version < 11:
+        from grid_forecast import refresh_forecast_errors
+
+        refresh_forecast_errors(conn, since_id=0)
+    if from_version < 14:
+        # The level variance was tracked but never used by the detector
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(grid_detector_state)")}
+        if "var" in columns:
+            conn.execute("ALTER TABLE grid_detector_state DROP COLUMN var")
+    if from_version < 15:
+        # Retention that ran before the floor was recorded: the oldest raw
+        # sample is the floor if the rollups reach further back
+        oldest = conn.execute("SELECT MIN(ts) FROM grid_samples").fetchone()[0]
+        if oldest is not None and conn.execute(
+            "SELECT 1 FROM grid_rollup_hourly WHERE bucket < ? LIMIT 1",
+            (datetime.fromtimestamp(oldest, timezone.utc).strftime("%Y-%m-%dT%H:00:00+00:00"),),
+        ).fetchone():
+            _raise_grid_retention_floor(conn, oldest)
+
+
+# Grid tables that were keyed on ``iso`` before schema v13
+_ISO_KEYED_TABLES = (
+    "grid_series",
+    "grid_latest",
+    "grid_rollup_hourly",
+    "grid_rollup_daily",
+    "grid_forecast_error_daily",
+    "grid_alerts",
+)
+
+
+def _legacy_grid_keys(metric: str = "metric") -> str:
+    """SQL for the (region_type, source) of a pre-v13 grid row, which recorded neither.
+
+    The two producers differ by metric: gridstatus ISO fuel mix is
+    ``fuel_mix_mw`` and every EIA-930 metric ends in ``_mwh``.
+    """
+    return (
+        f"CASE WHEN {metric} = 'fuel_mix_mw' THEN 'iso' WHEN {metric} GLOB '*_mwh' THEN 'ba' ELSE '' END, "
+        f"CASE WHEN {metric} = 'fuel_mix_mw' THEN 'gridstatus' WHEN {metric} GLOB '*_mwh' THEN 'eia930' ELSE '' END"
+    )
+
+
+def _set_aside_iso_tables(conn: sqlite3.Connection) -> None:
+    """Rename grid tables still keyed on ``iso`` to <name>_v12.
+
+    Runs before the schema script, which then creates the region-keyed
+    tables; _copy_iso_tables() moves the rows across. The old tables'
+    indexes are dropped so the script can recreate them under their names.
+    """
+    views = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'")}
+    for table in _ISO_KEYED_TABLES:
+        if "iso" not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            continue
+        if table == "grid_series":
+            # The views decode s.iso; _copy_iso_tables() rebuilds them
+            for view in {"grid_samples", "grid_snapshots"} & views:
+                conn.execute(f"DROP VIEW {view}")
+        indexes = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+        ).fetchall()
+        for (index,) in indexes:
+            conn.execute(f"DROP INDEX {index}")
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v12")
+
+
+def _copy_iso_tables(conn: sqlite3.Connection) -> None:
+    """Move rows from the <name>_v12 tables into the region-keyed ones and drop them."""
+    keys = _legacy_grid_keys()
+    copies = {
+        "grid_series": (
+            "series_id, region, region_type, source, metric, fuel, unit",
+            f"series_id, iso, {keys}, metric, fuel, unit",
+        ),
+        "grid_latest": (
+            "region, region_type, source, metric, fuel, timestamp, value, unit, metadata_json",
+            f"iso, {keys}, metric, fuel, timestamp, value, unit, metadata_json",
+        ),
+        "grid_rollup_hourly": (
+            "region, region_type, source, metric, fuel, bucket, n, sum, min, max",
+            f"iso, {keys}, metric, fuel, bucket, n, sum, min, max",
+        ),
+        "grid_rollup_daily": (
+            "region, region_type, source, metric, fuel, bucket, n, sum, min, max",
+            f"iso, {keys}, metric, fuel, bucket, n, sum, min, max",
+        ),
+        # Only EIA-930 reports demand forecasts
+        "grid_forecast_error_daily": (
+            "region, region_type, source, day, n, ape_sum, err_sum, abs_err_sum, sq_err_sum, actual_sum",
+            "iso, 'ba', 'eia930', day, n, ape_sum, err_sum, abs_err_sum, sq_err_sum, actual_sum",
+        ),
+        "grid_alerts": (
+            "id, region, region_type, source, timestamp, metric, severity, message, value, threshold,"
+            " metadata_json, created_at",
+            f"id, iso, {keys}, timestamp, metric, severity, message, value, threshold, metadata_json, created_at",
+        ),
+    }
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, (columns, select) in copies.items():
+        if f"{table}_v12" in tables:
+            conn.execute(f"INSERT INTO {table} ({columns}) SELECT {select} FROM {table}_v12")
+            conn.execute(f"DROP TABLE {table}_v12")
+    if "grid_series_v12" in tables:
+        _rebuild_grid_views(conn)
+
+
+_json_encoder = json.JSONEncoder(sort_keys=True, default=str)
+
+
+def grid_partition_name(month: str) -> str:
+    """Partition table for a 'YYYY-MM' month."""
+    if not _MONTH_RE.match(month):
+        raise ValueError(f"grid timestamp month {month!r} is not YYYY-MM")
+    return f"{GRID_PARTITION_PREFIX}{month[:4]}{month[5:]}"
+
+
+def grid_partitions(conn: sqlite3.Connection) -> list[str]:
+    """Partition table names, oldest month first."""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+        (GRID_PARTITION_PREFIX + "[0-9][0-9][0-9][0-9][0-9][0-9]",),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _create_grid_partition(conn: sqlite3.Connection, name: str) -> None:
+    # UNIQUE(series_id, ts) both dedupes samples and serves range scans
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            series_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            value REAL NOT NULL,
+            batch_id INTEGER,
+            UNIQUE(series_id, ts)
+        )
+        """
+    )
+
+
+def _rebuild_grid_views(conn: sqlite3.Connection) -> None:
+    """Recreate grid_samples (raw partitions) and grid_snapshots (decoded rows).
+
+    Both are UNION ALL views with one arm per partition, so WHERE terms on
+    id or ts are pushed into every arm and answered from its indexes.
+    """
+    partitions = grid_partitions(conn)
+    if not partitions:
+        partitions = [grid_partition_name(utc_now_iso()[:7])]
+        _create_grid_partition(conn, partitions[0])
+    samples = "\nUNION ALL\n".join(
+        f"SELECT id, series_id, ts, value, batch_id FROM {name}" for name in partitions
+    )
+    snapshots = "\nUNION ALL\n".join(
+        f"""
+        SELECT g.id, s.region, s.region_type, s.source, strftime('%Y-%m-%dT%H:%M:%S+00:00', g.ts, 'unixepoch') AS timestamp,
+               s.metric, NULLIF(s.fuel, '') AS fuel, g.value, NULLIF(s.unit, '') AS unit,
+               COALESCE(b.metadata_json, '{{}}') AS metadata_json, b.created_at
+        FROM {name} g
+        JOIN grid_series s ON s.series_id = g.series_id
+        LEFT JOIN grid_batches b ON b.batch_id = g.batch_id
+        """
+        for name in partitions
+    )
+    conn.execute("DROP VIEW IF EXISTS grid_samples")
+    conn.execute("DROP VIEW IF EXISTS grid_snapshots")
+    conn.execute(f"CREATE VIEW grid_samples AS\n{samples}")
+    conn.execute(f"CREATE VIEW grid_snapshots AS\n{snapshots}")
+
+
+def ensure_grid_partitions(conn: sqlite3.Connection, months: Iterable[str]) -> list[str]:
+    """Create missing partitions for 'YYYY-MM' months and return their names."""
+    existing = set(grid_partitions(conn))
+    names = [grid_partition_name(month) for month in sorted(set(months))]
+    missing = [name for name in names if name not in existing]
+    for name in missing:
+        _create_grid_partition(conn, name)
+    if missing:
+        _rebuild_grid_views(conn)
+    return names
+
+
+def _compact_grid_snapshots(conn: sqlite3.Connection) -> None:
+    """Re-encode text grid_snapshots rows (one table, or v8 monthly
+    grid_snapshots_pYYYYMM tables) into series/batch ids and epoch seconds."""
+    sources = [
+        row[0]
+        for row in conn.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND (name = 'grid_snapshots' OR name GLOB 'grid_snapshots_p[0-9]*')
+            """
+        )
+    ]
+    # Before v8 grid_snapshots is the table itself, dropped once copied below
+    if "grid_snapshots" not in sources:
+        conn.execute("DROP VIEW IF EXISTS grid_snapshots")
+    if sources:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_grid_batches_migrate ON grid_batches(metadata_json)")
+    for source in sources:
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO grid_series (region, region_type, source, metric, fuel, unit)
+            SELECT DISTINCT iso, {_legacy_grid_keys()}, metric, COALESCE(fuel, ''), COALESCE(unit, '') FROM {source}
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO grid_batches (metadata_json, created_at)
+            SELECT metadata_json, MIN(created_at) FROM {source}
+            WHERE metadata_json IS NOT NULL AND metadata_json NOT IN ('', '{{}}')
+              AND metadata_json NOT IN (SELECT metadata_json FROM grid_batches)
+            GROUP BY metadata_json
+            """
+        )
+        months = [row[0] for row in conn.execute(f"SELECT DISTINCT substr(timestamp, 1, 7) FROM {source}")]
+        for month in months:
+            name = grid_partition_name(month)
+            _create_grid_partition(conn, name)
+            conn.execute(
+                f"""
+                INSERT OR IGNORE INTO {name} (id, series_id, ts, value, batch_id)
+                SELECT o.id, s.series_id, CAST(strftime('%s', o.timestamp) AS INTEGER), o.value, b.batch_id
+                FROM {source} o
+                JOIN grid_series s
+                  ON s.region = o.iso AND s.metric = o.metric
+                 AND s.fuel = COALESCE(o.fuel, '') AND s.unit = COALESCE(o.unit, '')
+                LEFT JOIN grid_batches b ON b.metadata_json = o.metadata_json
+                WHERE substr(o.timestamp, 1, 7) = ?
+                """,
+                (month,),
+            )
+        conn.execute(f"DROP TABLE {source}")
+    conn.execute("DROP INDEX IF EXISTS idx_grid_batches_migrate")
+    _rebuild_grid_views(conn)
+
+
+def apply_grid_retention(conn: sqlite3.Connection, days: int, now: datetime | None = None) -> dict[str, Any]:
+    """Drop raw grid samples older than ``days``.
+
+    Every sample is folded into grid_rollup_hourly/daily when it is inserted,
+    so dropping raw rows keeps their aggregates. Whole months past the cutoff
+    are dropped as tables; the month containing the cutoff is trimmed. The
+    cutoff becomes the retention floor, so a re-sent sample from before it
+    is not folded into the aggregates a second time.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+    _raise_grid_retention_floor(conn, int(cutoff.timestamp()))
+    cutoff_partition = grid_partition_name(cutoff.strftime("%Y-%m"))
+    dropped: list[str] = []
+    deleted = 0
+    for name in grid_partitions(conn):
+        if name < cutoff_partition:
+            deleted += conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            conn.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+        elif name == cutoff_partition:
+            deleted += conn.execute(f"DELETE FROM {name} WHERE ts < ?", (int(cutoff.timestamp()),)).rowcount
+    if dropped:
+        _rebuild_grid_views(conn)
+    if deleted:
+        conn.execute(
+            """
+            DELETE FROM grid_batches WHERE batch_id NOT IN (
+                SELECT batch_id FROM grid_samples WHERE batch_id IS NOT NULL
+            )
+            """
+        )
+        bump_data_version(conn, "grid_snapshots")
+    return {"cutoff": cutoff.isoformat(), "dropped_partitions": dropped, "deleted_rows": deleted}
+
+
+def grid_retention_floor(conn: sqlite3.Connection) -> int:
+    """Epoch second below which raw grid samples were dropped (0 if never)."""
+    row = conn.execute("SELECT value FROM db_meta WHERE name = 'grid_retention_floor'").fetchone()
+    return row[0] if row else 0
+
+
+def _raise_grid_retention_floor(conn: sqlite3.Connection, ts: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO db_meta (name, value) VALUES ('grid_retention_floor', ?)
+        ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+        """,
+        (ts,),
+    )
+
+
 def _json_dumps(value: dict[str, Any] | None) -> str:
-    return json.dumps(value or {}, sort_keys=True, default=str)
+    # A shared encoder; json.dumps() builds a new one per call with these options
+    return _json_encoder.encode(value) if value else "{}"
 
 
-def upsert_asset(conn: sqlite3.Connection, asset: dict[str, Any]) -> None:
-    """Insert or update a normalized infrastructure asset row."""
-    values = {
+def bump_data_version(conn: sqlite3.Connection, *names: str) -> None:
+    """Record that the named tables changed; commits with the caller's transaction."""
+    conn.executemany(
+        """
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+        """,
+        [(name,) for name in names],
+    )
+
+
+def seen_ingest_batch(conn: sqlite3.Connection, batch_id: str) -> dict[str, Any] | None:
+    """The reply recorded for an already committed ingest batch, if any."""
+    row = conn.execute("SELECT response_json FROM ingest_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def record_ingest_batch(conn: sqlite3.Connection, batch_id: str, route: str, response: dict[str, Any]) -> None:
+    """Remember a batch id in the caller's transaction; ids expire after INGEST_BATCH_TTL_DAYS."""
+    now = int(datetime.now(timezone.utc).timestamp())
+    conn.execute(
+        "INSERT INTO ingest_batches (batch_id, route, response_json, received_at) VALUES (?, ?, ?, ?)",
+        (batch_id, route, _json_dumps(response), now),
+    )
+    conn.execute(
+        "DELETE FROM ingest_batches WHERE received_at < ?",
+        (now - INGEST_BATCH_TTL_DAYS * 86400,),
+    )
+
+
+def get_data_versions(conn: sqlite3.Connection, names: Iterable[str]) -> tuple[int, ...]:
+    names = list(names)
+    placeholders = ", ".join("?" * len(names))
+    found = dict(
+        conn.execute(
+            f"SELECT name, version FROM data_versions WHERE name IN ({placeholders})", names
+        ).fetchall()
+    )
+    return tuple(found.get(name, 0) for name in names)
+
+
+def tile_coords(lat: float, lng: float, z: int) -> tuple[float, float]:
+    """Fractional web-mercator tile coordinates of a point at zoom ``z``."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lng + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """Return (west, south, east, north) in degrees for tile z/x/y."""
+    n = 2 ** z
+
+    def lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def invalidate_asset_tiles(
+    conn: sqlite3.Connection,
+    points: Iterable[tuple[str, float | None, float | None]],
+) -> None:
+    """Drop cached cluster tiles containing any (type, lat, lng) point."""
+    cached = conn.execute("SELECT COUNT(*) FROM asset_tiles").fetchone()[0]
+    if not cached:
+        return
+    keys = set()
+    for asset_type, lat, lng in points:
+        if lat is None or lng is None:
+            continue
+        for z in range(TILE_CLUSTER_MAX_ZOOM + 1):
+            fx, fy = tile_coords(lat, lng, z)
+            x, y = min(int(fx), 2 ** z - 1), min(int(fy), 2 ** z - 1)
+            keys.add((asset_type, z, x, y))
+            keys.add(("", z, x, y))
+    if len(keys) > cached:
+        # Bulk upserts touch more tiles than are cached; match against the cache
+        keys = {
+            tuple(row) for row in conn.execute("SELECT type, z, x, y FROM asset_tiles")
+        } & keys
+    if keys:
+        conn.executemany(
+            "DELETE FROM asset_tiles WHERE type = ? AND z = ? AND x = ? AND y = ?",
+            sorted(keys),
+        )
+
+
+ASSET_COLUMNS = (
+    "id",
+    "source",
+    "source_id",
+    "type",
+    "name",
+    "state",
+    "county",
+    "lat",
+    "lng",
+    "geometry_wkt",
+    "capacity_mw",
+    "fuel_type",
+    "operator",
+    "owner",
+    "status",
+    "voltage_kv",
+    "metadata_json",
+    "foreign_link_flag",
+    "updated_at",
+)
+
+_UPSERT_ASSET_SQL = f"""
+    INSERT INTO assets ({", ".join(ASSET_COLUMNS)})
+    VALUES ({", ".join(f":{key}" for key in ASSET_COLUMNS)})
+    ON CONFLICT(id) DO UPDATE SET
+        {", ".join(f"{key}=excluded.{key}" for key in ASSET_COLUMNS if key != "id")}
+"""
+
+
+def _asset_values(asset: dict[str, Any]) -> dict[str, Any]:
+    return {
         "id": asset["id"],
         "source": asset.get("source", "manual"),
         "source_id": asset.get("source_id"),
@@ -141,44 +867,292 @@ def upsert_asset(conn: sqlite3.Connection, asset: dict[str, Any]) -> None:
         "foreign_link_flag": int(bool(asset.get("foreign_link_flag", False))),
         "updated_at": asset.get("updated_at") or utc_now_iso(),
     }
+
+
+def upsert_assets(conn: sqlite3.Connection, assets: Iterable[dict[str, Any]]) -> tuple[int, int]:
+    """Insert or update asset rows in BULK_CHUNK_ROWS executemany() batches.
+
+    Returns (inserted, updated). Runs in the caller's transaction; the
+    R*Tree, tile cache and data version are maintained once per chunk
+    rather than once per asset.
+    """
+    inserted = updated = 0
+    iterator = iter(assets)
+    while chunk := [_asset_values(asset) for asset in islice(iterator, BULK_CHUNK_ROWS)]:
+        ids = json.dumps([values["id"] for values in chunk])
+        previous = conn.execute(
+            "SELECT id, type, lat, lng FROM assets WHERE id IN (SELECT value FROM json_each(?))",
+            (ids,),
+        ).fetchall()
+        conn.executemany(_UPSERT_ASSET_SQL, chunk)
+
+        seen = {row["id"] for row in previous}
+        for values in chunk:
+            if values["id"] in seen:
+                updated += 1
+            else:
+                inserted += 1
+                seen.add(values["id"])
+
+        _sync_asset_rtree(conn, ids)
+        touched = [(values["type"], values["lat"], values["lng"]) for values in chunk]
+        touched.extend((row["type"], row["lat"], row["lng"]) for row in previous)
+        invalidate_asset_tiles(conn, touched)
+    if inserted or updated:
+        bump_data_version(conn, "assets")
+    return inserted, updated
+
+
+def upsert_asset(conn: sqlite3.Connection, asset: dict[str, Any]) -> None:
+    """Insert or update a normalized infrastructure asset row."""
+    upsert_assets(conn, [asset])
+
+
+def upsert_incident(conn: sqlite3.Connection, incident: dict[str, Any]) -> None:
+    """Insert or update a normalized incident row (PHMSA, CISA ICS, NRC, ...)."""
+    values = {
+        "id": incident["id"],
+        "source": incident.get("source", "manual"),
+        "source_id": incident.get("source_id"),
+        "type": incident.get("type"),
+        "date": incident.get("date"),
+        "state": incident.get("state"),
+        "county": incident.get("county"),
+        "operator": incident.get("operator"),
+        "commodity": incident.get("commodity"),
+        "lat": incident.get("lat"),
+        "lng": incident.get("lng"),
+        "fatalities": incident.get("fatalities"),
+        "injuries": incident.get("injuries"),
+        "cost_usd": incident.get("cost_usd"),
+        "description": incident.get("description"),
+        "metadata_json": _json_dumps(incident.get("metadata")),
+        "updated_at": incident.get("updated_at") or utc_now_iso(),
+    }
     columns = ", ".join(values)
     placeholders = ", ".join(f":{key}" for key in values)
-    update_cols = ", ".join(
-        f"{key}=excluded.{key}" for key in values if key not in {"id", "created_at"}
-    )
+    update_cols = ", ".join(f"{key}=excluded.{key}" for key in values if key != "id")
     conn.execute(
         f"""
-        INSERT INTO assets ({columns}) VALUES ({placeholders})
+        INSERT INTO incidents ({columns}) VALUES ({placeholders})
         ON CONFLICT(id) DO UPDATE SET {update_cols}
         """,
         values,
     )
+    bump_data_version(conn, "incidents")
+
+
+def _sync_asset_rtree(conn: sqlite3.Connection, ids_json: str) -> None:
+    """Mirror the points of the assets in a JSON id list into assets_rtree."""
+    conn.execute(
+        """
+        DELETE FROM assets_rtree WHERE rid IN (
+            SELECT rowid FROM assets
+            WHERE id IN (SELECT value FROM json_each(?)) AND (lat IS NULL OR lng IS NULL)
+        )
+        """,
+        (ids_json,),
+    )
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO assets_rtree (rid, min_lat, max_lat, min_lng, max_lng)
+        SELECT rowid, lat, lat, lng, lng FROM assets
+        WHERE id IN (SELECT value FROM json_each(?)) AND lat IS NOT NULL AND lng IS NOT NULL
+        """,
+        (ids_json,),
+    )
+
+
+def _max_grid_snapshot_id(conn: sqlite3.Connection) -> int:
+    # Per-partition MAX(id) is a rowid lookup; MAX over the view would scan it
+    arms = " UNION ALL ".join(f"SELECT MAX(id) AS id FROM {name}" for name in grid_partitions(conn))
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM ({arms})").fetchone()[0]
+
+
+def _refresh_grid_latest(conn: sqlite3.Connection, since_id: int) -> None:
+    """Fold snapshot rows with id > since_id into grid_latest, newest wins.
+
+    Callers hold the write lock from reading ``since_id`` until they commit
+    (see insert_grid_snapshots), so no other writer's rows are skipped or
+    folded twice.
+    """
+    conn.execute(
+        """
+        INSERT INTO grid_latest (region, region_type, source, metric, fuel, timestamp, value, unit, metadata_json)
+        SELECT region, region_type, source, metric, COALESCE(fuel, ''), timestamp, value, unit, metadata_json
+        FROM grid_snapshots
+        WHERE id > ?
+        ON CONFLICT(region, region_type, source, metric, fuel) DO UPDATE SET
+            timestamp = excluded.timestamp,
+            value = excluded.value,
+            unit = excluded.unit,
+            metadata_json = excluded.metadata_json
+        WHERE excluded.timestamp > grid_latest.timestamp
+        """,
+        (since_id,),
+    )
+
+
+_ROLLUP_UPSERT = """
+    ON CONFLICT(region, region_type, source, metric, fuel, bucket) DO UPDATE SET
+        n = n + excluded.n,
+        sum = sum + excluded.sum,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max)
+"""
+
+
+def _refresh_grid_rollups(conn: sqlite3.Connection, since_id: int) -> None:
+    """Add samples with id > since_id to the hourly and daily rollups.
+
+    New samples are grouped once by (series_id, epoch hour) on integers;
+    hourly and daily rows are summed from that delta and labelled with the
+    UTC bucket ('YYYY-MM-DDTHH:00:00+00:00' / 'YYYY-MM-DD'). Same locking
+    contract as _refresh_grid_latest().
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.grid_rollup_delta")
+    conn.execute(
+        """
+        CREATE TEMP TABLE grid_rollup_delta AS
+        SELECT series_id, ts / 3600 AS hour,
+               COUNT(*) AS n, SUM(value) AS sum, MIN(value) AS min, MAX(value) AS max
+        FROM grid_samples
+        WHERE id > ?
+        GROUP BY 1, 2
+        """,
+        (since_id,),
+    )
+    for table, bucket in (
+        ("grid_rollup_hourly", "strftime('%Y-%m-%dT%H:00:00+00:00', d.hour * 3600, 'unixepoch')"),
+        ("grid_rollup_daily", "date(d.hour * 3600, 'unixepoch')"),
+    ):
+        conn.execute(
+            f"""
+            INSERT INTO {table} (region, region_type, source, metric, fuel, bucket, n, sum, min, max)
+            SELECT s.region, s.region_type, s.source, s.metric, s.fuel, {bucket},
+                   SUM(d.n), SUM(d.sum), MIN(d.min), MAX(d.max)
+            FROM grid_rollup_delta d
+            JOIN grid_series s ON s.series_id = d.series_id
+            GROUP BY 1, 2, 3, 4, 5, 6
+            {_ROLLUP_UPSERT}
+            """
+        )
+    conn.execute("DROP TABLE temp.grid_rollup_delta")
+
+
+def _epoch_month(timestamp: str) -> tuple[int, str]:
+    """(epoch seconds, 'YYYY-MM') of an ISO-8601 timestamp; naive means UTC."""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    return int(moment.timestamp()), f"{moment.year:04d}-{moment.month:02d}"
+
+
+def _lock_for_write(conn: sqlite3.Connection) -> None:
+    """Hold the database write lock for the rest of the current transaction."""
+    if conn.in_transaction:
+        # A write statement upgrades a deferred transaction; this one touches no rows
+        conn.execute("UPDATE data_versions SET version = version WHERE 0")
+    else:
+        conn.execute("BEGIN IMMEDIATE")
 
 
 def insert_grid_snapshots(
     conn: sqlite3.Connection,
     rows: Iterable[dict[str, Any]],
 ) -> int:
-    """Insert grid telemetry rows, ignoring exact duplicate samples."""
+    """Insert grid telemetry rows, ignoring exact duplicate samples.
+
+    Rows are keyed by ``region``, ``region_type`` and ``source`` as
+    fetch_grid and push_eia930 emit them; ``iso`` is still accepted in place
+    of ``region`` from older senders. ``rows`` may be any iterable and is
+    consumed BULK_CHUNK_ROWS at a time; each sample is stored as (series id,
+    epoch second, value, batch id) in the partition of its UTC month, and
+    each distinct metadata object once per call in grid_batches. Derived
+    tables and the data version are refreshed once for the call.
+
+    The write lock is taken before the newest id is read and held until the
+    caller commits, so concurrent writers cannot assign the same ids (and
+    lose rows to INSERT OR IGNORE) or fold each other's rows into the
+    derived tables.
+
+    Samples older than grid_retention_floor() are skipped: their raw rows
+    are gone, so INSERT OR IGNORE could not tell a re-sent one from a new
+    one, and the rollups already count it.
+    """
+    _lock_for_write(conn)
+    before = _max_grid_snapshot_id(conn)
+    floor = grid_retention_floor(conn)
+    # Ids are assigned here so they stay unique and increasing across
+    # partitions; the derived-table refreshes read rows with id > before.
+    next_id = before + 1
     count = 0
-    for row in rows:
-        cursor = conn.execute(
-            """
-            INSERT OR IGNORE INTO grid_snapshots
-                (iso, timestamp, metric, fuel, value, unit, metadata_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                row["iso"],
-                row["timestamp"],
+    series = {
+        tuple(row[1:]): row[0]
+        for row in conn.execute("SELECT series_id, region, region_type, source, metric, fuel, unit FROM grid_series")
+    }
+    batches: dict[str, int] = {}
+    last_metadata: Any = object()
+    batch_id: int | None = None
+    moments: dict[str, tuple[int, str]] = {}
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, BULK_CHUNK_ROWS)):
+        by_month: dict[str, list[tuple[Any, ...]]] = {}
+        for row in chunk:
+            timestamp = row["timestamp"]
+            moment = moments.get(timestamp)
+            if moment is None:
+                moment = moments[timestamp] = _epoch_month(timestamp)
+            if moment[0] < floor:
+                continue
+            key = (
+                row.get("region") or row["iso"],
+                row.get("region_type") or "",
+                row.get("source") or "",
                 row["metric"],
-                row.get("fuel"),
-                row["value"],
-                row.get("unit"),
-                _json_dumps(row.get("metadata")),
-            ),
-        )
-        count += cursor.rowcount if cursor.rowcount > 0 else 0
+                row.get("fuel") or "",
+                row.get("unit") or "",
+            )
+            series_id = series.get(key)
+            if series_id is None:
+                series_id = series[key] = conn.execute(
+                    "INSERT INTO grid_series (region, region_type, source, metric, fuel, unit) VALUES (?, ?, ?, ?, ?, ?)",
+                    key,
+                ).lastrowid
+            # Fetchers share one metadata dict across a batch's rows; encode it once
+            if row.get("metadata") is not last_metadata:
+                last_metadata = row.get("metadata")
+                metadata = _json_dumps(last_metadata)
+                batch_id = None
+                if metadata != "{}":
+                    batch_id = batches.get(metadata)
+                    if batch_id is None:
+                        batch_id = batches[metadata] = conn.execute(
+                            "INSERT INTO grid_batches (metadata_json) VALUES (?)", (metadata,)
+                        ).lastrowid
+            by_month.setdefault(moment[1], []).append((next_id, series_id, moment[0], row["value"], batch_id))
+            next_id += 1
+        names = ensure_grid_partitions(conn, by_month)
+        for name, params in zip(names, (by_month[month] for month in sorted(by_month))):
+            # rowcount sums only the rows that were not ignored as duplicates
+            cursor = conn.executemany(
+                f"INSERT OR IGNORE INTO {name} (id, series_id, ts, value, batch_id) VALUES (?, ?, ?, ?, ?)",
+                params,
+            )
+            count += max(cursor.rowcount, 0)
+    # Imported here because both build on this module
+    from grid_anomaly import detect_grid_anomalies
+    from grid_forecast import refresh_forecast_errors
+
+    if count:
+        _refresh_grid_latest(conn, before)
+        _refresh_grid_rollups(conn, before)
+        refresh_forecast_errors(conn, before)
+        bump_data_version(conn, "grid_snapshots")
+    # Runs even when nothing was new, so an ingest that came back empty
+    # still raises stale-feed alerts.
+    detect_grid_anomalies(conn, before)
     return count
 
 
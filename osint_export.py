@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Columnar (Arrow IPC / Parquet) exports of osint.db tables.
+
+Rows are read off a SQLite cursor EXPORT_BATCH_ROWS at a time, turned into
+typed Arrow record batches and written through a sink that hands the bytes
+back to a generator, so an export of any size holds one batch in memory.
+Timestamps and dates are converted to epoch integers in SQL, so a client
+gets native timestamp/date32 columns instead of strings to parse.
+
+pyarrow is in requirements.txt; on a server installed without it,
+dashboard_api answers 501 because ``available()`` is False.
+"""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from typing import Any, Iterator
+
+EXPORT_BATCH_ROWS = 65536
+
+FORMATS = {
+    # IPC *file* format, so clients can pa.memory_map() + pa.ipc.open_file()
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# dataset -> (table, [(column, SQL expression, arrow type)])
+_EPOCH_MS = "CAST(strftime('%s', {0}) AS INTEGER) * 1000"
+_EPOCH_DAYS = "CAST(julianday({0}) - 2440587.5 AS INTEGER)"
+DATASETS: dict[str, tuple[str, list[tuple[str, str, str]]]] = {
+    "assets": (
+        "assets",
+        [
+            ("id", "id", "string"),
+            ("source", "source", "string"),
+            ("source_id", "source_id", "string"),
+            ("type", "type", "string"),
+            ("name", "name", "string"),
+            ("state", "state", "string"),
+            ("county", "county", "string"),
+            ("lat", "lat", "float64"),
+            ("lng", "lng", "float64"),
+            ("geometry_wkt", "geometry_wkt", "string"),
+            ("capacity_mw", "capacity_mw", "float64"),
+            ("fuel_type", "fuel_type", "string"),
+            ("operator", "operator", "string"),
+            ("owner", "owner", "string"),
+            ("status", "status", "string"),
+            ("voltage_kv", "voltage_kv", "float64"),
+            ("foreign_link_flag", "foreign_link_flag", "int64"),
+            ("metadata_json", "metadata_json", "string"),
+            ("updated_at", _EPOCH_MS.format("updated_at"), "timestamp"),
+        ],
+    ),
+    "incidents": (
+        "incidents",
+        [
+            ("id", "id", "string"),
+            ("source", "source", "string"),
+            ("source_id", "source_id", "string"),
+            ("type", "type", "string"),
+            ("date", _EPOCH_DAYS.format("date"), "date"),
+            ("state", "state", "string"),
+            ("county", "county", "string"),
+            ("operator", "operator", "string"),
+            ("commodity", "commodity", "string"),
+            ("lat", "lat", "float64"),
+            ("lng", "lng", "float64"),
+            ("fatalities", "fatalities", "int64"),
+            ("injuries", "injuries", "int64"),
+            ("cost_usd", "cost_usd", "float64"),
+            ("description", "description", "string"),
+            ("metadata_json", "metadata_json", "string"),
+        ],
+    ),
+    "grid": (
+        # Compact samples carry epoch seconds already; no per-row date parsing
+        "grid_samples g JOIN grid_series s ON s.series_id = g.series_id"
+        " LEFT JOIN grid_batches b ON b.batch_id = g.batch_id",
+        [
+            ("region", "s.region", "string"),
+            ("region_type", "NULLIF(s.region_type, '')", "string"),
+            ("source", "NULLIF(s.source, '')", "string"),
+            ("timestamp", "g.ts * 1000", "timestamp"),
+            ("metric", "s.metric", "string"),
+            ("fuel", "NULLIF(s.fuel, '')", "string"),
+            ("value", "g.value", "float64"),
+            ("unit", "NULLIF(s.unit, '')", "string"),
+            ("metadata_json", "COALESCE(b.metadata_json, '{}')", "string"),
+        ],
+    ),
+}
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_query(
+    dataset: str,
+    *,
+    asset_type: str | None = None,
+    state: str | None = None,
+    region: str | None = None,
+    source: str | None = None,
+    metric: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> tuple[str, list[Any]]:
+    """SELECT for one dataset; start/end bound grid timestamps and incident dates."""
+    table, columns = DATASETS[dataset]
+    where: list[str] = []
+    params: list[Any] = []
+    if dataset == "assets":
+        if asset_type:
+            where.append("type = ?")
+            params.append(asset_type)
+        if state:
+            where.append("state = ?")
+            params.append(state.upper())
+    elif dataset == "incidents":
+        if state:
+            where.append("state = ?")
+            params.append(state.upper())
+        if start:
+            where.append("date >= ?")
+            params.append(start.date().isoformat())
+        if end:
+            where.append("date <= ?")
+            params.append(end.date().isoformat())
+    else:
+        if region:
+            where.append("s.region = ?")
+            params.append(region)
+        if source:
+            where.append("s.source = ?")
+            params.append(source)
+        if metric:
+            where.append("s.metric = ?")
+            params.append(metric)
+        if start:
+            where.append("g.ts >= ?")
+            params.append(int(start.timestamp()))
+        if end:
+            where.append("g.ts <= ?")
+            params.append(int(end.timestamp()))
+
+    select = ", ".join(f"{expr} AS {name}" for name, expr, _ in columns)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    # grid_samples is a view over monthly partitions; its natural order is
+    # already (month, id), and an ORDER BY would sort the whole export.
+    order = {"assets": " ORDER BY rowid", "incidents": " ORDER BY date, id"}.get(dataset, "")
+    return f"SELECT {select} FROM {table} {clause}{order}", params
+
+
+class _ChunkSink:
+    """Write-only file object whose bytes are drained by the export generator.
+
+    It tracks its own position because the Parquet writer records column
+    chunk offsets via tell().
+    """
+
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _schema(dataset: str) -> Any:
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "date": pa.date32(),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in DATASETS[dataset][1]])
+
+
+def iter_export(cursor: sqlite3.Cursor, dataset: str, fmt: str) -> Iterator[bytes]:
+    """Encode the rows of ``cursor`` (from export_query) as Arrow IPC or Parquet."""
+    import pyarrow as pa
+
+    schema = _schema(dataset)
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(out, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(out, schema)
+
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+            # One Parquet row group / IPC record batch per fetch
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
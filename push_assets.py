@@ -10,6 +10,9 @@ Run locally:
 
 Trigger manually via the assets-refresh GitHub Actions workflow (weekly on Sundays).
 
+Plants go through the on-disk spool (spool.py), which sends them in
+batches and keeps whatever the curator did not accept for the next run.
+
 Exit codes:
     0 — success
     1 — partial failure (some pages failed; rows still pushed where available)
@@ -17,17 +20,19 @@ Exit codes:
 """
 from __future__ import annotations
 
-import json
 import logging
 import os
 import sys
 import urllib.parse
 import urllib.request
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Iterator
 
 from dotenv import load_dotenv
 
+import eia_cache
+import spool
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -76,7 +81,7 @@ FUEL_NAMES: dict[str, str] = {
 }
 
 
-def _eia_get(api_key: str, period: str, offset: int) -> dict[str, Any]:
+def _eia_records(api_key: str, period: str, offset: int, meta: dict[str, Any]) -> Iterator[dict[str, Any]]:
     params = [
         ("api_key",              api_key),
         ("data[0]",              "nameplate-capacity-mw"),
@@ -93,15 +98,22 @@ def _eia_get(api_key: str, period: str, offset: int) -> dict[str, Any]:
         ("length",               PAGE_SIZE),
         ("offset",               offset),
     ]
+    log.debug("EIA GET offset=%d period=%s", offset, period)
+    return _stream(params, 60, meta)
+
+
+def _stream(params: list[tuple], timeout: float, meta: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """``response.data`` records of an EIA_BASE query as they stream in (eia_cache.py)."""
     qs = "&".join(
         f"{urllib.parse.quote(str(k), safe='[]')}={urllib.parse.quote(str(v), safe='')}"
         for k, v in params
     )
-    url = f"{EIA_BASE}?{qs}"
-    log.debug("EIA GET offset=%d period=%s", offset, period)
-    req = urllib.request.Request(url, headers={"Accept": "application/json"})
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        return json.loads(resp.read())
+
+    def open_response() -> Any:
+        req = urllib.request.Request(f"{EIA_BASE}?{qs}", headers={"Accept": "application/json"})
+        return urllib.request.urlopen(req, timeout=timeout)
+
+    return eia_cache.stream_records(EIA_BASE, params, open_response, meta)
 
 
 def latest_period(api_key: str) -> str:
@@ -125,16 +137,8 @@ def latest_period(api_key: str) -> str:
                 ("end",       candidate),
                 ("length",    1),
             ]
-            qs = "&".join(
-                f"{urllib.parse.quote(str(k), safe='[]')}={urllib.parse.quote(str(v), safe='')}"
-                for k, v in params
-            )
-            req = urllib.request.Request(
-                f"{EIA_BASE}?{qs}", headers={"Accept": "application/json"}
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                body = json.loads(resp.read())
-            if body.get("response", {}).get("data"):
+            # Counted to the end (not any()), so the response is cached
+            if sum(1 for _ in _stream(params, 30, {})):
                 log.info("Using period: %s", candidate)
                 return candidate
         except Exception:
@@ -142,6 +146,32 @@ def latest_period(api_key: str) -> str:
     return f"{now.year}-{max(1, now.month - 2):02d}"
 
 
+def _usable_generator(rec: dict[str, Any]) -> tuple[str, float, float, float, dict[str, Any]] | None:
+    """(plant id, lat, lng, nameplate MW, record), or None for a generator without coordinates or below MIN_CAP_MW."""
+    plant_id = str(rec.get("plantid") or "").strip()
+    if not plant_id:
+        return None
+
+    lat_raw = rec.get("latitude")
+    lng_raw = rec.get("longitude")
+    try:
+        lat = float(lat_raw) if lat_raw else None
+        lng = float(lng_raw) if lng_raw else None
+    except (TypeError, ValueError):
+        lat = lng = None
+    if lat is None or lng is None:
+        return None
+
+    raw_cap = rec.get("nameplate-capacity-mw")
+    try:
+        cap = float(raw_cap) if raw_cap is not None else 0.0
+    except (TypeError, ValueError):
+        cap = 0.0
+    if cap < MIN_CAP_MW:
+        return None
+    return plant_id, lat, lng, cap, rec
+
+
 def fetch_all_generators(api_key: str, period: str) -> tuple[dict[str, dict], int]:
     """Return (plantid → aggregated record, exit_code).
 
@@ -154,45 +184,30 @@ def fetch_all_generators(api_key: str, period: str) -> tuple[dict[str, dict], in
     exit_code = 0
 
     while True:
+        meta: dict[str, Any] = {}
+        records = 0
+        generators = []
         try:
-            body = _eia_get(api_key, period, offset)
+            # Filter while the page streams in; a page that fails part-way
+            # is dropped whole, so it adds nothing to ``plants``
+            for rec in _eia_records(api_key, period, offset, meta):
+                records += 1
+                generator = _usable_generator(rec)
+                if generator is not None:
+                    generators.append(generator)
         except Exception as exc:
             log.warning("EIA page offset=%d failed: %s", offset, exc)
             exit_code = 1
             break
 
-        response = body.get("response", {})
         if total is None:
-            total = int(response.get("total", 0))
+            total = int(meta.get("total", 0))
             log.info("Total generator records for %s: %d", period, total)
 
-        records = response.get("data", [])
         if not records:
             break
 
-        for rec in records:
-            plant_id = str(rec.get("plantid") or "").strip()
-            if not plant_id:
-                continue
-
-            lat_raw = rec.get("latitude")
-            lng_raw = rec.get("longitude")
-            try:
-                lat = float(lat_raw) if lat_raw else None
-                lng = float(lng_raw) if lng_raw else None
-            except (TypeError, ValueError):
-                lat = lng = None
-            if lat is None or lng is None:
-                continue
-
-            raw_cap = rec.get("nameplate-capacity-mw")
-            try:
-                cap = float(raw_cap) if raw_cap is not None else 0.0
-            except (TypeError, ValueError):
-                cap = 0.0
-            if cap < MIN_CAP_MW:
-                continue
-
+        for plant_id, lat, lng, cap, rec in generators:
             fuel_code = str(rec.get("energy_source_code") or "").strip()
             fuel_name = FUEL_NAMES.get(fuel_code, fuel_code) or fuel_code
 
@@ -237,28 +252,12 @@ def fetch_all_generators(api_key: str, period: str) -> tuple[dict[str, dict], in
 
 
 def push_assets(curator_url: str, ingest_key: str, assets: list[dict]) -> None:
-    batch_size    = 500
-    total_upserted = 0
-
-    for i in range(0, len(assets), batch_size):
-        batch   = assets[i : i + batch_size]
-        payload = json.dumps({"assets": batch}, default=str).encode()
-        req = urllib.request.Request(
-            url=f"{curator_url}/api/osint/assets/ingest",
-            data=payload,
-            headers={
-                "Content-Type": "application/json",
-                "X-API-Key":    ingest_key,
-            },
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            body = json.loads(resp.read())
-        upserted = body.get("upserted", 0)
-        total_upserted += upserted
-        log.info("Batch %d–%d: %d upserted", i + 1, i + len(batch), upserted)
-
-    log.info("Done. Total upserted: %d", total_upserted)
+    """Spool ``assets`` and drain the spool; raises if records stay behind."""
+    spool.append("assets", assets)
+    result = spool.drain_stream("assets", curator_url, ingest_key)
+    if result["error"]:
+        raise RuntimeError(f"{result['pending']} assets stay spooled: {result['error']}")
+    log.info("Done. Sent %d assets in %d batches", result["records"], result["batches"])
 
 
 def main() -> int:
@@ -280,6 +279,7 @@ def main() -> int:
     log.info("Fetching EIA-860 generators for period %s…", period)
 
     plants_dict, exit_code = fetch_all_generators(api_key, period)
+    log.info("EIA response cache: %(hits)d hits, %(misses)d misses", eia_cache.STATS)
 
     if not plants_dict:
         log.error("No plants fetched — check EIA_API_KEY and API availability")
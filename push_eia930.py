@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Fetch EIA-930 Hourly Electric Grid Monitor data and push to the curator ingest endpoint.
+"""Fetch EIA-930 Hourly Electric Grid Monitor data and push it to the curator and/or osint.db.
 
 Covers all ~60+ Lower-48 balancing authorities including the Southeast/Georgia
 regions not served by organized ISO markets (and thus absent from gridstatus).
@@ -7,24 +7,57 @@ regions not served by organized ISO markets (and thus absent from gridstatus).
 Run via eia930-refresh GitHub Actions workflow (30 * * * *), or locally:
 
     EIA_API_KEY=... CURATOR_URL=https://your-app.onrender.com INGEST_API_KEY=... python push_eia930.py
+    python push_eia930.py --backfill 2025-01-01 2025-12-31   # history, resumable
+    EIA_API_KEY=... python push_eia930.py --sink local        # into osint.db, no curator
+
+Both endpoints are fetched in parallel, and every page of a response is
+followed: the first page reports ``total``, the remaining offsets are
+fetched concurrently. Pages are parsed as they stream in (eia_cache.py) and
+each record is converted to a row on arrival. At most MAX_CONCURRENT_REQUESTS EIA requests are in
+flight at once, across all windows, endpoints and pages.
+
+--backfill splits the range into BACKFILL_WINDOW_HOURS windows, fetches up
+to BACKFILL_WORKERS of them at a time (BACKFILL_IN_FLIGHT queued) and records each spooled window in a
+checkpoint file, so an interrupted backfill resumes where it stopped.
+
+--sink (default EIA930_SINK or ``curator``) picks where rows go. ``curator``
+sends them through the on-disk spool (spool.py): a curator outage delays
+them to a later run instead of dropping them. ``local`` writes them into the
+local osint.db with insert_grid_snapshots(), LOCAL_BATCH_ROWS per
+transaction, next to the ISO rows fetch_grid.py stores, so the local
+dashboard_api sees every BA. ``both`` does both; the backfill checkpoint
+tracks each sink separately.
 
 Exit codes:
     0 — success
     1 — partial fetch failure (some rows still pushed)
-    2 — fatal (missing env vars or curator push failed)
+    2 — fatal (missing env vars, or curator unreachable; rows stay spooled)
 """
 from __future__ import annotations
 
+import argparse
+import functools
+import http.client
 import json
 import logging
 import os
 import sys
+import threading
+import time
+import urllib.error
 import urllib.parse
 import urllib.request
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
 
 from dotenv import load_dotenv
 
+import eia_cache
+import spool
+from osint_db import DB_PATH, get_conn, init_db, insert_grid_snapshots
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -32,6 +65,31 @@ log = logging.getLogger(__name__)
 
 EIA_BASE = "https://api.eia.gov/v2/electricity/rto"
 
+# EIA v2 returns at most 5000 rows per JSON request, whatever ``length`` says.
+PAGE_LENGTH = 5000
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("EIA_MAX_CONCURRENCY", "4"))
+REQUEST_ATTEMPTS = 3
+
+BACKFILL_WINDOW_HOURS = 24
+BACKFILL_WORKERS = 3
+# Windows fetched or waiting to be spooled at once; memory is bounded by this,
+# not by the length of the backfill range.
+BACKFILL_IN_FLIGHT = 2 * BACKFILL_WORKERS
+BACKFILL_CHECKPOINT = "eia930_backfill.json"
+# Drain the spool after this many backfilled windows, so it never holds more
+# than a few days of history.
+BACKFILL_DRAIN_EVERY = 7
+
+SINKS = {"curator": ("curator",), "local": ("local",), "both": ("curator", "local")}
+# Rows per osint.db transaction. Each transaction refreshes the derived grid
+# tables once; one 24 h backfill window (~19k rows) fits in one.
+LOCAL_BATCH_ROWS = 50_000
+
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# EIA record → unified grid row, or None to skip the record
+RowConverter = Callable[[dict], dict | None]
+
 # EIA fuel-type codes → display names (matches gridstatus fuel names where possible)
 FUEL_DISPLAY = {
     "COL": "Coal",
@@ -57,18 +115,86 @@ REGION_METRIC = {
 }
 
 
-def _eia_get(path: str, params: list[tuple]) -> dict:
+def _open(url: str) -> Any:
+    log.debug("EIA GET %s", url.split("?")[0])
+    req = urllib.request.Request(url, headers={"Accept": "application/json"})
+    return urllib.request.urlopen(req, timeout=30)
+
+
+def _fetch_page(path: str, params: list[tuple], convert: RowConverter) -> tuple[list[dict], dict[str, Any]]:
+    """One EIA page as converted rows, plus the response's other members.
+
+    Records are streamed through eia_cache and converted as they arrive. A
+    failure part-way through discards the page's rows and retries it whole.
+    """
     query = "&".join(
         f"{k}={urllib.parse.quote(str(v), safe='')}"
         for k, v in params
     )
-    url = f"{EIA_BASE}/{path}?{query}"
-    log.debug("EIA GET %s", url)
-    req = urllib.request.Request(url, headers={"Accept": "application/json"})
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read())
+    url = f"{EIA_BASE}/{path}"
+    for attempt in range(1, REQUEST_ATTEMPTS + 1):
+        meta: dict[str, Any] = {}
+        try:
+            with _request_slots:
+                rows = [
+                    row
+                    for record in eia_cache.stream_records(url, params, lambda: _open(f"{url}?{query}"), meta)
+                    if (row := convert(record)) is not None
+                ]
+            if "error" in meta:
+                log.warning("%s: EIA error %s", path, meta["error"])
+            return rows, meta
+        except urllib.error.HTTPError as exc:
+            # 429 is EIA's rate limit; 4xx otherwise means a bad request
+            if attempt == REQUEST_ATTEMPTS or (exc.code < 500 and exc.code != 429):
+                raise
+        except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError):
+            # ValueError: a body cut off mid-stream
+            if attempt == REQUEST_ATTEMPTS:
+                raise
+        time.sleep(2 ** attempt)
+    raise AssertionError("unreachable")
+
+
+def _fetch_rows(
+    path: str,
+    params: list[tuple],
+    sort_columns: tuple[str, ...],
+    convert: RowConverter,
+) -> list[dict]:
+    """Every record of an EIA v2 query as rows: first page, then the rest concurrently.
+
+    ``sort_columns`` must identify a record, so that offsets page through
+    a stable order; sorting by period alone can repeat or skip rows at page
+    boundaries.
+    """
+    params = list(params)
+    for i, column in enumerate(sort_columns):
+        params += [(f"sort[{i}][column]", column), (f"sort[{i}][direction]", "desc" if column == "period" else "asc")]
+    params.append(("length", PAGE_LENGTH))
+
+    rows, meta = _fetch_page(path, [*params, ("offset", 0)], convert)
+    total = int(meta.get("total") or 0)
+    offsets = range(PAGE_LENGTH, total, PAGE_LENGTH)
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(len(offsets), MAX_CONCURRENT_REQUESTS)) as pool:
+            pages = pool.map(lambda offset: _fetch_page(path, [*params, ("offset", offset)], convert), offsets)
+            for page_rows, _ in pages:  # offset order, so the result keeps the sort order
+                rows.extend(page_rows)
+    return rows
+
+
+def _window_params(api_key: str, start: str, end: str) -> list[tuple]:
+    return [
+        ("api_key",   api_key),
+        ("frequency", "hourly"),
+        ("data[0]",   "value"),
+        ("start",     start),
+        ("end",       end),
+    ]
 
 
+@functools.lru_cache(maxsize=4096)
 def _period_to_iso(period: str) -> str:
     """Convert EIA period 'YYYY-MM-DDThh' to a full ISO 8601 UTC timestamp."""
     try:
@@ -78,88 +204,225 @@ def _period_to_iso(period: str) -> str:
         return period + ":00:00+00:00"
 
 
+def _value(rec: dict) -> float | None:
+    raw_value = rec.get("value")
+    if raw_value is None:
+        return None
+    try:
+        return float(raw_value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fuel_row(rec: dict) -> dict | None:
+    value = _value(rec)
+    if value is None:
+        return None
+    fueltype = rec.get("fueltype", "")
+    return {
+        "region":      rec["respondent"],
+        "region_type": "ba",
+        "source":      "eia930",
+        "timestamp":   _period_to_iso(rec["period"]),
+        "metric":      "fuel_mix_mwh",
+        "fuel":        FUEL_DISPLAY.get(fueltype, fueltype),
+        "value":       value,
+        "unit":        "MWh",
+    }
+
+
+def _region_row(rec: dict) -> dict | None:
+    metric = REGION_METRIC.get(rec.get("type", ""))
+    value = _value(rec)
+    if not metric or value is None:
+        return None
+    return {
+        "region":      rec["respondent"],
+        "region_type": "ba",
+        "source":      "eia930",
+        "timestamp":   _period_to_iso(rec["period"]),
+        "metric":      metric,
+        "fuel":        "",
+        "value":       value,
+        "unit":        "MWh",
+    }
+
+
 def fetch_fuel_mix(api_key: str, start: str, end: str) -> list[dict]:
     """Fetch fuel-type-data for all BAs in [start, end] (hour-precision window)."""
-    params = [
-        ("api_key",            api_key),
-        ("frequency",          "hourly"),
-        ("data[0]",            "value"),
-        ("start",              start),
-        ("end",                end),
-        ("sort[0][column]",    "period"),
-        ("sort[0][direction]", "desc"),
-        ("length",             10000),
-    ]
-    result = _eia_get("fuel-type-data/data", params)
-    records = result.get("response", {}).get("data", [])
-
-    rows = []
-    for rec in records:
-        raw_value = rec.get("value")
-        if raw_value is None:
-            continue
-        try:
-            value = float(raw_value)
-        except (TypeError, ValueError):
-            continue
-
-        fueltype = rec.get("fueltype", "")
-        rows.append({
-            "region":      rec["respondent"],
-            "region_type": "ba",
-            "source":      "eia930",
-            "timestamp":   _period_to_iso(rec["period"]),
-            "metric":      "fuel_mix_mwh",
-            "fuel":        FUEL_DISPLAY.get(fueltype, fueltype),
-            "value":       value,
-            "unit":        "MWh",
-        })
-    return rows
+    return _fetch_rows(
+        "fuel-type-data/data", _window_params(api_key, start, end), ("period", "respondent", "fueltype"), _fuel_row
+    )
 
 
 def fetch_region_data(api_key: str, start: str, end: str) -> list[dict]:
     """Fetch demand, net generation, and interchange for all BAs."""
-    params = [
-        ("api_key",            api_key),
-        ("frequency",          "hourly"),
-        ("data[0]",            "value"),
-        ("start",              start),
-        ("end",                end),
-        ("sort[0][column]",    "period"),
-        ("sort[0][direction]", "desc"),
-        ("length",             10000),
+    return _fetch_rows(
+        "region-data/data", _window_params(api_key, start, end), ("period", "respondent", "type"), _region_row
+    )
+
+
+def fetch_window(api_key: str, start: str, end: str) -> tuple[list[dict], int]:
+    """Both endpoints for [start, end], in parallel; returns (rows, exit code)."""
+    fetchers: dict[str, Callable[[str, str, str], list[dict]]] = {
+        "Fuel-mix": fetch_fuel_mix,
+        "Region-data": fetch_region_data,
+    }
+    rows: list[dict] = []
+    exit_code = 0
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
+        futures = {name: pool.submit(fetch, api_key, start, end) for name, fetch in fetchers.items()}
+        for name, future in futures.items():
+            try:
+                fetched = future.result()
+            except Exception as exc:
+                log.warning("%s fetch for %s – %s failed: %s", name, start, end, exc)
+                exit_code = 1
+                continue
+            rows.extend(fetched)
+            log.info("%s %s – %s: %d rows", name, start, end, len(fetched))
+    return rows, exit_code
+
+
+def _parse_hour(value: str, end: bool = False) -> datetime:
+    """'YYYY-MM-DD' or 'YYYY-MM-DDTHH' as a UTC hour; a bare END date means its last hour."""
+    try:
+        moment = datetime.strptime(value, "%Y-%m-%dT%H")
+    except ValueError:
+        moment = datetime.strptime(value, "%Y-%m-%d") + timedelta(hours=23 if end else 0)
+    return moment.replace(tzinfo=timezone.utc)
+
+
+def backfill_windows(start: datetime, end: datetime, hours: int) -> list[tuple[str, str]]:
+    """Inclusive EIA (start, end) hour strings covering [start, end]."""
+    windows = []
+    step = timedelta(hours=hours)
+    while start <= end:
+        last = min(start + step - timedelta(hours=1), end)
+        windows.append((start.strftime("%Y-%m-%dT%H"), last.strftime("%Y-%m-%dT%H")))
+        start += step
+    return windows
+
+
+def _load_checkpoint(path: Path) -> set[str]:
+    try:
+        return set(json.loads(path.read_text()).get("done", []))
+    except FileNotFoundError:
+        return set()
+
+
+def _save_checkpoint(path: Path, done: set[str]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"done": sorted(done)}, indent=1))
+    os.replace(tmp, path)
+
+
+def store_local(rows: list[dict], db_path: str | None = None) -> int:
+    """Insert rows into osint.db, LOCAL_BATCH_ROWS per transaction; returns new samples."""
+    inserted = 0
+    conn = get_conn(db_path)
+    try:
+        for offset in range(0, len(rows), LOCAL_BATCH_ROWS):
+            inserted += insert_grid_snapshots(conn, rows[offset:offset + LOCAL_BATCH_ROWS])
+            conn.commit()
+    finally:
+        conn.close()
+    return inserted
+
+
+def _done_key(sink: str, window: tuple[str, str]) -> str:
+    # Curator entries keep the "<start>/<end>" form of older checkpoints
+    key = "/".join(window)
+    return key if sink == "curator" else f"{sink}:{key}"
+
+
+def backfill(
+    api_key: str,
+    start: datetime,
+    end: datetime,
+    checkpoint: Path,
+    window_hours: int = BACKFILL_WINDOW_HOURS,
+    sinks: tuple[str, ...] = SINKS["curator"],
+    curator_url: str = "",
+    ingest_key: str = "",
+    db_path: str | None = None,
+) -> int:
+    """Fetch [start, end] window by window and hand each to ``sinks``; returns an exit code.
+
+    A window is checkpointed per sink ("<start>/<end>" for the curator,
+    "local:<start>/<end>" for osint.db) once its rows are spooled or
+    committed, so a rerun skips it even if the curator has not received it
+    yet; the spool delivers it.
+    """
+    done = _load_checkpoint(checkpoint)
+    windows = [
+        w for w in backfill_windows(start, end, window_hours) if any(_done_key(s, w) not in done for s in sinks)
     ]
-    result = _eia_get("region-data/data", params)
-    records = result.get("response", {}).get("data", [])
-
-    rows = []
-    for rec in records:
-        rtype = rec.get("type", "")
-        metric = REGION_METRIC.get(rtype)
-        if not metric:
-            continue
-        raw_value = rec.get("value")
-        if raw_value is None:
-            continue
-        try:
-            value = float(raw_value)
-        except (TypeError, ValueError):
-            continue
-
-        rows.append({
-            "region":      rec["respondent"],
-            "region_type": "ba",
-            "source":      "eia930",
-            "timestamp":   _period_to_iso(rec["period"]),
-            "metric":      metric,
-            "fuel":        "",
-            "value":       value,
-            "unit":        "MWh",
-        })
-    return rows
+    log.info("Backfill %s – %s: %d windows to fetch, %d already done", start, end, len(windows), len(done))
+
+    exit_code = 0
+    completed = 0
+    queued = iter(windows)
+    futures: dict[Future, tuple[str, str]] = {}
+    pool = ThreadPoolExecutor(max_workers=BACKFILL_WORKERS)
+    try:
+        # Spool, store, checkpoint and drain on this thread only
+        while True:
+            for window in queued:
+                futures[pool.submit(fetch_window, api_key, *window)] = window
+                if len(futures) >= BACKFILL_IN_FLIGHT:
+                    break
+            if not futures:
+                break
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            future = next(iter(finished))
+            window = futures.pop(future)
+            rows, window_code = future.result()
+            if window_code:
+                exit_code = 1  # not checkpointed, so the next run fetches it again
+            else:
+                for sink in sinks:
+                    if _done_key(sink, window) in done:
+                        continue
+                    if sink == "curator":
+                        spool.append("grid", rows)
+                    else:
+                        log.info("%s – %s: stored %d new samples locally", *window, store_local(rows, db_path))
+                    done.add(_done_key(sink, window))
+                _save_checkpoint(checkpoint, done)
+            completed += 1
+            if "curator" in sinks and (completed % BACKFILL_DRAIN_EVERY == 0 or completed == len(windows)):
+                result = spool.drain_stream("grid", curator_url, ingest_key)
+                log.info("Backfill %d/%d windows; curator accepted %s rows", completed, len(windows), result["records"])
+                if result["error"]:
+                    log.error("Push to curator failed; %s rows stay spooled: %s", result["pending"], result["error"])
+                    return 2
+    finally:
+        # Queued windows are dropped, not fetched, when a drain error ends the run
+        pool.shutdown(cancel_futures=True)
+    return exit_code
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("START", "END"),
+        help="fetch history from START to END (YYYY-MM-DD or YYYY-MM-DDTHH, UTC, inclusive)",
+    )
+    parser.add_argument("--window-hours", type=int, default=BACKFILL_WINDOW_HOURS, help="backfill window length")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT, help="backfill checkpoint file")
+    parser.add_argument(
+        "--sink",
+        choices=sorted(SINKS),
+        default=os.environ.get("EIA930_SINK", "curator"),
+        help="curator (spool and push), local (osint.db) or both",
+    )
+    parser.add_argument("--db", default=None, help="SQLite path for the local sink; defaults to OSINT_DB_PATH or osint.db")
+    args = parser.parse_args()
+    sinks = SINKS[args.sink]
+
     api_key     = os.environ.get("EIA_API_KEY", "")
     curator_url = os.environ.get("CURATOR_URL", "").rstrip("/")
     ingest_key  = os.environ.get("INGEST_API_KEY", "")
@@ -167,12 +430,23 @@ def main() -> int:
     if not api_key:
         log.error("EIA_API_KEY env var is required")
         return 2
-    if not curator_url:
+    if "curator" in sinks and not curator_url:
         log.error("CURATOR_URL env var is required")
         return 2
-    if not ingest_key:
+    if "curator" in sinks and not ingest_key:
         log.error("INGEST_API_KEY env var is required")
         return 2
+    if "local" in sinks:
+        init_db(args.db)
+
+    if args.backfill:
+        try:
+            start, end = _parse_hour(args.backfill[0]), _parse_hour(args.backfill[1], end=True)
+        except ValueError as exc:
+            parser.error(f"--backfill: {exc}")
+        return backfill(
+            api_key, start, end, Path(args.checkpoint), args.window_hours, sinks, curator_url, ingest_key, args.db
+        )
 
     # Fetch the past 2 hours so we catch the most recent complete hour even
     # when EIA reporting lags by 60-90 minutes.
@@ -181,50 +455,26 @@ def main() -> int:
     start = (now - timedelta(hours=2)).strftime("%Y-%m-%dT%H")
 
     log.info("Fetching EIA-930 data for %s – %s UTC", start, end)
-
-    rows: list[dict] = []
-    exit_code = 0
-
-    try:
-        fuel_rows = fetch_fuel_mix(api_key, start, end)
-        rows.extend(fuel_rows)
-        log.info("Fuel-mix: %d rows", len(fuel_rows))
-    except Exception as exc:
-        log.warning("Fuel-mix fetch failed: %s", exc)
-        exit_code = 1
-
-    try:
-        region_rows = fetch_region_data(api_key, start, end)
-        rows.extend(region_rows)
-        log.info("Region-data: %d rows", len(region_rows))
-    except Exception as exc:
-        log.warning("Region-data fetch failed: %s", exc)
-        exit_code = 1
+    rows, exit_code = fetch_window(api_key, start, end)
+    log.info("EIA response cache: %(hits)d hits, %(misses)d misses", eia_cache.STATS)
 
     if not rows:
         log.warning("No EIA-930 rows fetched — check EIA_API_KEY and API availability")
         return 1
 
-    log.info("Pushing %d total rows to curator", len(rows))
-    payload = json.dumps({"rows": rows}, default=str)
+    if "local" in sinks:
+        log.info("Stored %d new samples in %s", store_local(rows, args.db), args.db or DB_PATH)
+        if "curator" not in sinks:
+            return exit_code
 
-    try:
-        req = urllib.request.Request(
-            url=f"{curator_url}/api/osint/grid/ingest",
-            data=payload.encode(),
-            headers={
-                "Content-Type": "application/json",
-                "X-API-Key":    ingest_key,
-            },
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            body = json.loads(resp.read())
-        log.info("Curator accepted %s rows", body.get("inserted", "?"))
-        return exit_code
-    except Exception as exc:
-        log.error("Push to curator failed: %s", exc)
+    log.info("Pushing %d total rows to curator", len(rows))
+    spool.append("grid", rows)
+    result = spool.drain_stream("grid", curator_url, ingest_key)
+    if result["error"]:
+        log.error("Push to curator failed; %s rows stay spooled: %s", result["pending"], result["error"])
         return 2
+    log.info("Curator accepted %s rows in %s batches", result["records"], result["batches"])
+    return exit_code
 
 
 if __name__ == "__main__":
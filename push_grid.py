@@ -5,21 +5,29 @@ Designed to be run by the grid-refresh GitHub Actions workflow, but works
 locally too:
 
     CURATOR_URL=https://your-app.onrender.com INGEST_API_KEY=... python push_grid.py
+    python push_grid.py --full     # ignore the watermarks and send every fetched row
+
+Only samples newer than each region's acknowledged watermark are sent, plus
+a periodic overlap window for late intervals (see push_state.py). Rows go
+through the on-disk spool (spool.py), so a curator outage delays them to a
+later run instead of dropping them.
 
 Exit codes:
     0 — success
     1 — fetch error (gridstatus unavailable for one or more ISOs; rows still pushed)
-    2 — push error (curator API unreachable or rejected the request)
+    2 — push error (curator unreachable; rows stay spooled for the next run)
 """
 from __future__ import annotations
 
-import json
+import argparse
 import logging
 import os
 import sys
 
 from dotenv import load_dotenv
 
+import spool
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -27,6 +35,11 @@ log = logging.getLogger(__name__)
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="send every fetched row regardless of watermarks")
+    parser.add_argument("--state", default=None, help="watermark SQLite path; defaults to PUSH_STATE_PATH or push_state.db")
+    args = parser.parse_args()
+
     curator_url = os.environ.get("CURATOR_URL", "").rstrip("/")
     ingest_key  = os.environ.get("INGEST_API_KEY", "")
 
@@ -53,31 +66,31 @@ def main() -> int:
 
     log.info("Fetched %s rows across all ISOs", len(rows))
 
-    # Serialize: convert any non-JSON-safe values (e.g. numpy floats) before sending
-    payload = json.dumps({"rows": rows}, default=str)
-
-    try:
-        import urllib.request
-
-        req = urllib.request.Request(
-            url=f"{curator_url}/api/osint/grid/ingest",
-            data=payload.encode(),
-            headers={
-                "Content-Type": "application/json",
-                "X-API-Key":    ingest_key,
-            },
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            body = json.loads(resp.read())
-
-        inserted = body.get("inserted", "?")
-        log.info("Curator accepted %s rows", inserted)
-        return 0
-
-    except Exception as exc:
-        log.error("Push to curator failed: %s", exc)
+    from push_state import acknowledge, open_state, select_rows
+
+    state = open_state(args.state)
+    selected, marks = select_rows(state, rows, default_source="gridstatus")
+    if args.full:
+        selected = rows
+    overlapped = sorted(region for (region, _), (_, overlap) in marks.items() if overlap)
+    log.info(
+        "Sending %s of %s rows newer than the watermarks%s",
+        len(selected),
+        len(rows),
+        f" (overlap window for {', '.join(overlapped)})" if overlapped else "",
+    )
+    # Spooled rows are durable, so the watermarks can move now; the spool
+    # retries delivery until the curator accepts them. Drain even when
+    # nothing is new, in case an earlier run left rows behind.
+    spool.append("grid", selected)
+    acknowledge(state, marks)
+
+    result = spool.drain_stream("grid", curator_url, ingest_key)
+    if result["error"]:
+        log.error("Push to curator failed; %s rows stay spooled: %s", result["pending"], result["error"])
         return 2
+    log.info("Curator accepted %s rows in %s batches", result["records"], result["batches"])
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""High-water marks for the push scripts, so each run sends only new samples.
+
+gridstatus get_fuel_mix() returns the whole current day, so without this
+every push_grid.py run re-sends hundreds of rows the curator already holds.
+The store is a small SQLite file (PUSH_STATE_PATH, default push_state.db;
+the grid-refresh workflow carries it between runs with actions/cache) with
+one row per (region, source):
+
+    watermark       newest sample timestamp (epoch seconds) already handed off
+    last_overlap    when a run last re-sent the overlap window
+
+select_rows() keeps rows newer than the watermark. Once every
+OVERLAP_EVERY it also re-sends the last OVERLAP of samples, which picks up
+intervals published up to OVERLAP - OVERLAP_EVERY late (1 h by default).
+The curator ignores duplicates and
+never overwrites a stored sample, so re-sending is harmless. acknowledge()
+advances the marks only once the selected rows are durable in the spool
+(spool.py), which retries until the curator takes them. A lost or empty
+state file therefore means one full push, never a gap.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+PUSH_STATE_PATH = os.environ.get("PUSH_STATE_PATH", "push_state.db")
+# Re-send this much history behind the watermark ...
+OVERLAP = timedelta(minutes=int(os.environ.get("PUSH_OVERLAP_MINUTES", "120")))
+# ... at most this often per (region, source).
+OVERLAP_EVERY = timedelta(minutes=int(os.environ.get("PUSH_OVERLAP_EVERY_MINUTES", "60")))
+
+
+def open_state(path: str | os.PathLike[str] | None = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or PUSH_STATE_PATH)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watermarks (
+            region TEXT NOT NULL,
+            source TEXT NOT NULL,
+            watermark INTEGER NOT NULL,
+            last_overlap INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (region, source)
+        )
+        """
+    )
+    return conn
+
+
+def _epoch(timestamp: str) -> int:
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def select_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[dict[str, Any]],
+    default_source: str,
+    now: datetime | None = None,
+) -> tuple[list[dict[str, Any]], dict[tuple[str, str], tuple[int, bool]]]:
+    """Rows to push, plus the marks to acknowledge once they are spooled.
+
+    The marks map (region, source) to (newest timestamp fetched, whether
+    this run re-sent the overlap window).
+    """
+    now_ts = int((now or datetime.now(timezone.utc)).timestamp())
+    state = {
+        (region, source): (watermark, last_overlap)
+        for region, source, watermark, last_overlap in conn.execute(
+            "SELECT region, source, watermark, last_overlap FROM watermarks"
+        )
+    }
+    cutoffs: dict[tuple[str, str], int] = {}
+    marks: dict[tuple[str, str], tuple[int, bool]] = {}
+    epochs: dict[str, int] = {}
+    selected = []
+    for row in rows:
+        key = (row["region"], row.get("source") or default_source)
+        cutoff = cutoffs.get(key)
+        if cutoff is None:
+            watermark, last_overlap = state.get(key, (None, 0))
+            # A key seen for the first time is sent in full, which counts as an overlap
+            overlap = now_ts - last_overlap >= OVERLAP_EVERY.total_seconds()
+            if watermark is None:
+                cutoff = -(2**62)
+            elif overlap:
+                cutoff = watermark - int(OVERLAP.total_seconds())
+            else:
+                cutoff = watermark
+            cutoffs[key] = cutoff
+            marks[key] = (watermark if watermark is not None else cutoff, overlap)
+        timestamp = row["timestamp"]
+        ts = epochs.get(timestamp)
+        if ts is None:
+            ts = epochs[timestamp] = _epoch(timestamp)
+        if ts > cutoff:
+            selected.append(row)
+        if ts > marks[key][0]:
+            marks[key] = (ts, marks[key][1])
+    return selected, marks
+
+
+def acknowledge(
+    conn: sqlite3.Connection,
+    marks: dict[tuple[str, str], tuple[int, bool]],
+    now: datetime | None = None,
+) -> None:
+    """Advance the watermarks once the selected rows are safely spooled."""
+    now = now or datetime.now(timezone.utc)
+    now_ts = int(now.timestamp())
+    conn.executemany(
+        """
+        INSERT INTO watermarks (region, source, watermark, last_overlap, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(region, source) DO UPDATE SET
+            watermark = MAX(watermark, excluded.watermark),
+            last_overlap = CASE WHEN ? THEN excluded.last_overlap ELSE last_overlap END,
+            updated_at = excluded.updated_at
+        """,
+        [
+            (region, source, watermark, now_ts if overlapped else 0, now.isoformat(), overlapped)
+            for (region, source), (watermark, overlapped) in marks.items()
+        ],
+    )
+    conn.commit()
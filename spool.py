@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""On-disk spool between the push scripts and the curator ingest routes.
+
+push_grid.py, push_eia930.py and push_assets.py append what they fetched to
+the spool first and then drain it. A curator outage therefore delays data
+instead of losing it: the next run sends its own rows plus everything still
+pending, in as few requests as possible.
+
+Layout (SPOOL_DIR, default ``spool``; the workflows carry it between runs
+with actions/cache):
+
+    spool/<stream>/<UTC time>-<random>.ndjson   one immutable segment per append()
+    spool/<stream>/cursor                       "<segment> <line>" of the first unsent record
+    spool/<stream>/rejected/<batch id>.ndjson.gz  batches the curator refused as invalid
+
+drain() reads records from the cursor onward, across segment boundaries,
+and POSTs them as gzip NDJSON batches of up to BATCH_MAX_RECORDS. Each batch
+carries an X-Batch-Id derived from its (segment, line range) span; the
+ingest routes record committed ids, so a retry after a lost response is not
+applied twice. Failed requests are retried with capped, jittered
+exponential backoff. The cursor advances only after the curator replied 2xx,
+and fully sent segments are deleted then.
+
+    python spool.py status
+    python spool.py drain          # needs CURATOR_URL and INGEST_API_KEY
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+SPOOL_DIR = os.environ.get("SPOOL_DIR", "spool")
+
+# stream → (ingest route, records per request). Asset upserts are heavier
+# than grid inserts, so their batches stay at the old push_assets.py size.
+STREAMS: dict[str, tuple[str, int]] = {
+    "grid": ("/api/osint/grid/ingest", 5000),
+    "assets": ("/api/osint/assets/ingest", 500),
+}
+BATCH_MAX_RECORDS = int(os.environ.get("SPOOL_BATCH_RECORDS", "0"))  # 0 = per-stream default
+BATCH_MAX_BYTES = 8 * 1024 * 1024  # uncompressed
+
+REQUEST_TIMEOUT = 120
+MAX_ATTEMPTS = int(os.environ.get("SPOOL_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Transient replies worth retrying; other 4xx are final.
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+SEGMENT_SUFFIX = ".ndjson"
+_encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+
+class RejectedBatch(Exception):
+    """The curator refused a batch as malformed (HTTP 400/413/422)."""
+
+
+def _stream_dir(stream: str, spool_dir: str | os.PathLike[str] | None) -> Path:
+    if stream not in STREAMS:
+        raise ValueError(f"unknown spool stream {stream!r}; expected one of {sorted(STREAMS)}")
+    return Path(spool_dir or SPOOL_DIR) / stream
+
+
+def append(stream: str, records: Iterable[dict[str, Any]], spool_dir: str | os.PathLike[str] | None = None) -> int:
+    """Write ``records`` to a new segment of ``stream``; return how many.
+
+    The segment is written to a temporary name, fsynced and renamed, so a
+    crash never leaves a half-written segment behind.
+    """
+    directory = _stream_dir(stream, spool_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".{secrets.token_hex(8)}.tmp"
+    count = 0
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(_encoder.encode(record))
+                fh.write("\n")
+                count += 1
+            fh.flush()
+            os.fsync(fh.fileno())
+        if count:
+            # Named when it becomes visible, so a drain that has listed the
+            # directory never meets a later segment sorting before its cursor
+            name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}-{secrets.token_hex(4)}{SEGMENT_SUFFIX}"
+            os.replace(tmp, directory / name)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return count
+
+
+def _segments(directory: Path) -> list[str]:
+    return sorted(path.name for path in directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+
+def _read_cursor(directory: Path) -> tuple[str, int]:
+    try:
+        segment, line = (directory / "cursor").read_text().split()
+        return segment, int(line)
+    except (FileNotFoundError, ValueError):
+        return "", 0
+
+
+def _write_cursor(directory: Path, segment: str, line: int) -> None:
+    tmp = directory / ".cursor.tmp"
+    tmp.write_text(f"{segment} {line}\n")
+    os.replace(tmp, directory / "cursor")
+
+
+def _pending(directory: Path) -> Iterator[tuple[str, int, bytes]]:
+    """(segment, line number, record) from the cursor onward."""
+    cursor_segment, cursor_line = _read_cursor(directory)
+    for segment in _segments(directory):
+        if segment < cursor_segment:
+            continue  # sent; deletion was interrupted
+        start = cursor_line if segment == cursor_segment else 0
+        with open(directory / segment, "rb") as fh:
+            for number, line in enumerate(fh):
+                if number >= start and line.strip():
+                    yield segment, number, line
+
+
+def _batch_id(spans: dict[str, list[int]]) -> str:
+    # Same records → same id, whichever run sends them
+    key = " ".join(f"{segment}:{first}-{last}" for segment, (first, last) in spans.items())
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _batches(
+    directory: Path, max_records: int
+) -> Iterator[tuple[str, list[bytes], tuple[str, int], set[str]]]:
+    """(batch id, NDJSON lines, cursor after the batch, segments read) in spool order."""
+    lines: list[bytes] = []
+    size = 0
+    spans: dict[str, list[int]] = {}
+    position = ("", 0)
+    for segment, number, line in _pending(directory):
+        if lines and (len(lines) >= max_records or size + len(line) > BATCH_MAX_BYTES):
+            yield _batch_id(spans), lines, position, set(spans)
+            lines, size, spans = [], 0, {}
+        spans.setdefault(segment, [number, number])[1] = number
+        lines.append(line)
+        size += len(line)
+        position = (segment, number + 1)
+    if lines:
+        yield _batch_id(spans), lines, position, set(spans)
+
+
+def _post(url: str, api_key: str, batch_id: str, body: bytes) -> dict[str, Any]:
+    """POST one gzip NDJSON batch, retrying transient failures with backoff."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        req = urllib.request.Request(
+            url=url,
+            data=body,
+            headers={
+                "Content-Type": "application/x-ndjson",
+                "Content-Encoding": "gzip",
+                "X-API-Key": api_key,
+                "X-Batch-Id": batch_id,
+            },
+            method="POST",
+        )
+        retry_after = None
+        try:
+            with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            if exc.code in {400, 413, 422}:
+                raise RejectedBatch(f"HTTP {exc.code}: {exc.read()[:300]!r}") from exc
+            if exc.code not in RETRY_STATUS:
+                raise
+            error: Exception = exc
+            retry_after = exc.headers.get("Retry-After")
+        except (urllib.error.URLError, OSError) as exc:  # connection refused, reset, timeout
+            error = exc
+        if attempt == MAX_ATTEMPTS:
+            raise error
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        if retry_after and retry_after.isdigit():
+            delay = min(BACKOFF_MAX, max(delay, float(retry_after)))
+        log.warning("Batch %s attempt %d/%d failed (%s); retrying in %.1fs", batch_id, attempt, MAX_ATTEMPTS, error, delay)
+        time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _release(directory: Path, cursor: tuple[str, int], read: set[str]) -> None:
+    """Persist the cursor and delete the segments read that lie wholly before it."""
+    _write_cursor(directory, *cursor)
+    for segment in sorted(read):
+        if segment >= cursor[0]:
+            break
+        (directory / segment).unlink(missing_ok=True)
+
+
+def drain_stream(
+    stream: str,
+    base_url: str,
+    api_key: str,
+    spool_dir: str | os.PathLike[str] | None = None,
+) -> dict[str, Any]:
+    """Send everything pending in ``stream``; stop at the first batch that keeps failing."""
+    directory = _stream_dir(stream, spool_dir)
+    route, default_records = STREAMS[stream]
+    url = f"{base_url.rstrip('/')}{route}"
+    result: dict[str, Any] = {"stream": stream, "batches": 0, "records": 0, "duplicates": 0, "rejected": 0, "error": None}
+    if not directory.is_dir():
+        return result
+    # Segments this drain read; only these are ever deleted, because
+    # push_grid.py and push_eia930.py may append to the stream meanwhile.
+    read: set[str] = set()
+    for batch_id, lines, cursor, segments in _batches(directory, BATCH_MAX_RECORDS or default_records):
+        body = gzip.compress(b"".join(lines), compresslevel=6)
+        try:
+            reply = _post(url, api_key, batch_id, body)
+        except RejectedBatch as exc:
+            # Keep the batch for inspection but do not let it block the spool
+            rejected = directory / "rejected"
+            rejected.mkdir(exist_ok=True)
+            (rejected / f"{batch_id}.ndjson.gz").write_bytes(body)
+            log.error("Curator rejected %s batch %s (%d records): %s", stream, batch_id, len(lines), exc)
+            result["rejected"] += len(lines)
+        except Exception as exc:
+            log.error("Giving up on %s batch %s for this run: %s", stream, batch_id, exc)
+            result["error"] = str(exc)
+            break
+        else:
+            result["batches"] += 1
+            result["records"] += len(lines)
+            result["duplicates"] += bool(reply.get("duplicate"))
+            log.info(
+                "%s batch %s: %d records, %d bytes gzip → %s",
+                stream, batch_id, len(lines), len(body), {k: v for k, v in reply.items() if k != "duplicate"},
+            )
+        read |= segments
+        _release(directory, cursor, read)
+    else:
+        # Everything read was sent. Segments appended since stay, and with
+        # no cursor the next drain reads them from their first line.
+        for segment in read:
+            (directory / segment).unlink(missing_ok=True)
+        (directory / "cursor").unlink(missing_ok=True)
+    result["pending"] = sum(1 for _ in _pending(directory))
+    return result
+
+
+def drain(
+    base_url: str,
+    api_key: str,
+    streams: Iterable[str] | None = None,
+    spool_dir: str | os.PathLike[str] | None = None,
+) -> list[dict[str, Any]]:
+    """drain_stream() for each stream (default: all of them)."""
+    return [drain_stream(stream, base_url, api_key, spool_dir) for stream in (streams or STREAMS)]
+
+
+def status(spool_dir: str | os.PathLike[str] | None = None) -> list[dict[str, Any]]:
+    result = []
+    for stream in STREAMS:
+        directory = _stream_dir(stream, spool_dir)
+        if not directory.is_dir():
+            continue
+        result.append(
+            {
+                "stream": stream,
+                "segments": len(_segments(directory)),
+                "pending": sum(1 for _ in _pending(directory)),
+                "rejected_batches": len(list((directory / "rejected").glob("*.ndjson.gz"))),
+            }
+        )
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="status", choices=("status", "drain"))
+    parser.add_argument("--dir", default=None, help="spool directory; defaults to SPOOL_DIR or ./spool")
+    parser.add_argument("--stream", action="append", choices=sorted(STREAMS), help="limit to these streams")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "status":
+        for row in status(args.dir):
+            print(f"{row['stream']:<8} {row['segments']:>5} segments  {row['pending']:>9} pending  {row['rejected_batches']} rejected batches")
+        return 0
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    curator_url = os.environ.get("CURATOR_URL", "")
+    ingest_key = os.environ.get("INGEST_API_KEY", "")
+    if not curator_url or not ingest_key:
+        log.error("CURATOR_URL and INGEST_API_KEY env vars are required")
+        return 2
+    results = drain(curator_url, ingest_key, args.stream, args.dir)
+    return 2 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""Shared fixtures; the modules under test live at the repository root."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import osint_db  # noqa: E402
+
+
+@pytest.fixture
+def osint_conn(tmp_path):
+    """A connection to a fresh osint.db in a temporary directory."""
+    path = tmp_path / "osint.db"
+    osint_db.init_db(path)
+    conn = osint_db.get_conn(path)
+    yield conn
+    conn.close()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta, timezone
+
+from osint_db import insert_grid_snapshots
+
+
+def _solar(ts: datetime) -> float:
+    """Clear-sky output: zero at night, peaking at 300 MWh at 12:00 UTC."""
+    return max(0.0, 300.0 * math.sin(math.pi * (ts.hour - 6) / 12))
+
+
+def _flat(ts: datetime) -> float:
+    return 500.0
+
+
+def _rows(start: datetime, hours: int, value=_flat, region: str = "SOCO"):
+    for h in range(hours):
+        ts = start + timedelta(hours=h)
+        yield {
+            "region": region,
+            "region_type": "ba",
+            "source": "eia930",
+            "timestamp": ts.isoformat(),
+            "metric": "fuel_mix_mwh",
+            "fuel": "Solar",
+            "value": value(ts),
+            "unit": "MWh",
+        }
+
+
+def _alerts(conn):
+    return [
+        (row["severity"], row["message"])
+        for row in conn.execute("SELECT severity, message FROM grid_alerts ORDER BY id")
+    ]
+
+
+def _ingest_days(
+    conn, start: datetime, days: int, value=_flat, regions: tuple[str, ...] = ("SOCO",)
+) -> None:
+    # One call per day, as the daily EIA-930 pushes arrive
+    for day in range(days):
+        rows = [row for region in regions for row in _rows(start + timedelta(days=day), 24, value, region)]
+        insert_grid_snapshots(conn, rows)
+        conn.commit()
+
+
+def _start(days: int) -> datetime:
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def test_diurnal_solar_raises_no_alerts(osint_conn):
+    _ingest_days(osint_conn, _start(14), 14, _solar)
+    assert _alerts(osint_conn) == []
+
+
+def test_new_solar_series_raises_no_alerts_in_its_first_week(osint_conn):
+    # Every hour-of-week slot is new, so sunset is judged against no baseline
+    _ingest_days(osint_conn, _start(7), 7, _solar)
+    assert _alerts(osint_conn) == []
+
+
+def test_solar_outage_at_noon_is_a_drop_off(osint_conn):
+    start = _start(14)
+    outage = start + timedelta(days=13, hours=12)
+    _ingest_days(osint_conn, start, 14, lambda ts: 0.0 if ts == outage else _solar(ts))
+    alerts = _alerts(osint_conn)
+    assert len(alerts) == 1
+    assert alerts[0][0] == "critical"
+    assert "SOCO fuel_mix_mwh/Solar fell 100%" in alerts[0][1]
+
+
+def test_replaying_past_days_raises_no_stale_alerts(osint_conn):
+    _ingest_days(osint_conn, _start(7), 7, _flat, regions=("SOCO", "TVA"))
+    assert _alerts(osint_conn) == []
+
+
+def test_series_behind_its_source_is_stale(osint_conn):
+    start = _start(7)
+    _ingest_days(osint_conn, start, 5, _flat, regions=("SOCO", "TVA"))
+    _ingest_days(osint_conn, start + timedelta(days=5), 2, _flat, regions=("SOCO",))
+    alerts = _alerts(osint_conn)
+    assert len(alerts) == 1
+    assert alerts[0][1].startswith("TVA fuel_mix_mwh/Solar feed stale")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from osint_db import apply_grid_retention, grid_retention_floor, insert_grid_snapshots
+
+START = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+
+def _wind(start: datetime, hours: int):
+    for h in range(hours):
+        yield {
+            "region": "PJM",
+            "region_type": "iso",
+            "source": "gridstatus",
+            "timestamp": (start + timedelta(hours=h)).isoformat(),
+            "metric": "fuel_mix_mw",
+            "fuel": "Wind",
+            "value": 100.0,
+            "unit": "MW",
+        }
+
+
+def _bucket(conn, table: str, bucket: str):
+    return tuple(conn.execute(f"SELECT n, sum FROM {table} WHERE bucket = ?", (bucket,)).fetchone())
+
+
+def test_resent_sample_below_retention_floor_is_not_counted_again(osint_conn):
+    insert_grid_snapshots(osint_conn, _wind(START, 24 * 40))
+    apply_grid_retention(osint_conn, 20, now=START + timedelta(days=40))
+    osint_conn.commit()
+    assert grid_retention_floor(osint_conn) == int((START + timedelta(days=20)).timestamp())
+
+    assert insert_grid_snapshots(osint_conn, _wind(START, 1)) == 0
+    osint_conn.commit()
+    assert _bucket(osint_conn, "grid_rollup_hourly", "2026-09-01T00:00:00+00:00") == (1, 100.0)
+    assert _bucket(osint_conn, "grid_rollup_daily", "2026-09-01") == (24, 2400.0)
+
+
+def test_samples_after_retention_floor_are_still_deduplicated(osint_conn):
+    insert_grid_snapshots(osint_conn, _wind(START, 24 * 40))
+    apply_grid_retention(osint_conn, 20, now=START + timedelta(days=40))
+    osint_conn.commit()
+
+    assert insert_grid_snapshots(osint_conn, _wind(START + timedelta(days=30), 2)) == 0
+    assert insert_grid_snapshots(osint_conn, _wind(START + timedelta(days=40), 2)) == 2